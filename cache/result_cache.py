@@ -0,0 +1,205 @@
+"""Content-addressed on-disk cache of scheduler results.
+
+An entry is keyed by a SHA-256 of everything a search depends on: every
+country's resources, the weights (and quality-model terms, if any), the
+templates and their scales, and the search parameters. It stores the ranked top schedules, from which the text
+report and the JSONL log are rewritten exactly, so a hit needs no search.
+
+Entries also record the code version that produced them: a hash of the
+search, transformation, evaluation and model sources. An entry from another
+code version is treated as a miss, and :meth:`ResultCache.validate` prunes
+every such entry at once.
+
+The cache holds at most ``max_bytes`` on disk. Reading an entry refreshes
+its modification time, and the least recently used entries are evicted
+first.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Sources whose behaviour determines search results, relative to the repo root.
+CODE_PATHS = ("scheduler.py", "search", "transformations", "evaluations", "models")
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SUFFIX = ".json.gz"
+
+
+@lru_cache(maxsize=None)
+def code_version(root: str = _REPO_ROOT) -> str:
+    """Hash the Python sources listed in :data:`CODE_PATHS`.
+
+    :param root: Repository root the paths are relative to.
+    :return: A hex digest that changes whenever any of those files changes.
+    """
+    digest = hashlib.sha256()
+    for path in CODE_PATHS:
+        full = os.path.join(root, path)
+        if os.path.isfile(full):
+            files = [full]
+        else:
+            files = sorted(
+                os.path.join(folder, name)
+                for folder, _, names in os.walk(full)
+                for name in names
+                if name.endswith(".py")
+            )
+        for filename in files:
+            digest.update(os.path.relpath(filename, root).replace(os.sep, "/").encode())
+            with open(filename, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def problem_key(world, weights: dict, library, params: dict) -> str:
+    """Return the cache key for one scheduler run.
+
+    :param world: The initial World.
+    :param weights: Dictionary of resource weights, or a QualityModel.
+    :param library: The TemplateLibrary searched.
+    :param params: The search parameters (JSON-serialisable).
+    :return: A SHA-256 hex digest.
+    """
+    payload = {
+        "world": {country.name: country.resources for country in world.all_countries()},
+        "weights": weights,
+        "templates": [
+            [template.name, template.inputs, template.outputs, template.required] for template in library
+        ],
+        "scales": list(library.scales),
+        "params": params,
+    }
+    spec = getattr(weights, "spec", None)
+    if spec:
+        # Plain weights keep the keys they had before quality models existed.
+        payload["quality_model"] = [list(term) for term in spec]
+    text = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """A size-bounded LRU cache of ranked schedules in one directory.
+
+    :ivar hits: Lookups answered from the cache.
+    :ivar misses: Lookups with no usable entry (including stale ones).
+    :ivar stale: Entries dropped because of a code version mismatch.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 << 20, version: Optional[str] = None):
+        """Open (and create if needed) a cache directory.
+
+        :param directory: Where entries are stored.
+        :param max_bytes: Total size the entries may take on disk.
+        :param version: Code version to store and accept; defaults to
+            :func:`code_version`.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version() if version is None else version
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _entries(self) -> List[Tuple[int, int, str]]:
+        """Return ``(mtime_ns, size, path)`` for every entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[List[tuple]]:
+        """Return the ranked schedules stored under ``key``, or None.
+
+        :param key: A key from :func:`problem_key`.
+        :return: ``(actions, eus, deltas)`` tuples, best first.
+        """
+        path = self._path(key)
+        entry = self._read(path) if os.path.exists(path) else None
+        try:
+            if entry is not None and entry.get("code_version") != self.version:
+                self.stale += 1
+                os.remove(path)
+                entry = None
+            if entry is not None:
+                os.utime(path)
+        except FileNotFoundError:
+            # Another process evicted or pruned the entry meanwhile.
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(schedule) for schedule in entry["schedules"]]
+
+    def put(self, key: str, ranked: List[tuple]):
+        """Store ranked schedules under ``key``, then evict down to ``max_bytes``.
+
+        :param key: A key from :func:`problem_key`.
+        :param ranked: ``(actions, eus, deltas)`` tuples, best first.
+        """
+        entry = {"code_version": self.version, "schedules": [list(schedule) for schedule in ranked]}
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write(json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def validate(self, prune: bool = True) -> Tuple[int, int]:
+        """Check every entry against the current code version.
+
+        :param prune: Remove stale and unreadable entries.
+        :return: ``(valid, stale)`` entry counts.
+        """
+        valid = stale = 0
+        for _, _, path in self._entries():
+            entry = self._read(path)
+            if entry is not None and entry.get("code_version") == self.version:
+                valid += 1
+                continue
+            stale += 1
+            if prune:
+                os.remove(path)
+        return valid, stale
+
+    def clear(self):
+        """Remove every entry."""
+        for _, _, path in self._entries():
+            os.remove(path)
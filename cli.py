@@ -0,0 +1,303 @@
+"""Command-line entry point for the schedulers.
+
+Every search knob is a flag, so parameter sweeps can be scripted::
+
+    python cli.py --depth 4 --frontier 500 --no-plot
+    python cli.py --search dfs --scales 1,2,3,5 --time-budget 30 --no-plot
+    python cli.py --search mcts --workers 4 --time-budget 10 --no-plot
+    python cli.py --search hda --workers 4 --depth 4 --no-plot
+    python cli.py --weight-sets data/weight_sets.csv --depth 3
+    python cli.py --macros-from output/schedule_log.jsonl --depth 4 --no-plot
+
+When a run finishes, a one-line JSON summary is printed to stdout: the
+runtime, the node expansions (MCTS iterations for ``--search mcts``; summed
+over the worker processes for ``--search hda``), the expansions per second
+and the peak resident memory of the process. With ``--success-samples N``
+it also reports the best schedule's Monte Carlo estimate (see
+:mod:`evaluations.monte_carlo`).
+
+Unless ``--no-plot`` is given, the logged schedules are plotted in a
+background process (see :mod:`visualizations.pipeline`), so the summary is
+printed as soon as the search ends.
+
+With ``--macros-from``, action sequences recurring in earlier schedule logs
+are searched as single steps too (see :mod:`search.macros`); the summary
+reports how many were mined.
+
+With ``--weight-sets``, the tree is recorded once under ``--resources`` and
+re-scored under every weight set of the file (see :mod:`search.sweep`); the
+top schedules of each set are written as JSON lines to ``--output`` with a
+``.sweep.jsonl`` suffix, and nothing is plotted.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from parsers.csv_parser import parse_weight_sets
+from scheduler import country_scheduler, load_problem, mcts_scheduler
+from search.hooks import SearchCounters
+from search.macros import mine_log_macros
+from search.options import SEARCH_MODES, SearchOptions
+from search.profiling import PROFILE_MODES
+from search.ranking import score_schedule
+
+LOG_FORMATS = ("jsonl", "jsonl.gz")
+
+
+def _parse_positive_ints(text: str, what: str):
+    try:
+        values = tuple(int(part) for part in text.split(","))
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"{what} must be comma-separated integers, got '{text}'.") from exc
+    if not values or min(values) < 1:
+        raise argparse.ArgumentTypeError(f"{what} must be positive, got '{text}'.")
+    return values
+
+
+def parse_positive_int(text: str) -> int:
+    """Parse one positive integer, e.g. a search depth."""
+    values = _parse_positive_ints(text, "The value")
+    if len(values) != 1:
+        raise argparse.ArgumentTypeError(f"Expected one positive integer, got '{text}'.")
+    return values[0]
+
+
+def parse_non_negative_int(text: str) -> int:
+    """Parse one non-negative integer, e.g. a random seed."""
+    try:
+        value = int(text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Expected a non-negative integer, got '{text}'.") from exc
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"Expected a non-negative integer, got '{text}'.")
+    return value
+
+
+def parse_scales(text: str):
+    """Parse a comma-separated list of positive scale factors, e.g. ``1,3,5``."""
+    return _parse_positive_ints(text, "Scales")
+
+
+def parse_schedule_nums(text: str):
+    """Parse a comma-separated list of schedule numbers, e.g. ``1,5``."""
+    return _parse_positive_ints(text, "Schedule numbers")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the argument parser; the defaults reproduce ``main.py``'s run."""
+    parser = argparse.ArgumentParser(description="Plan the best schedules for one country.")
+    files = parser.add_argument_group("files")
+    files.add_argument("--country", default="Atlantis")
+    files.add_argument("--resources", default="data/weights.csv", help="CSV of resource weights.")
+    files.add_argument("--initial-state", default="data/resources.csv", help="CSV of initial resources.")
+    files.add_argument("--templates", default="data/templates.txt")
+    files.add_argument(
+        "--quality-model", default=None, metavar="CSV",
+        help="Score states with this non-linear quality model (see data/quality_model.csv).",
+    )
+    files.add_argument("--output", default="output/schedule_atlantis.txt", help="Text report path.")
+    files.add_argument("--log", default="output/schedule_log.jsonl", help="Schedule log path.")
+    files.add_argument(
+        "--log-format", choices=LOG_FORMATS, default="jsonl",
+        help="jsonl.gz gzips the log and appends .gz to its path if missing.",
+    )
+    files.add_argument("--plot", default="output/schedule_plot.png", help="Resource plot path.")
+    files.add_argument("--no-plot", action="store_true", help="Skip plotting (and importing matplotlib).")
+    files.add_argument(
+        "--plot-schedules", type=parse_schedule_nums, default=None, metavar="NUMS",
+        help="Schedule numbers to plot, e.g. 1,5 (default: all).",
+    )
+    files.add_argument(
+        "--plot-workers", type=parse_positive_int, default=1,
+        help="Processes rendering per-schedule plots (a --plot path containing {schedule_num}).",
+    )
+
+    search = parser.add_argument_group("search")
+    search.add_argument("--search", choices=SEARCH_MODES + ("mcts",), default="best_first")
+    search.add_argument("--num-schedules", type=parse_positive_int, default=5)
+    search.add_argument("--depth", type=parse_positive_int, default=3, help="Actions per schedule.")
+    search.add_argument("--frontier", type=parse_positive_int, default=100, help="Best-first frontier size.")
+    search.add_argument(
+        "--frontier-memory", type=float, default=None, metavar="MIB",
+        help="Spill best-first frontier nodes beyond this many MiB to disk.",
+    )
+    search.add_argument("--scales", type=parse_scales, default=None, help="Template scales, e.g. 1,2,3.")
+    search.add_argument("--no-por", action="store_true", help="Disable partial-order reduction.")
+    search.add_argument("--time-budget", type=float, default=None, help="Wall-clock seconds for the search.")
+    search.add_argument("--workers", type=parse_positive_int, default=1, help="MCTS or HDA* worker processes.")
+    search.add_argument("--iterations", type=parse_positive_int, default=None, help="MCTS iteration budget.")
+    search.add_argument("--seed", type=parse_non_negative_int, default=0, help="MCTS seed.")
+    search.add_argument("--cache", default=None, help="Result cache directory.")
+    search.add_argument(
+        "--macros-from", nargs="+", default=None, metavar="LOG",
+        help="Also search action sequences recurring in these schedule logs as single steps.",
+    )
+    search.add_argument(
+        "--success-samples", type=parse_positive_int, default=None, metavar="N",
+        help="Estimate each schedule's utility and success rate from N Monte Carlo samples.",
+    )
+    search.add_argument(
+        "--weight-sets", default=None, metavar="CSV",
+        help="Re-score one recorded tree under each weight set (Resource column + one column per set).",
+    )
+
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=None, help="Write profiling reports.")
+    parser.add_argument(
+        "--trace", default=None, metavar="PATH",
+        help="Record a binary trace of the search; summarize it with python -m search.trace PATH.",
+    )
+    return parser
+
+
+def peak_memory_mib():
+    """Return the peak resident set size of this process in MiB, or None
+    where the ``resource`` module is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def run_sweep(args) -> dict:
+    """Record the search tree once and rank it under every weight set."""
+    from search.sweep import record_sweep_tree  # Loads numpy, which plain runs never need.
+
+    weight_sets = parse_weight_sets(args.weight_sets)
+    started = time.perf_counter()
+    world, weights, library = load_problem(args.resources, args.initial_state, args.templates, args.scales)
+    tree = record_sweep_tree(world, args.country, library, weights, args.depth, not args.no_por)
+    recorded = time.perf_counter() - started
+    tops = tree.top_schedules(list(weight_sets.values()), args.num_schedules)
+    runtime = time.perf_counter() - started
+
+    report = os.path.splitext(args.output)[0] + ".sweep.jsonl"
+    with open(report, "w", encoding="utf-8") as f:
+        for name, top in zip(weight_sets, tops):
+            schedules = [{"actions": actions, "score": score} for actions, score in top]
+            f.write(json.dumps({"weight_set": name, "schedules": schedules}) + "\n")
+    return {
+        "search": "sweep",
+        "depth": args.depth,
+        "weight_sets": len(weight_sets),
+        "recorded_schedules": len(tree.actions),
+        "record_s": round(recorded, 6),
+        "runtime_s": round(runtime, 6),
+        "expansions": tree.expanded,
+        "expansions_per_s": round(tree.expanded / recorded, 1) if recorded > 0 else None,
+        "peak_rss_mib": peak_memory_mib(),
+        "output": report,
+    }
+
+
+def run(args) -> dict:
+    """Run one search as configured by ``args`` and return its summary."""
+    log = args.log
+    compress = args.log_format == "jsonl.gz"
+    if compress and not log.endswith(".gz"):
+        log += ".gz"
+
+    started = time.perf_counter()
+    if args.search == "mcts":
+        stats = {}
+        iterations = args.iterations
+        if iterations is None and args.time_budget is None:
+            iterations = 1000
+        ranked = mcts_scheduler(
+            args.country, args.resources, args.initial_state, args.output, args.num_schedules, args.depth,
+            iterations=iterations, time_budget=args.time_budget, workers=args.workers, seed=args.seed,
+            templates_filename=args.templates, log_filename=log, compress_log=compress,
+            scales=args.scales, stats=stats, quality_model_filename=args.quality_model,
+        )
+        expansions = stats["iterations"]
+        cache_hit = False
+    else:
+        counters = SearchCounters()
+        stats = {}
+        cache = None
+        macros = None
+        if args.macros_from is not None:
+            macros = mine_log_macros(args.macros_from)
+        if args.cache is not None:
+            from cache.result_cache import ResultCache
+
+            cache = ResultCache(args.cache)
+        options = SearchOptions(
+            search_mode=args.search,
+            partial_order_reduction=not args.no_por,
+            macros=macros,
+            time_budget=args.time_budget,
+            frontier_memory=None if args.frontier_memory is None else int(args.frontier_memory * (1 << 20)),
+            workers=args.workers,
+        )
+        ranked = country_scheduler(
+            args.country, args.resources, args.initial_state, args.output, args.num_schedules, args.depth,
+            args.frontier, options=options, templates_filename=args.templates, log_filename=log,
+            compress_log=compress, cache=cache, hooks=[counters], profile=args.profile, scales=args.scales,
+            trace_filename=args.trace, stats=stats, quality_model_filename=args.quality_model,
+            success_samples=args.success_samples,
+        )
+        expansions = stats["expanded"] if args.search == "hda" and stats else counters.counts["expand"]
+        cache_hit = cache is not None and cache.hits > 0
+    runtime = time.perf_counter() - started
+
+    if not args.no_plot:
+        # Imported here so sweeps with --no-plot never load numpy or the
+        # process machinery; matplotlib only loads in the plotting process,
+        # which finishes on its own while the summary is returned.
+        from visualizations.pipeline import plot_in_background
+
+        plot_in_background(
+            log, args.plot, args.initial_state, args.country, args.plot_schedules, workers=args.plot_workers
+        )
+
+    return {
+        "search": args.search,
+        "depth": args.depth,
+        "frontier": args.frontier,
+        "workers": args.workers,
+        "runtime_s": round(runtime, 6),
+        "expansions": expansions,
+        "expansions_per_s": round(expansions / runtime, 1) if runtime > 0 else None,
+        "peak_rss_mib": peak_memory_mib(),
+        "schedules": len(ranked),
+        "best_score": score_schedule(*ranked[0][:2]) if ranked else None,
+        "cache_hit": cache_hit,
+        "output": args.output,
+        "log": log,
+        "trace": args.trace,
+        "success": stats.get("success", [None])[0] if ranked else None,
+        "macros": None if args.macros_from is None else len(macros),
+    }
+
+
+def main(argv=None):
+    """Parse ``argv``, run the search and print the JSON summary."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers != 1 and args.search not in ("mcts", "hda"):
+        parser.error("--workers applies to --search mcts and hda only.")
+    if args.profile is not None and args.search in ("mcts", "hda"):
+        parser.error("--profile applies to best_first and dfs searches only.")
+    if args.trace is not None and (args.search in ("mcts", "hda") or args.weight_sets is not None):
+        parser.error("--trace applies to best_first and dfs searches only.")
+    if args.weight_sets is not None and args.search in ("mcts", "hda"):
+        parser.error(f"--weight-sets records an exhaustive tree; it does not combine with --search {args.search}.")
+    if args.success_samples is not None and (args.search == "mcts" or args.weight_sets is not None):
+        parser.error("--success-samples applies to best_first, dfs and hda searches only.")
+    if args.macros_from is not None and (args.search in ("mcts", "hda") or args.weight_sets is not None):
+        parser.error("--macros-from applies to best_first and dfs searches only.")
+    if args.weight_sets is not None and args.quality_model is not None:
+        parser.error("--weight-sets re-scores linear weights; it does not combine with --quality-model.")
+    summary = run_sweep(args) if args.weight_sets is not None else run(args)
+    print(json.dumps(summary), flush=True)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
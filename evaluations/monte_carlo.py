@@ -0,0 +1,252 @@
+"""Monte Carlo estimates of schedule success.
+
+A schedule planned on the current world can still fail when it is carried
+out: TRANSFORMs may yield less (or more) than their templates promise, and
+the partner of a TRANSFER may decline it. :class:`ScheduleSimulator` plays a
+schedule under many sampled outcomes at once:
+
+* every TRANSFORM output is multiplied by a yield drawn from
+  ``max(0, 1 + yield_sd * N(0, 1))``; resources a template both consumes and
+  returns (such as Population) pass through unchanged;
+* every TRANSFER goes ahead with probability ``acceptance``;
+* a step whose preconditions no longer hold in a sample, or whose TRANSFER is
+  declined, is skipped in that sample, as in
+  :func:`evaluations.schedule_evaluation.compute_expected_utility`.
+
+A sample's utility is the discounted quality change of the planning country,
+``gamma ** len(schedule) * (Q_end - Q_start)``, and it succeeds when every
+step was carried out. The state of all samples is one ``(samples, cells)``
+array over the (country, resource) cells the schedule touches, so each step
+costs a few array operations whatever the number of samples.
+
+Draws depend only on the seed and the step number, so every schedule scored
+by one simulator sees the same outcomes (common random numbers) and their
+estimates can be compared directly.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from evaluations.quality_model import QualityModel
+from evaluations.state_quality import is_quality_model
+from transformations.transformations import Action, TransformTemplate, action_from_string, transform_action
+
+DEFAULT_SAMPLES = 2000
+# Standard deviation of the yield multiplier of TRANSFORM outputs.
+DEFAULT_YIELD_SD = 0.1
+# Probability that the partner of a TRANSFER accepts it.
+DEFAULT_ACCEPTANCE = 0.9
+
+
+@dataclass(frozen=True)
+class MonteCarloEstimate:
+    """Summary of one schedule's simulated outcomes.
+
+    :ivar mean: Mean discounted utility over the samples.
+    :ivar variance: Variance of the discounted utility.
+    :ivar success_rate: Fraction of samples in which every step was carried out.
+    :ivar samples: Number of samples drawn.
+    """
+
+    mean: float
+    variance: float
+    success_rate: float
+    samples: int
+
+
+@dataclass(frozen=True)
+class _Step:
+    """One primitive action compiled to cell indices.
+
+    ``fixed`` is the change made regardless of yield, ``variable`` the part
+    scaled by the sampled yield (zero for TRANSFERs).
+    """
+
+    is_transfer: bool
+    cells: np.ndarray
+    fixed: np.ndarray
+    variable: np.ndarray
+    need_cells: np.ndarray
+    need: np.ndarray
+
+
+class ScheduleSimulator:
+    """Seeded, vectorized simulator of schedules from one initial world.
+
+    :ivar samples: Number of samples per schedule.
+    """
+
+    def __init__(
+        self,
+        world,
+        country_name: str,
+        weights: dict,
+        library=None,
+        samples: int = DEFAULT_SAMPLES,
+        seed: int = 0,
+        yield_sd: float = DEFAULT_YIELD_SD,
+        acceptance: float = DEFAULT_ACCEPTANCE,
+        gamma: float = 0.95,
+    ):
+        """Create a simulator; the world is only read.
+
+        :param world: The world the schedules start from.
+        :param country_name: Name of the planning country.
+        :param weights: Dictionary of resource weights, or a QualityModel.
+        :param library: The TemplateLibrary used to parse TRANSFORM action
+            strings; only needed for schedules given as strings.
+        :param samples: Number of samples per schedule.
+        :param seed: Seed of the sampled outcomes.
+        :param yield_sd: Standard deviation of TRANSFORM yields.
+        :param acceptance: Probability that a TRANSFER is accepted.
+        :param gamma: Discount factor per step.
+        :raises ValueError: If ``samples`` is not positive, ``yield_sd`` is
+            negative or ``acceptance`` is not a probability.
+        """
+        if samples < 1:
+            raise ValueError(f"samples must be positive, got {samples}.")
+        if yield_sd < 0:
+            raise ValueError(f"yield_sd must not be negative, got {yield_sd}.")
+        if not 0 <= acceptance <= 1:
+            raise ValueError(f"acceptance must be between 0 and 1, got {acceptance}.")
+        self.world = world
+        self.country_name = country_name
+        self.weights = weights
+        self.model = weights if is_quality_model(weights) else QualityModel(weights)
+        self.library = library
+        self.samples = samples
+        self.seed = seed
+        self.yield_sd = yield_sd
+        self.acceptance = acceptance
+        self.gamma = gamma
+
+    def _actions(self, schedule) -> List[Action]:
+        """Resolve a schedule to its primitive actions."""
+        actions = []
+        for step in schedule:
+            if isinstance(step, str):
+                if self.library is None:
+                    raise ValueError("Schedules of action strings need the simulator's library.")
+                step = action_from_string(step, self.library, self.weights)
+            elif isinstance(step, tuple) and isinstance(step[0], TransformTemplate):
+                template, country = step
+                step = transform_action(country, template.name, 1, template)
+            actions.extend(step.steps or (step,))
+        return actions
+
+    def _compile(self, actions: List[Action]) -> Tuple[np.ndarray, np.ndarray, List[_Step]]:
+        """Build the initial cell vector, the planning country's cells in
+        model column order, and the compiled steps."""
+        cells = {(self.country_name, res): i for i, res in enumerate(self.model.columns)}
+        for action in actions:
+            for country, res, _ in action.changes + action.preconditions:
+                cells.setdefault((country, res), len(cells))
+        initial = np.array(
+            [self.world.get_country(country).resources.get(res, 0) for country, res in cells], dtype=float
+        )
+        steps = []
+        for action in actions:
+            consumed, produced, need = {}, {}, {}
+            for country, res, amount in action.changes:
+                side = produced if amount > 0 else consumed
+                side[cells[country, res]] = side.get(cells[country, res], 0) + amount
+            for country, res, minimum in action.preconditions:
+                need[cells[country, res]] = max(need.get(cells[country, res], minimum), minimum)
+            touched = sorted(set(consumed) | set(produced))
+            fixed, variable = [], []
+            for cell in touched:
+                out, used = produced.get(cell, 0), -consumed.get(cell, 0)
+                if action.is_transfer:
+                    fixed.append(out - used)
+                    variable.append(0.0)
+                else:
+                    passed = min(out, used)
+                    fixed.append(passed - used)
+                    variable.append(out - passed)
+            steps.append(
+                _Step(
+                    action.is_transfer,
+                    np.array(touched, dtype=np.intp),
+                    np.array(fixed, dtype=float),
+                    np.array(variable, dtype=float),
+                    np.array(list(need), dtype=np.intp),
+                    np.array(list(need.values()), dtype=float),
+                )
+            )
+        own = np.arange(len(self.model.columns), dtype=np.intp)
+        return initial, own, steps
+
+    def simulate(self, schedule) -> Tuple[np.ndarray, np.ndarray]:
+        """Play ``schedule`` under every sample.
+
+        :param schedule: Action strings, Actions (macros are expanded) or
+            ``(TransformTemplate, country_name)`` pairs.
+        :return: ``(utilities, succeeded)``, one entry per sample.
+        """
+        actions = self._actions(schedule)
+        initial, own, steps = self._compile(actions)
+        rng = np.random.default_rng(self.seed)
+        yields = np.maximum(1 + self.yield_sd * rng.standard_normal((self.samples, len(steps))), 0)
+        accepted = rng.random((self.samples, len(steps))) < self.acceptance
+
+        state = np.tile(initial, (self.samples, 1))
+        succeeded = np.ones(self.samples, dtype=bool)
+        for t, step in enumerate(steps):
+            done = (state[:, step.need_cells] >= step.need).all(axis=1)
+            if step.is_transfer:
+                done &= accepted[:, t]
+            change = step.fixed + yields[:, t, None] * step.variable
+            state[:, step.cells] += done[:, None] * change
+            succeeded &= done
+
+        start = self.model.qualities(initial[None, own])[0]
+        with np.errstate(invalid="ignore"):
+            utilities = self.gamma ** len(steps) * (self.model.qualities(state[:, own]) - start)
+        return utilities, succeeded
+
+    def estimate(self, schedule) -> MonteCarloEstimate:
+        """Estimate the utility and success rate of ``schedule``.
+
+        :param schedule: As for :meth:`simulate`.
+        :return: The :class:`MonteCarloEstimate`.
+        """
+        utilities, succeeded = self.simulate(schedule)
+        with np.errstate(invalid="ignore"):
+            return MonteCarloEstimate(
+                mean=float(utilities.mean()),
+                variance=float(utilities.var()),
+                success_rate=float(succeeded.mean()),
+                samples=self.samples,
+            )
+
+    def estimate_many(self, schedules: Iterable) -> List[MonteCarloEstimate]:
+        """Estimate several schedules under the same sampled outcomes."""
+        return [self.estimate(schedule) for schedule in schedules]
+
+
+def estimate_schedule_success(
+    world,
+    country_name: str,
+    ranked,
+    weights: dict,
+    library,
+    samples: int = DEFAULT_SAMPLES,
+    seed: int = 0,
+    gamma: float = 0.95,
+) -> List[dict]:
+    """Estimate every ranked schedule of a scheduler run.
+
+    :param world: The world the schedules start from.
+    :param country_name: Name of the planning country.
+    :param ranked: ``(actions, eus, deltas)`` tuples.
+    :param weights: Dictionary of resource weights, or a QualityModel.
+    :param library: The TemplateLibrary searched.
+    :param samples: Number of samples per schedule.
+    :param seed: Seed of the sampled outcomes.
+    :param gamma: Discount factor per step.
+    :return: One dictionary of :class:`MonteCarloEstimate` fields per schedule.
+    """
+    simulator = ScheduleSimulator(world, country_name, weights, library, samples=samples, seed=seed, gamma=gamma)
+    return [asdict(estimate) for estimate in simulator.estimate_many(actions for actions, *_ in ranked)]
@@ -0,0 +1,273 @@
+"""Compiled non-linear state-quality models.
+
+The linear state quality (:func:`evaluations.state_quality.compute_state_quality`)
+is ``sum(w[r] * x[r])`` over per-capita amounts ``x[r] = amount[r] /
+Population``. A :class:`QualityModel` keeps those weights and adds, from a
+declarative spec (see :func:`parsers.csv_parser.parse_quality_model` and
+``data/quality_model.csv``), per resource:
+
+* a diminishing-returns curve ``f[r]`` in place of ``x[r]``:
+  ``linear`` (``x``), ``log`` (``s * log(1 + x / s)``) or ``saturating``
+  (``s * (1 - exp(-x / s))``), where ``s`` is the row's Scale. All three
+  rise with slope 1 at zero and never faster;
+* a floor: ``FloorPenalty * max(0, Floor - x[r])`` is subtracted, for
+  essentials such as Food and Water;
+* a waste ratio: ``RatioPenalty * amount[r] / (amount[r] + amount[WasteOf])``
+  is subtracted, e.g. for HousingWaste relative to Housing.
+
+so that ``Q = sum(w[r] * f[r](x[r])) - floor penalties - ratio penalties``.
+A model without terms scores exactly like the linear quality.
+
+The spec is compiled once into column index arrays, and
+:meth:`QualityModel.qualities` scores a whole ``(states x resources)`` batch
+with a handful of array operations; no Python code runs per resource.
+
+A model is a ``dict`` of the linear weights, so it can be passed anywhere
+weights are expected: TRANSFER costs and bundle ranking keep using the
+weights, while :func:`~evaluations.state_quality.compute_state_quality` and
+the search's step scores use the model (see
+:func:`~evaluations.state_quality.is_quality_model`). Treat it as read-only.
+"""
+
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from transformations.transformations import (
+    MAX_BUNDLE_RESOURCES,
+    MAX_TRANSFER_AMOUNT,
+    TRANSFER_PENALTY_FACTOR,
+    VALID_TRANSFERABLES,
+)
+
+CURVES = ("linear", "log", "saturating")
+
+# Order of the fields of one spec term.
+TERM_FIELDS = ("resource", "curve", "scale", "floor", "floor_penalty", "waste_of", "ratio_penalty")
+
+
+def _normalize_term(term: dict) -> tuple:
+    """Validate one spec row and return it as a tuple in :data:`TERM_FIELDS` order."""
+    resource = term.get("resource")
+    if not resource:
+        raise ValueError("Every quality-model term needs a resource.")
+    curve = term.get("curve") or "linear"
+    if curve not in CURVES:
+        raise ValueError(f"Unknown curve '{curve}' for {resource}; expected one of {CURVES}.")
+    scale = term.get("scale")
+    scale = 1.0 if scale is None else float(scale)
+    if curve != "linear" and not scale > 0:
+        raise ValueError(f"The {curve} curve of {resource} needs a positive scale, got {scale}.")
+    floor, floor_penalty = term.get("floor"), term.get("floor_penalty")
+    if (floor is None) != (floor_penalty is None):
+        raise ValueError(f"The floor of {resource} needs both Floor and FloorPenalty.")
+    waste_of, ratio_penalty = term.get("waste_of"), term.get("ratio_penalty")
+    if (waste_of is None) != (ratio_penalty is None):
+        raise ValueError(f"The waste ratio of {resource} needs both WasteOf and RatioPenalty.")
+    for name, value in (("FloorPenalty", floor_penalty), ("RatioPenalty", ratio_penalty)):
+        if value is not None and value < 0:
+            raise ValueError(f"{name} of {resource} must not be negative, got {value}.")
+    return (
+        resource,
+        curve,
+        scale,
+        None if floor is None else float(floor),
+        None if floor_penalty is None else float(floor_penalty),
+        waste_of,
+        None if ratio_penalty is None else float(ratio_penalty),
+    )
+
+
+class QualityModel(dict):
+    """Resource weights plus compiled non-linear quality terms.
+
+    :ivar spec: The normalized terms, as tuples in :data:`TERM_FIELDS` order.
+    :ivar columns: Resource names, in the column order of evaluated batches.
+    """
+
+    # Lets code that must not import numpy recognise a model.
+    is_quality_model = True
+
+    def __init__(self, weights: dict, spec: Iterable = ()):
+        """Compile a model.
+
+        :param weights: Dictionary of resource weights.
+        :param spec: Terms as dictionaries with the keys of
+            :data:`TERM_FIELDS` (as returned by
+            :func:`parsers.csv_parser.parse_quality_model`), or as tuples in
+            that order.
+        :raises ValueError: If a term is invalid or a resource has two terms.
+        """
+        super().__init__(weights)
+        terms = [_normalize_term(t if isinstance(t, dict) else dict(zip(TERM_FIELDS, t))) for t in spec]
+        resources = [term[0] for term in terms]
+        if len(set(resources)) != len(resources):
+            raise ValueError("A resource may have only one quality-model term.")
+        self.spec: Tuple[tuple, ...] = tuple(terms)
+
+        names = set(weights) | set(resources) | {term[5] for term in terms if term[5]} | {"Population"}
+        self.columns: Tuple[str, ...] = tuple(sorted(names))
+        index: Dict[str, int] = {res: i for i, res in enumerate(self.columns)}
+        self._index = index
+        self._population = index["Population"]
+        self._weights = np.array([weights.get(res, 0) for res in self.columns], dtype=float)
+
+        def compile_terms(selected, *fields):
+            columns = np.array([index[term[0]] for term in selected], dtype=np.intp)
+            return (columns,) + tuple(np.array([term[f] for term in selected], dtype=float) for f in fields)
+
+        self._log = compile_terms([t for t in terms if t[1] == "log"], 2)
+        self._saturating = compile_terms([t for t in terms if t[1] == "saturating"], 2)
+        self._floors = compile_terms([t for t in terms if t[3] is not None], 3, 4)
+        ratios = [t for t in terms if t[5] is not None]
+        self._ratio_base = np.array([index[t[5]] for t in ratios], dtype=np.intp)
+        self._ratios = compile_terms(ratios, 6)
+
+    def __reduce__(self):
+        return type(self), (dict(self), self.spec)
+
+    def matrix(self, states: Iterable[dict]) -> np.ndarray:
+        """Stack resource dictionaries into a ``(states, columns)`` array."""
+        columns = self.columns
+        return np.array([[state.get(res, 0) for res in columns] for state in states], dtype=float).reshape(
+            -1, len(columns)
+        )
+
+    def qualities(self, amounts) -> np.ndarray:
+        """Score a batch of states.
+
+        :param amounts: A ``(states, columns)`` array in :attr:`columns`
+            order, or an iterable of resource dictionaries.
+        :return: One quality per state; ``-inf`` where Population is zero.
+        """
+        if not isinstance(amounts, np.ndarray):
+            amounts = self.matrix(amounts)
+        population = amounts[:, self._population]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_capita = amounts / population[:, None]
+            values = per_capita
+            log_columns, log_scale = self._log
+            saturating_columns, saturating_scale = self._saturating
+            if len(log_columns) or len(saturating_columns):
+                values = per_capita.copy()
+                values[:, log_columns] = log_scale * np.log1p(per_capita[:, log_columns] / log_scale)
+                values[:, saturating_columns] = saturating_scale * -np.expm1(
+                    -per_capita[:, saturating_columns] / saturating_scale
+                )
+            quality = values @ self._weights
+
+            floor_columns, floor_level, floor_penalty = self._floors
+            if len(floor_columns):
+                shortfall = np.maximum(floor_level - per_capita[:, floor_columns], 0)
+                quality -= shortfall @ floor_penalty
+
+            waste_columns, ratio_penalty = self._ratios
+            if len(waste_columns):
+                waste = amounts[:, waste_columns]
+                total = waste + amounts[:, self._ratio_base]
+                ratio = np.divide(waste, total, out=np.zeros_like(waste), where=total > 0)
+                quality -= ratio @ ratio_penalty
+        quality[population == 0] = -np.inf
+        return quality
+
+    def quality(self, resources: dict) -> float:
+        """Score one state, given as a resource dictionary."""
+        return float(self.qualities(self.matrix((resources,)))[0])
+
+    def _gain_coefficients(self):
+        """Per column: the most a rise and a fall of its per-capita amount can
+        add to the quality, per unit of change.
+
+        Every curve is non-decreasing with slope at most 1, so a rise of
+        ``x`` by ``d`` adds at most ``(max(w, 0) + FloorPenalty) * d`` and a
+        fall at most ``max(-w, 0) * d``. Population's per-capita amount is
+        always 1, so its column never changes.
+        """
+        rise = np.maximum(self._weights, 0)
+        floor_columns, _, floor_penalty = self._floors
+        np.add.at(rise, floor_columns, floor_penalty)
+        fall = np.maximum(-self._weights, 0)
+        rise[self._population] = fall[self._population] = 0
+        ratio_touch = np.zeros(len(self.columns))
+        waste_columns, ratio_penalty = self._ratios
+        # A ratio lies in [0, 1], so one change moves its penalty by at most
+        # RatioPenalty; it moves only when the waste or its base changes.
+        np.add.at(ratio_touch, waste_columns, ratio_penalty)
+        np.add.at(ratio_touch, self._ratio_base, ratio_penalty)
+        return rise, fall, ratio_touch
+
+    def step_bounds(self, library, resources: dict, depth_bound: int) -> Tuple[float, float]:
+        """Upper bounds on the quality change of one search step.
+
+        Amounts can only grow by what one step adds at most, and Population
+        can only fall to what ``depth_bound`` steps remove at most, so every
+        per-capita change is bounded over the whole search; the gain
+        coefficients of :meth:`_gain_coefficients` turn those into quality
+        bounds.
+
+        :param library: The compiled TemplateLibrary searched.
+        :param resources: The planning country's initial resources.
+        :param depth_bound: Number of steps the search may take.
+        :return: ``(transform_bound, transfer_bound)``, the bound over every
+            TRANSFORM variant and over every TRANSFER bundle (before the
+            search's TRANSFER penalty).
+        """
+        index, columns = self._index, len(self.columns)
+        changes = []
+        for variant in library.variants:
+            change = np.zeros(columns)
+            for res, amt in variant.transform.inputs.items():
+                if res in index:
+                    change[index[res]] -= amt
+            for res, amt in variant.transform.outputs.items():
+                if res in index:
+                    change[index[res]] += amt
+            changes.append(change)
+        changes = np.array(changes).reshape(-1, columns)
+        population_change = changes[:, self._population]
+
+        largest_rise = np.maximum(changes.max(axis=0, initial=0), 0)
+        for res in VALID_TRANSFERABLES & set(index):
+            largest_rise[index[res]] = max(largest_rise[index[res]], MAX_TRANSFER_AMOUNT)
+        initial = self.matrix((resources,))[0]
+        largest_loss = max(0.0, -population_change.min(initial=0))
+        min_population = max(1.0, initial[self._population] - depth_bound * largest_loss)
+        # Per-capita amounts can never exceed this anywhere in the search.
+        max_per_capita = (initial + depth_bound * largest_rise) / min_population
+
+        rise, fall, ratio_touch = self._gain_coefficients()
+        transform_bound = -math.inf
+        for change, d_population in zip(changes, population_change):
+            up = np.maximum(change + max_per_capita * max(-d_population, 0), 0) / min_population
+            down = np.maximum(max_per_capita * max(d_population, 0) - change, 0) / min_population
+            touched = ratio_touch[change != 0].sum()
+            transform_bound = max(transform_bound, float(rise @ up + fall @ down + touched))
+
+        # A TRANSFER moves up to MAX_BUNDLE_RESOURCES transferables in one
+        # direction; the planning country pays the energy when it sends.
+        item_gains, unit_costs = [], []
+        for res in VALID_TRANSFERABLES:
+            column = index.get(res)
+            unit_costs.append(abs(self.get(res, 1)) * TRANSFER_PENALTY_FACTOR)
+            if column is None:
+                continue
+            moved = MAX_TRANSFER_AMOUNT / min_population
+            item_gains.append(max(rise[column], fall[column]) * moved + ratio_touch[column])
+        top = MAX_BUNDLE_RESOURCES
+        transfer_bound = sum(sorted(item_gains, reverse=True)[:top])
+        energy = index.get("PotentialEnergyUsable")
+        if energy is not None:
+            cost = sum(sorted(unit_costs, reverse=True)[:top]) * MAX_TRANSFER_AMOUNT
+            transfer_bound += fall[energy] * cost / min_population + ratio_touch[energy]
+        return transform_bound, float(transfer_bound)
+
+
+def load_quality_model(weights: dict, filepath: Optional[str]) -> dict:
+    """Return ``weights`` compiled with the terms of ``filepath``, or the
+    plain weights when ``filepath`` is None."""
+    if filepath is None:
+        return weights
+    from parsers.csv_parser import parse_quality_model
+
+    return QualityModel(weights, parse_quality_model(filepath))
@@ -1,8 +1,8 @@
 """Functions to compute undiscounted and discounted rewards based on state
 quality."""
 import math
-import copy
 from itertools import product
+from transformations.transformations import as_library
 from .state_quality import compute_state_quality
 
 
@@ -11,7 +11,7 @@ def compute_undiscounted_reward(country_before, country_after, weights: dict) ->
 
     :param country_before: A Country object (before schedule)
     :param country_after: A Country object (after schedule)
-    :param weights: Dictionary of resource weights.
+    :param weights: Dictionary of resource weights, or a QualityModel.
     :return: float representing Q_end - Q_start
     """
     q_start = compute_state_quality(country_before.resources, weights)
@@ -51,57 +51,55 @@ def logistic(x: float) -> float:
     return 1 / (1 + math.exp(-x))
 
 
-def compute_expected_utility(schedule, world, country_name: str, weights: dict, gamma: float) -> float:
+def compute_expected_utility(
+    schedule, world, country_name: str, weights: dict, gamma: float, samples: int = 2000, seed: int = 0
+) -> float:
     """
     Computes the expected utility for a given schedule applied to a world state
     for a specific country.
 
+    The schedule is simulated under ``samples`` sampled TRANSFORM yields by
+    :class:`evaluations.monte_carlo.ScheduleSimulator`, skipping transforms
+    whose inputs or ``required`` resources are missing, and the mean
+    discounted reward is returned.
+    Use the simulator directly for the variance and the success rate.
+
     :param schedule: A list of (transform, country_name) pairs.
     :type schedule: list
     :param world: A World object containing Country objects.
     :type world: World
     :param country_name: The country to compute utility for.
     :type country_name: str
-    :param weights: Dictionary of resource weights.
+    :param weights: Dictionary of resource weights, or a QualityModel.
     :type weights: dict
     :param gamma: Discount factor.
     :type gamma: float
+    :param samples: Number of Monte Carlo samples.
+    :type samples: int
+    :param seed: Seed of the sampled yields.
+    :type seed: int
     :return: The expected utility value for the given schedule and country.
     :rtype: float
     """
-    sim_world = copy.deepcopy(world)
-    country_before = copy.deepcopy(sim_world.get_country(country_name))
-
-    for transform, target_country in schedule:
-        if sim_world.get_country(target_country).has_resources(transform.inputs):
-            sim_world.get_country(target_country).apply_transform(
-                transform.inputs, transform.outputs
-        )
+    # Imported here: it loads numpy, which plain scheduler runs never need.
+    from evaluations.monte_carlo import ScheduleSimulator
 
-
-    country_after = sim_world.get_country(country_name)
-    reward = compute_discounted_reward(
-        country_before, country_after, steps=len(schedule), gamma=gamma, weights=weights
-    )
-    return logistic(reward)
+    simulator = ScheduleSimulator(world, country_name, weights, samples=samples, seed=seed, gamma=gamma)
+    return simulator.estimate(schedule).mean
 
 
 def generate_schedules(transform_templates, country_name: str, max_length: int = 2, scales=[1, 3, 5]):
     """
     Generate all possible transform schedules for a specific country.
 
-    :param transform_templates: List of base TransformTemplate objects.
+    :param transform_templates: A TemplateLibrary or a list of base TransformTemplate objects.
     :param country_name: The name of the country these transforms apply to.
     :param max_length: Maximum number of transforms in a schedule.
     :param scales: List of scaling factors to apply to each template.
     :return: List of schedules, where each schedule is a list of (transform, country_name) pairs.
     """
-    all_scaled_transforms = []
-
-    for template in transform_templates:
-        for scale in scales:
-            scaled = template.scale(scale)
-            all_scaled_transforms.append((scaled, country_name))
+    library = as_library(transform_templates, scales)
+    all_scaled_transforms = [(variant.transform, country_name) for variant in library.variants]
 
     all_schedules = []
     for length in range(1, max_length + 1):
@@ -1,6 +1,12 @@
 """Functions to compute state quality based on the country resources."""
 
 
+def is_quality_model(weights: dict) -> bool:
+    """Return True if ``weights`` is a compiled
+    :class:`evaluations.quality_model.QualityModel` rather than plain weights."""
+    return getattr(weights, "is_quality_model", False)
+
+
 def compute_state_quality(country_resources: dict, weights: dict) -> float:
     """Calculates the quality score of a state based on its available resources
     and population.
@@ -10,13 +16,20 @@ def compute_state_quality(country_resources: dict, weights: dict) -> float:
     wastes, then normalizes this sum by the population to provide a per-
     capita quality score. Negative weights are used for waste resources
     to penalize their presence.
+
+    If ``weights`` is a :class:`~evaluations.quality_model.QualityModel`,
+    its non-linear quality is returned instead.
     :param country_resources: dict A dictionary containing resource
         names as keys and their corresponding quantities as values. Must
         include the key "Population" for normalization.
+    :param weights: Dictionary of resource weights, or a QualityModel.
     :return: float The computed state quality score per capita. Returns
         negative infinity if population is zero.
     """
 
+    if is_quality_model(weights):
+        return weights.quality(country_resources)
+
     population = country_resources.get("Population", 0)
     if population == 0:
         return float("-inf")
@@ -12,13 +12,14 @@ from evaluations.schedule_evaluation import (
     generate_schedules
 )
 from parsers.csv_parser import parse_country_resources, parse_resource_weights
-from scheduler import country_scheduler
-from visualizations.plot_schedule import plot_schedule_log
-from visualizations.resourcetracking import plot_schedule_log
+import cli
 
 
-def main():
-    """Run the country scheduler for a selected country."""
+def main(argv=None):
+    """Run the country scheduler for a selected country.
+
+    :param argv: Command-line arguments; see ``python main.py --help``.
+    """
 
     # ------------------------------------------------------
     # Old simulation and transform schedule logic (commented)
@@ -89,23 +90,10 @@ def main():
     # -----------------------------------------------
     # ✅ Final scheduler: Depth-bounded, utility-driven
     # -----------------------------------------------
-    print("\n--- Running Full Anytime Scheduler ---")
-    country_scheduler(
-        your_country_name="Atlantis",
-        resources_filename="data/weights.csv",
-        initial_state_filename="data/resources.csv",
-        output_schedule_filename="output/schedule_atlantis.txt",
-        num_output_schedules=5,
-        depth_bound=3,
-        frontier_max_size=100,
-        track_resource_deltas=True
-    )
-    print("Scheduler complete. Results written to output/schedule_atlantis.txt")
+    # Paths, search knobs and plotting are command-line options (see cli.py);
+    # the defaults plan Atlantis at depth 3 and plot the schedule log.
+    return cli.main(argv)
+
 
-    plot_schedule_log(
-    json_path="output/schedule_log.json",
-    output_path="output/schedule_plot.png",
-    initial_resources_path="data/resources.csv"
-    )   
 if __name__ == "__main__":
     main()
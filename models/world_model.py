@@ -3,6 +3,9 @@ transfers."""
 
 from typing import List, Tuple
 
+# Marks a resource that did not exist before a change, so undo can remove it.
+_MISSING = object()
+
 
 class Country:
     """Represents a country with a set of resources and provides methods to
@@ -140,7 +143,58 @@ class World:
             sender.resources[resource] -= amount
             receiver.resources[resource] = receiver.resources.get(resource, 0) + amount
             # print(f"{sender.name} transferred {amount} {resource} to {receiver.name}.")
-    
+
+    def apply_changes(self, changes) -> List[Tuple[str, str, object]]:
+        """Apply sparse resource changes in place and return how to undo them.
+
+        No feasibility checks are made; callers apply only actions that were
+        generated as feasible for the current state.
+
+        :param changes: Iterable of ``(country_name, resource, amount)`` triples,
+            applied in order.
+        :return: Undo entries of ``(country_name, resource, previous_value)``,
+            to be passed to :meth:`undo_changes`.
+        :raises ValueError: If a country is not found.
+        """
+        undo = []
+        for name, resource, amount in changes:
+            resources = self.get_country(name).resources
+            undo.append((name, resource, resources.get(resource, _MISSING)))
+            resources[resource] = resources.get(resource, 0) + amount
+        return undo
+
+    def undo_changes(self, undo: List[Tuple[str, str, object]]):
+        """Revert changes recorded by :meth:`apply_changes`, restoring exact
+        previous values.
+
+        :param undo: Undo entries returned by :meth:`apply_changes`.
+        """
+        for name, resource, previous in reversed(undo):
+            resources = self.countries[name].resources
+            if previous is _MISSING:
+                del resources[resource]
+            else:
+                resources[resource] = previous
+
+    def undo_delta(self, undo: List[Tuple[str, str, object]], country_name: str) -> dict:
+        """Return the net change to one country made since ``undo`` was
+        recorded, in the same form as a full before/after comparison.
+
+        :param undo: Undo entries returned by :meth:`apply_changes`.
+        :param country_name: The country whose change is wanted.
+        :return: Mapping of resource to non-zero change.
+        """
+        resources = self.get_country(country_name).resources
+        before = {}
+        for name, resource, previous in undo:
+            if name == country_name and resource not in before:
+                before[resource] = 0 if previous is _MISSING else previous
+        return {
+            resource: resources.get(resource, 0) - old
+            for resource, old in before.items()
+            if resources.get(resource, 0) != old
+        }
+
     def clone(self):
         """Return a deep copy of the world state (used for search branching)."""
         cloned_countries = [
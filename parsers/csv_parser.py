@@ -4,6 +4,7 @@ resource weights.
 This module provides helper functions to read CSV files that define:
 1. Each country's resource quantities.
 2. Resource weights used in computing state quality.
+3. Non-linear quality-model terms (see :mod:`evaluations.quality_model`).
 """
 
 import csv
@@ -49,3 +50,68 @@ def parse_resource_weights(filepath):
         for row in reader:
             weights[row["Resource"]] = float(row["Weight"])
     return weights
+
+
+def parse_weight_sets(filepath):
+    """Parses a CSV file of several named weight sets, for weight sweeps.
+
+    The file is expected to have a 'Resource' column followed by one column
+    per weight set, named in the header. An empty cell leaves the resource
+    out of that set. A plain weights file is read as one set named 'Weight'.
+
+    :param filepath: The path to the CSV file containing the weight sets.
+    :type filepath: str
+    :return: A dictionary mapping each set name to its weights dictionary,
+        in column order.
+    :rtype: dict
+    """
+    weight_sets = {}
+    with open(filepath, newline="", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        names = [name for name in reader.fieldnames if name != "Resource"]
+        for name in names:
+            weight_sets[name] = {}
+        for row in reader:
+            for name in names:
+                if row[name] not in ("", None):
+                    weight_sets[name][row["Resource"]] = float(row[name])
+    return weight_sets
+
+
+def parse_quality_model(filepath):
+    """Parses a CSV file of non-linear state-quality terms, one row per resource.
+
+    The file has a 'Resource' column and any of the optional columns
+    'Curve' (``linear``, ``log`` or ``saturating``), 'Scale', 'Floor',
+    'FloorPenalty', 'WasteOf' and 'RatioPenalty'; empty cells keep the
+    defaults. See :class:`evaluations.quality_model.QualityModel` for what
+    they mean.
+
+    :param filepath: The path to the CSV file containing the terms.
+    :type filepath: str
+    :return: One dictionary per row, with the keys ``resource``, ``curve``,
+        ``scale``, ``floor``, ``floor_penalty``, ``waste_of`` and
+        ``ratio_penalty`` (None where the cell is empty).
+    :rtype: list
+    """
+
+    def cell(row, name, convert=float):
+        value = (row.get(name) or "").strip()
+        return convert(value) if value else None
+
+    terms = []
+    with open(filepath, newline="", encoding="utf-8") as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            terms.append(
+                {
+                    "resource": row["Resource"].strip(),
+                    "curve": cell(row, "Curve", str),
+                    "scale": cell(row, "Scale"),
+                    "floor": cell(row, "Floor"),
+                    "floor_penalty": cell(row, "FloorPenalty"),
+                    "waste_of": cell(row, "WasteOf", str),
+                    "ratio_penalty": cell(row, "RatioPenalty"),
+                }
+            )
+    return terms
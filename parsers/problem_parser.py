@@ -0,0 +1,34 @@
+"""Loading a whole planning problem: the world, the weights and the templates.
+
+Kept below :mod:`scheduler` so that search modules (e.g. :mod:`search.shared`)
+can load problems without importing the scheduler that imports them.
+"""
+
+from models.world_model import Country, World
+from parsers.csv_parser import parse_country_resources, parse_resource_weights
+from parsers.template_parser import load_template_library
+from transformations.transformations import DEFAULT_SCALES
+
+
+def load_problem(
+    resources_filename, initial_state_filename, templates_filename, scales=None, quality_model_filename=None
+):
+    """Load the world, the resource weights and the compiled templates.
+
+    :param scales: Scale factors to compile every template at; defaults to
+        ``DEFAULT_SCALES``.
+    :param quality_model_filename: Optional quality-model CSV (see
+        ``data/quality_model.csv``); the weights are then returned compiled
+        into a :class:`~evaluations.quality_model.QualityModel`.
+    :return: ``(world, weights, template_library)``.
+    """
+    country_data = parse_country_resources(initial_state_filename)
+    weights = parse_resource_weights(resources_filename)
+    if quality_model_filename is not None:
+        # Imported here: it loads numpy.
+        from evaluations.quality_model import load_quality_model
+
+        weights = load_quality_model(weights, quality_model_filename)
+    countries = [Country(name, res) for name, res in country_data.items()]
+    library = load_template_library(templates_filename, DEFAULT_SCALES if scales is None else tuple(scales))
+    return World(countries), weights, library
@@ -0,0 +1,62 @@
+"""Lazy reader for schedule logs written by the scheduler.
+
+Logs are JSON Lines, one schedule record per line, optionally gzip-compressed.
+Older logs stored as a single JSON array are still accepted.
+"""
+
+import gzip
+import json
+from typing import Iterator
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _open_log(filepath):
+    """Open a log for text reading, detecting gzip by its magic bytes."""
+    with open(filepath, "rb") as probe:
+        magic = probe.read(2)
+    if magic == _GZIP_MAGIC:
+        return gzip.open(filepath, "rt", encoding="utf-8")
+    return open(filepath, encoding="utf-8")
+
+
+def iter_schedule_log(filepath) -> Iterator[dict]:
+    """Yields schedule records from a log file one at a time.
+
+    Records that are still being written (a truncated last line or gzip
+    member) are skipped, so a log can be read while the scheduler is running.
+
+    :param filepath: Path to a ``.jsonl``, ``.jsonl.gz`` or legacy ``.json`` log.
+    :type filepath: str
+    :return: An iterator of schedule dictionaries with ``schedule_num``,
+        ``final_eu`` and ``actions`` keys.
+    :rtype: Iterator[dict]
+    """
+    with _open_log(filepath) as log_file:
+        first = log_file.read(1)
+        while first.isspace():
+            first = log_file.read(1)
+        if first == "[":
+            yield from json.loads(first + log_file.read())
+            return
+        pending = first
+        lines = iter(log_file)
+        while True:
+            try:
+                line = pending + next(lines)
+            except StopIteration:
+                line = pending
+            except EOFError:
+                return
+            if not line:
+                return
+            pending = ""
+            if not line.strip():
+                continue
+            if not line.endswith("\n"):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    pass
+                return
+            yield json.loads(line)
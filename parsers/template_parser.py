@@ -0,0 +1,202 @@
+"""Parsing utilities for TRANSFORM template files.
+
+Templates are written as parenthesised forms, one per transformation::
+
+    (TRANSFORM Housing
+        (INPUTS (Timber 4) (Water 3))
+        (OUTPUTS (Housing 3) (HousingWaste 2))
+        (REQUIRED (Population 5)))
+
+Lines starting with ``;`` are comments. Parsed templates are compiled into a
+TemplateLibrary and cached by the SHA-256 digest of the file, so every entry
+point that loads the same file shares one compiled library.
+"""
+
+import hashlib
+import math
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from transformations.transformations import DEFAULT_SCALES, TemplateLibrary, TransformTemplate
+
+SECTIONS = ("INPUTS", "OUTPUTS", "REQUIRED")
+
+_TOKEN_RE = re.compile(r"(;[^\n]*)|(\()|(\))|([^\s();]+)|(\n)")
+_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_LIBRARY_CACHE: Dict[Tuple[str, Tuple[int, ...]], TemplateLibrary] = {}
+
+
+def _tokenize(text: str, source: str) -> List[Tuple[str, int]]:
+    """Split template source into ``(token, line_number)`` pairs."""
+    tokens = []
+    line = 1
+    pos = 0
+    for match in _TOKEN_RE.finditer(text):
+        gap = text[pos:match.start()]
+        if gap.strip():
+            raise ValueError(f"{source}:{line}: unexpected text {gap.strip()!r}")
+        pos = match.end()
+        comment, open_paren, close_paren, atom, newline = match.groups()
+        if newline:
+            line += 1
+        elif comment:
+            continue
+        else:
+            tokens.append((open_paren or close_paren or atom, line))
+    if text[pos:].strip():
+        raise ValueError(f"{source}:{line}: unexpected text {text[pos:].strip()!r}")
+    return tokens
+
+
+def _read_forms(tokens: List[Tuple[str, int]], source: str) -> list:
+    """Group tokens into nested lists of ``(atom, line)`` pairs."""
+    stack: list = [[]]
+    open_lines = []
+    for token, line in tokens:
+        if token == "(":
+            stack.append([])
+            open_lines.append(line)
+        elif token == ")":
+            if len(stack) == 1:
+                raise ValueError(f"{source}:{line}: unbalanced ')'")
+            form = stack.pop()
+            stack[-1].append((form, open_lines.pop()))
+        else:
+            stack[-1].append((token, line))
+    if open_lines:
+        raise ValueError(f"{source}:{open_lines[-1]}: unclosed '('")
+    return stack[0]
+
+
+def _parse_amount(token: str, source: str, line: int) -> float:
+    """Parse a quantity as int when possible, otherwise float."""
+    try:
+        return int(token)
+    except ValueError:
+        pass
+    try:
+        value = float(token)
+    except ValueError as exc:
+        raise ValueError(f"{source}:{line}: invalid amount {token!r}") from exc
+    if not math.isfinite(value):
+        raise ValueError(f"{source}:{line}: amount must be finite, got {token!r}")
+    return value
+
+
+def _parse_section(items: list, section: str, source: str, line: int) -> dict:
+    """Parse the ``(Resource Amount)`` entries of one section."""
+    amounts = {}
+    for entry, entry_line in items:
+        if (
+            not isinstance(entry, list)
+            or len(entry) != 2
+            or any(isinstance(part, list) for part, _ in entry)
+        ):
+            raise ValueError(f"{source}:{entry_line}: {section} entries must be (Resource Amount)")
+        (resource, _), (amount_token, _) = entry
+        if not _NAME_RE.match(resource):
+            raise ValueError(f"{source}:{entry_line}: invalid resource name {resource!r}")
+        if resource in amounts:
+            raise ValueError(f"{source}:{entry_line}: duplicate resource {resource!r} in {section}")
+        amount = _parse_amount(amount_token, source, entry_line)
+        if section != "OUTPUTS" and amount <= 0:
+            raise ValueError(f"{source}:{entry_line}: {section} amounts must be positive")
+        amounts[resource] = amount
+    if not amounts:
+        raise ValueError(f"{source}:{line}: empty {section} section")
+    return amounts
+
+
+def _parse_template(form: list, source: str, line: int) -> TransformTemplate:
+    """Build one TransformTemplate from a parsed ``(TRANSFORM ...)`` form."""
+    if len(form) < 2 or isinstance(form[0][0], list) or form[0][0] != "TRANSFORM":
+        raise ValueError(f"{source}:{line}: expected (TRANSFORM <Name> ...)")
+    name, name_line = form[1]
+    if isinstance(name, list) or not _NAME_RE.match(name):
+        raise ValueError(f"{source}:{name_line}: invalid template name")
+
+    sections = {}
+    for section_form, section_line in form[2:]:
+        if not isinstance(section_form, list) or not section_form:
+            raise ValueError(f"{source}:{section_line}: expected a section in template {name}")
+        header, _ = section_form[0]
+        if header not in SECTIONS:
+            raise ValueError(f"{source}:{section_line}: unknown section {header!r} in template {name}")
+        if header in sections:
+            raise ValueError(f"{source}:{section_line}: duplicate {header} in template {name}")
+        sections[header] = _parse_section(section_form[1:], header, source, section_line)
+
+    if "OUTPUTS" not in sections:
+        raise ValueError(f"{source}:{line}: template {name} has no OUTPUTS")
+    return TransformTemplate(
+        name=name,
+        inputs=sections.get("INPUTS", {}),
+        outputs=sections["OUTPUTS"],
+        required=sections.get("REQUIRED", {}),
+    )
+
+
+def parse_transform_templates_text(text: str, source: str = "<string>") -> List[TransformTemplate]:
+    """Parses TRANSFORM templates from a string.
+
+    :param text: Template source text.
+    :type text: str
+    :param source: Name used in error messages.
+    :type source: str
+    :return: The templates, in the order they appear.
+    :rtype: list
+    :raises ValueError: If the text is malformed or a template is invalid.
+    """
+    templates = []
+    names = set()
+    for form, line in _read_forms(_tokenize(text, source), source):
+        if not isinstance(form, list):
+            raise ValueError(f"{source}:{line}: unexpected atom {form!r} outside a template")
+        template = _parse_template(form, source, line)
+        if template.name in names:
+            raise ValueError(f"{source}:{line}: duplicate template {template.name!r}")
+        names.add(template.name)
+        templates.append(template)
+    return templates
+
+
+def parse_transform_templates(filepath) -> List[TransformTemplate]:
+    """Parses a text file of TRANSFORM templates.
+
+    :param filepath: The path to the template file.
+    :type filepath: str
+    :return: The templates, in the order they appear in the file.
+    :rtype: list
+    :raises ValueError: If the file is malformed or a template is invalid.
+    """
+    with open(filepath, encoding="utf-8") as template_file:
+        return parse_transform_templates_text(template_file.read(), str(filepath))
+
+
+def load_template_library(filepath, scales: Iterable[int] = DEFAULT_SCALES) -> TemplateLibrary:
+    """Loads a compiled TemplateLibrary, reusing a cached one when the file
+    content has not changed.
+
+    :param filepath: The path to the template file.
+    :type filepath: str
+    :param scales: Scale factors to precompile for every template.
+    :return: The compiled library for the file's current content.
+    :rtype: TemplateLibrary
+    :raises ValueError: If the file is malformed or a template is invalid.
+    """
+    with open(filepath, "rb") as template_file:
+        raw = template_file.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    key = (digest, tuple(scales))
+    library = _LIBRARY_CACHE.get(key)
+    if library is None:
+        templates = parse_transform_templates_text(raw.decode("utf-8"), str(filepath))
+        library = TemplateLibrary(templates, scales, digest)
+        _LIBRARY_CACHE[key] = library
+    return library
+
+
+def clear_template_cache():
+    """Drop every cached TemplateLibrary."""
+    _LIBRARY_CACHE.clear()
@@ -1,17 +1,26 @@
-import heapq
 import itertools
-import os
-import json
+import math
+import contextlib
 import csv
+import os
+import time
 
-from dataclasses import dataclass
-from typing import List
-from models.world_model import World, Country
-from transformations.transformations import generate_successors, TransformTemplate
-from parsers.csv_parser import parse_country_resources, parse_resource_weights
+from dataclasses import dataclass, field, replace
+from models.world_model import World
+from parsers.problem_parser import load_problem
 from evaluations.state_quality import compute_state_quality
+from cache.result_cache import problem_key
+from search.best_first import BestFirstSearch
+from search.dfs import depth_first_search
+from search.hooks import SearchHooks
+from search.profiling import profile_capture
+from search.macros import compile_macros
+from search.mcts import root_parallel_mcts
+from search.options import SearchOptions
+from search.ranking import TopKSchedules, optimistic_step_gain, score_schedule
+from search.replan import TranspositionTable, changes_from_deltas, replay_schedule
+from writers.schedule_writer import ScheduleWriter
 
-counter = itertools.count()
 def load_resource_weights(path="data/weights.csv"):
     weights = {}
     with open(path, newline='') as csvfile:
@@ -20,13 +29,178 @@ def load_resource_weights(path="data/weights.csv"):
             weights[row["Resource"]] = float(row["Weight"])
     return weights
 
+def open_schedule_writer(output_schedule_filename, log_filename=None, compress_log=None):
+    """Open the streaming writer; the log defaults to a ``.jsonl`` file next to
+    the text report."""
+    if log_filename is None:
+        log_filename = os.path.splitext(output_schedule_filename)[0] + ".jsonl"
+    return ScheduleWriter(output_schedule_filename, log_filename, compress=compress_log)
+
+
+def plan_schedules(
+    world,
+    weights,
+    base_transforms,
+    your_country_name,
+    options: SearchOptions,
+    on_schedule=None,
+    hooks=None,
+    transpositions=None,
+    seeds=(),
+    stats=None,
+):
+    """Search an already loaded world for one country's best schedules.
+
+    The search itself is run by the module of ``options.search_mode``:
+    :mod:`search.best_first`, :mod:`search.dfs` or :mod:`search.hda`.
+
+    :param world: The world to plan in; left unchanged.
+    :param weights: Dictionary of resource weights.
+    :param base_transforms: The compiled TemplateLibrary.
+    :param your_country_name: Name of the planning country.
+    :param options: The :class:`~search.options.SearchOptions`.
+    :param on_schedule: Called as ``on_schedule(actions, eus, deltas)`` for
+        every schedule once its place in the top-k is final, best first.
+    :param hooks: Hook objects receiving search events (see :mod:`search.hooks`).
+        They are not called by the hda mode, since its search runs in other
+        processes; pass ``stats`` instead.
+    :param transpositions: A :class:`search.replan.TranspositionTable` that
+        best-first nodes are reused from and recorded into, so a later search
+        from a slightly changed world repairs them instead of rebuilding them.
+        Not used with macros or by the dfs mode.
+    :param seeds: Complete ``(actions, eus, deltas)`` schedules already
+        known to be feasible in this world, e.g. the last turn's best
+        replayed. They are ranked along with the schedules found, and once
+        there are ``num_output_schedules`` of them the worst one's score
+        prunes the search from its first expansion.
+    :param stats: Optional dictionary that receives the hda mode's counters.
+    :return: The ranked top schedules as ``(actions, eus, deltas)`` tuples.
+    """
+    deadline = None if options.time_budget is None else time.monotonic() + options.time_budget
+    self_resources = world.get_country(your_country_name).resources
+    initial_eu = compute_state_quality(self_resources, weights)
+    step_gain = optimistic_step_gain(
+        base_transforms, weights, self_resources.get("Population", 0), options.depth_bound, self_resources
+    )
+    # Macro-actions advance several steps at once; two macros can lead to the
+    # same schedule, so the top-k dedupes.
+    macro_actions = compile_macros(options.macros or (), your_country_name, base_transforms, weights)
+    seeds = sorted(seeds, key=lambda seed: -score_schedule(*seed[:2]))
+    floor = float("-inf")
+    if 0 < options.num_output_schedules <= len(seeds):
+        # Leave room for rounding: the search may find these schedules again.
+        floor = score_schedule(*seeds[options.num_output_schedules - 1][:2])
+        floor -= 1e-9 * max(1.0, abs(floor))
+    top_schedules = TopKSchedules(options.num_output_schedules, unique=bool(macro_actions or seeds), floor=floor)
+    events = SearchHooks(hooks or ())
+
+    if options.search_mode == "best_first":
+        search = BestFirstSearch(
+            world, your_country_name, base_transforms, weights, options, top_schedules, step_gain,
+            macro_actions, events, deadline, on_schedule, None if macro_actions else transpositions,
+        )
+        search.run(initial_eu, seeds)
+        return top_schedules.ranked()
+    if options.search_mode == "dfs":
+        # Schedules are ranked only once the enumeration finishes.
+        for seed in seeds:
+            top_schedules.offer(score_schedule(*seed[:2]), seed)
+        depth_first_search(
+            world, your_country_name, base_transforms, weights, options.depth_bound, top_schedules, step_gain,
+            options.partial_order_reduction, macro_actions, events, deadline,
+        )
+    else:
+        # Imported here: it loads the process machinery and numpy.
+        from search.hda import hash_distributed_search
+
+        ranked = hash_distributed_search(
+            world, weights, base_transforms, your_country_name, options.num_output_schedules,
+            options.depth_bound, options.frontier_max_size, options.workers, options.partial_order_reduction,
+            deadline, options.frontier_memory, floor=floor, stats=stats,
+        )
+        for schedule in itertools.chain(ranked, seeds):
+            top_schedules.offer(score_schedule(*schedule[:2]), schedule)
+    if on_schedule is not None:
+        for actions, eus, deltas in top_schedules.ranked():
+            on_schedule(actions, eus, deltas)
+    return top_schedules.ranked()
+
+
 @dataclass
-class Schedule:
-    actions: List[str]
+class SearchState:
+    """What one search leaves behind for the next turn's replanning.
+
+    :ivar world: The world last planned in; :func:`replan_schedules` owns it
+        and applies the observed changes to it.
+    :ivar ranked: The schedules that search returned.
+    :ivar transpositions: Its best-first nodes, by action path.
+    :ivar problem: The country, weights and templates the nodes were scored
+        with; the table is dropped when they change.
+    """
     world: World
-    eus: List[float]
-    deltas: List[dict]  
-    depth: int
+    ranked: list = field(default_factory=list)
+    transpositions: TranspositionTable = field(default_factory=TranspositionTable)
+    problem: tuple = None
+
+    @classmethod
+    def start(cls, world, max_entries=100_000):
+        """Return an empty state planning from a copy of ``world``."""
+        return cls(world.clone(), transpositions=TranspositionTable(max_entries))
+
+
+def replan_schedules(
+    state,
+    observed_deltas,
+    weights,
+    base_transforms,
+    your_country_name,
+    options: SearchOptions,
+    on_schedule=None,
+    hooks=None,
+):
+    """Plan again after the world changed, warm-started from the last search.
+
+    The observed changes are applied to ``state.world``. The previous best
+    schedules are replayed on it and those still feasible seed the new
+    search (see the ``seeds`` of :func:`plan_schedules`).
+    Best-first nodes of earlier searches are reused through
+    ``state.transpositions`` (see :mod:`search.replan`), repaired only where
+    the changes reach them. Without frontier eviction or a time budget the
+    schedules ranked score the same as those of a cold
+    :func:`plan_schedules` on the changed world; equal scores may be broken
+    differently.
+
+    :param state: A :class:`SearchState`, updated in place; start one with
+        :meth:`SearchState.start`.
+    :param observed_deltas: ``{country: {resource: change}}`` seen since the
+        last search, or None for no change.
+    :param options: As for :func:`plan_schedules`.
+    :param on_schedule: As for :func:`plan_schedules`.
+    :param hooks: As for :func:`plan_schedules`.
+    :return: The ranked top schedules as ``(actions, eus, deltas)`` tuples.
+    """
+    problem = (
+        your_country_name, tuple(sorted(weights.items())), getattr(weights, "spec", None), id(base_transforms)
+    )
+    if state.problem != problem:
+        state.transpositions.clear()
+        state.problem = problem
+    changes = changes_from_deltas(observed_deltas or {})
+    if changes:
+        state.world.apply_changes(changes)
+        state.transpositions.advance(changes)
+
+    replayed = (
+        replay_schedule(state.world, your_country_name, actions, base_transforms, weights)
+        for actions, _, _ in state.ranked
+        if len(actions) == options.depth_bound
+    )
+    state.ranked = plan_schedules(
+        state.world, weights, base_transforms, your_country_name, options, on_schedule=on_schedule, hooks=hooks,
+        transpositions=state.transpositions if options.search_mode == "best_first" else None,
+        seeds=[seed for seed in replayed if seed is not None],
+    )
+    return state.ranked
 
 
 def country_scheduler(
@@ -37,330 +211,196 @@ def country_scheduler(
     num_output_schedules,
     depth_bound,
     frontier_max_size,
-    track_resource_deltas=False
+    track_resource_deltas=False,
+    *,
+    options=None,
+    templates_filename="data/templates.txt",
+    log_filename=None,
+    compress_log=None,
+    scales=None,
+    quality_model_filename=None,
+    cache=None,
+    hooks=None,
+    profile=None,
+    trace_filename=None,
+    stats=None,
+    success_samples=None,
 ):
-    schedule_resource_deltas = []
+    """Load a problem from files, plan one country's best schedules and write
+    them to the text report and JSONL log.
 
-    # 1. Load data
-    country_data = parse_country_resources(initial_state_filename)
-    weights = parse_resource_weights(resources_filename)
-    countries = [Country(name, res) for name, res in country_data.items()]
-    world = World(countries)
-
-    # 2. Load transform templates
-    base_transforms = [
-        TransformTemplate(
-            name="Housing",
-            inputs={
-                "AvailableLand": 1,
-                "Water": 3,
-                "MetallicElements": 1,
-                "Timber": 4,
-                "MetallicAlloys": 3,
-                "PotentialEnergyUsable": 2,
-            },
-            outputs={
-                "Housing": 3,
-                "HousingWaste": 2,
-            },
-            required={
-                "Population": 5
-            }
-        ),
-        TransformTemplate(
-            name="Alloys",
-            inputs={
-                "MetallicElements": 2,
-                "PotentialEnergyUsable": 2,
-                "Water": 2,
-            },
-            outputs={
-                "MetallicAlloys": 3,
-                "MetallicAlloysWaste": 1,
-                "Water": 1,
-            },
-            required={
-                "Population": 1
-            }
-        ),
-        TransformTemplate(
-            name="Electronics",
-            inputs={
-                "MetallicElements": 2,
-                "MetallicAlloys": 1,
-                "PotentialEnergyUsable": 2,
-                "Water": 2,
-            },
-            outputs={
-                "Electronics": 3,
-                "ElectronicsWaste": 1,
-            },
-            required={
-                "Population": 1
-            }
-        ),
-        TransformTemplate(
-            name="TrainSkilledLabor",
-            inputs={
-                "Population": 1,  
-                "Education": 2,
-                "Water": 1,
-                "PotentialEnergyUsable": 2,
-            },
-            outputs={
-                "SkilledLabor": 1
-            }
-        ),
-        TransformTemplate(
-            name="Birth",
-            inputs={
-                "Food": 2,
-                "Water": 1,
-            },
-            outputs={
-                "Population": 1,
-                "FoodWaste": 0.5,
-            },
-            required={
-                "Population": 2
-            }
-        ),
-        TransformTemplate(
-            name="Farm",
-            inputs={
-                "AvailableLand": 2,
-                "Water": 5,
-                "PotentialEnergyUsable": 2
-            },
-            outputs={
-                "Food": 6,
-            },
-            required={
-                "Population": 2,
-                "SkilledLabor": 2,
-
-            }
-        ),
-        TransformTemplate(
-            name="MineAlloys",
-            inputs={
-                "PotentialEnergyUsable": 2,
-                "Water": 2
-            },
-            outputs={
-                "MetallicAlloys": 3,
-                "MetallicAlloysWaste": 1
-            },
-            required={
-                "SkilledLabor": 2,
-                "Factories": 1
-            }
-        ),
-        TransformTemplate(
-            name="ExtractWater",
-            inputs={
-                "PotentialEnergyUsable": 4
-            },
-            outputs={
-                "Water": 5
-            },
-            required={
-                "Population": 1,
-                "SkilledLabor": 1
-
-            }
-        ),
-        TransformTemplate(
-            name="Lumber",
-            inputs={
-                "AvailableLand": 1,
-                "PotentialEnergyUsable": 1
-            },
-            outputs={
-                "Timber": 10
-            },
-            required={
-                "Population": 1,
-            }
-        ),
-        TransformTemplate(
-            name="BurnTimber",
-            inputs={
-                "Timber": 5,
-            },
-            outputs={
-                "PotentialEnergyUsable": 2,
-                "AvailableLand": -0.2
-            },
-            required={
-                "Population": 1,
-                "SkilledLabor": 1
-
-            }
-        ),
-        TransformTemplate(
-            name="SolarPower",
-            inputs={
-                "Electronics": 1
-            },
-            outputs={
-                "PotentialEnergyUsable": 1
-            },
-            required={
-                "SkilledLabor": 1,
-                "AvailableLand": 1
-            }
-        ),
-
-        TransformTemplate(
-            name="HydroPower",
-            inputs={},
-            outputs={
-                "PotentialEnergyUsable": 1
-            },
-            required={
-                "Water": 5,
-                "Population": 2,
-                "Dam": 1
-            }
-        ),
-        TransformTemplate(
-            name="BuildDam",
-            inputs={
-                "Timber": 10,
-                "MetallicAlloys": 10,
-                "MetallicElements": 5,
-                "PotentialEnergyUsable": 10,
-                "AvailableLand": 3,
-                "Water": 5
-            },
-            outputs={
-                "Dam": 1,
-                "HousingWaste": 2
-            },
-            required={
-                "SkilledLabor": 5,
-            }
-        ),
-        TransformTemplate(
-            name="BuildFactory",
-            inputs={
-                "MetallicAlloys": 8,
-                "Timber": 8,
-                "PotentialEnergyUsable": 8,
-            },
-            outputs={
-                "Factories": 1,
-                "HousingWaste": 1,
-            },
-            required={
-                "SkilledLabor": 2,
-                "Population": 5
-            }
-        ),
-        TransformTemplate(
-            name="RecycleElectronics",
-            inputs={"ElectronicsWaste": 3, "PotentialEnergyUsable": 2},
-            outputs={"MetallicAlloys": 1},
-            required={"SkilledLabor": 1, "Factories": 1}
-        ),
-        TransformTemplate(
-            name="CompostFood",
-            inputs={
-                "FoodWaste": 10
-            },
-            outputs={
-                "FoodWaste": 8
-            },
-            required={
-                "Population": 2
-            }
-        ),
-    ]
-
-    # 3. Initialize search
-    initial_eu = compute_state_quality(world.get_country(your_country_name).resources, weights)
-    initial_schedule = Schedule([], world, [initial_eu], [], 0)
-    frontier = [(-initial_eu, next(counter), initial_schedule)]
-    heapq.heapify(frontier)
-    complete_schedules = []
-    resource_weights = load_resource_weights()
-
-    
-    # 4. Search loop
-    while frontier:
-        _, _, schedule = heapq.heappop(frontier)
-
-        if schedule.depth == depth_bound:
-            complete_schedules.append((schedule.actions, schedule.eus, schedule.deltas))
-            if track_resource_deltas:
-                schedule_resource_deltas.append(schedule.deltas)
-            continue
-
-            
-        successors = generate_successors(schedule.world, your_country_name, base_transforms, weights)
-
-        for action_str, new_world, delta, delta_score in successors:
-            new_country = new_world.get_country(your_country_name)
-            new_eu = compute_state_quality(new_country.resources, weights)
-
-
-            # Penalize transfers and score based on delta
-            penalty = 0
-            if "TRANSFER" in action_str:
-                penalty = 10  # You can tune this
-            score = delta_score - penalty
-
-            print(f"{action_str} | ΔScore: {delta_score:.2f} | Raw EU: {new_eu:.2f} | Penalized Score: {score:.2f}")
-
-            new_schedule = Schedule(
-                actions=schedule.actions + [action_str],
-                world=new_world,
-                eus=schedule.eus + [schedule.eus[-1] + score],
-                deltas=schedule.deltas + [delta],
-                depth=schedule.depth + 1
-            )
+    :param your_country_name: Name of the planning country.
+    :param resources_filename: Resource weights CSV.
+    :param initial_state_filename: Initial country resources CSV.
+    :param output_schedule_filename: Text report path; the JSONL log defaults
+        to a ``.jsonl`` file next to it.
+    :param num_output_schedules: Number of schedules ranked.
+    :param depth_bound: Number of actions in a complete schedule.
+    :param frontier_max_size: Best-first frontier size.
+    :param track_resource_deltas: Also collect every schedule's resource deltas as it is written.
+    :param options: A :class:`~search.options.SearchOptions` for the search
+        mode and its other options; its three counts are replaced by the
+        arguments above.
+    :param templates_filename: Transform templates file.
+    :param log_filename: JSONL log path.
+    :param compress_log: Compression of the JSONL log (see
+        :class:`~writers.schedule_writer.ScheduleWriter`).
+    :param scales: Scale factors to compile every template at.
+    :param quality_model_filename: Optional quality-model CSV to score
+        states with instead of the linear weights.
+    :param cache: A :class:`~cache.result_cache.ResultCache` that reruns with
+        identical inputs are answered from, or None. Time-budgeted runs
+        bypass it.
+    :param hooks: Hook objects receiving search events (see :mod:`search.hooks`).
+    :param profile: Optional cProfile/tracemalloc capture written next to the
+        text report (see :mod:`search.profiling`).
+    :param trace_filename: Optional binary trace of every search event (see
+        :mod:`search.trace`).
+    :param stats: Optional dictionary that receives the hda mode's counters
+        and, with ``success_samples``, the schedules' success estimates.
+    :param success_samples: Number of Monte Carlo samples per schedule (see
+        :mod:`evaluations.monte_carlo`), or None to skip the estimate.
+    :return: The ranked top schedules as ``(actions, eus, deltas)`` tuples.
+    """
+    options = replace(
+        options or SearchOptions(),
+        num_output_schedules=num_output_schedules,
+        depth_bound=depth_bound,
+        frontier_max_size=frontier_max_size,
+    )
+    schedule_resource_deltas = []
+    # Optional binary trace of every search event (see search.trace)
+    trace = None
+    if trace_filename is not None:
+        from search.trace import TraceRecorder
 
-            total_score = new_eu 
-            heapq.heappush(frontier, (-total_score, next(counter), new_schedule))
+        trace = TraceRecorder(trace_filename)
+        hooks = list(hooks or ()) + [trace]
+        trace.phase("load")
 
+    # 1-2. Load data and transform templates (compiled once per file content)
+    world, weights, base_transforms = load_problem(
+        resources_filename, initial_state_filename, templates_filename, scales, quality_model_filename
+    )
 
-        if len(frontier) > frontier_max_size:
-            heapq.heappop(frontier)
+    # Reruns with identical inputs are answered from the result cache, if any;
+    # time-budgeted runs depend on machine speed and bypass it
+    if options.time_budget is not None:
+        cache = None
+    key = ranked = None
+    if cache is not None:
+        params = dict(options.cache_params(), country=your_country_name)
+        key = problem_key(world, weights, base_transforms, params)
+        ranked = cache.get(key)
 
-    # 5. Output results
-    def score_schedule(actions, eus):
-    # Total utility gain across all steps
-        return sum(eus[i] - eus[i-1] for i in range(1, len(eus)))
+    # 3-4. Search, streaming results to the text report and JSONL log as they are found
+    writer = open_schedule_writer(output_schedule_filename, log_filename, compress_log)
 
-    top_schedules = complete_schedules[:num_output_schedules]
+    def record(actions, eus, deltas):
+        writer.write(actions, eus, deltas)
+        if track_resource_deltas:
+            schedule_resource_deltas.append(deltas)
 
-    os.makedirs(os.path.dirname(output_schedule_filename), exist_ok=True)
+    cached = ranked is not None
+    try:
+        if cached:
+            if trace is not None:
+                trace.phase("cached")
+                trace.final(ranked, score_schedule)
+            for schedule in ranked:
+                record(*schedule)
+        else:
+            # Optional cProfile/tracemalloc reports are written next to the schedule output
+            capture = (
+                profile_capture(os.path.splitext(output_schedule_filename)[0], profile)
+                if profile is not None else contextlib.nullcontext()
+            )
+            if trace is not None:
+                trace.phase("search")
+            with capture:
+                ranked = plan_schedules(
+                    world, weights, base_transforms, your_country_name, options, on_schedule=record,
+                    hooks=hooks, stats=stats,
+                )
+            if trace is not None:
+                trace.final(ranked, score_schedule)
+                trace.phase("finish")
+    finally:
+        writer.close()
+        if trace is not None:
+            trace.close()
+    if cache is not None and not cached:
+        cache.put(key, ranked)
+    if success_samples is not None and stats is not None:
+        # Imported here: it loads numpy.
+        from evaluations.monte_carlo import estimate_schedule_success
 
-    # Write .txt output
-    with open(output_schedule_filename, "w") as f:
-        for i, (actions, eus, _) in enumerate(top_schedules, 1):
-            f.write(f"Schedule {i} (Final EU: {eus[-1]:.2f}):\n[")
-            if len(actions) != len(eus) - 1:
-                f.write("\n  ⚠️ WARNING: actions and EU lengths mismatched!\n")
-            for j, (action, eu) in enumerate(zip(actions, eus[1:]), 1): 
-                f.write(f"\n  Step {j}: {action} EU: {eu:.2f}")
-            f.write("\n]\n\n")
+        stats["success"] = estimate_schedule_success(
+            world, your_country_name, ranked, weights, base_transforms, samples=success_samples
+        )
+    return ranked
 
 
-    # Write JSON output
-    schedule_log = [
-        {
-            "schedule_num": i + 1,
-            "final_eu": eus[-1],
-            "actions": [
-                {"action": action, "eu": eu, "delta": delta}
-                for action, eu, delta in zip(actions, eus[1:], deltas)
-            ],
-        }
-        for i, (actions, eus, deltas) in enumerate(top_schedules)
-    ]
+def mcts_scheduler(
+    your_country_name,
+    resources_filename,
+    initial_state_filename,
+    output_schedule_filename,
+    num_output_schedules,
+    depth_bound,
+    iterations=1000,
+    time_budget=None,
+    workers=1,
+    seed=0,
+    rollout_policy="random",
+    exploration=math.sqrt(2),
+    templates_filename="data/templates.txt",
+    log_filename=None,
+    compress_log=None,
+    scales=None,
+    stats=None,
+    quality_model_filename=None,
+):
+    """Plan with Monte Carlo Tree Search instead of best-first search.
 
+    MCTS samples full-length schedules, so it can reach long-horizon plays
+    (for example BuildDam followed by repeated HydroPower) at depth bounds
+    where exhaustive search is out of reach. Outputs use the same text
+    report and JSONL log as :func:`country_scheduler`.
 
-    with open("output/schedule_log.json", "w") as json_f:
-        json.dump(schedule_log, json_f, indent=2)
+    :param iterations: Total iteration budget across workers, or None.
+    :param time_budget: Wall-clock seconds per worker, or None.
+    :param workers: Number of root-parallel worker processes.
+    :param seed: Base seed; runs with an iteration budget are reproducible.
+    :param rollout_policy: ``"random"`` or epsilon-``"greedy"`` rollouts.
+    :param exploration: UCT exploration constant.
+    :param scales: Scale factors to compile every template at.
+    :param stats: Optional dictionary that receives ``"iterations"``, the
+        number of iterations run across all workers.
+    :param quality_model_filename: Optional quality-model CSV to score
+        states with instead of the linear weights.
+    :return: The ranked top schedules as ``(actions, eus, deltas)`` tuples.
+    """
+    world, weights, library = load_problem(
+        resources_filename, initial_state_filename, templates_filename, scales, quality_model_filename
+    )
+    ranked, _, total_iterations = root_parallel_mcts(
+        world,
+        your_country_name,
+        library,
+        weights,
+        depth_bound,
+        num_output_schedules,
+        iterations=iterations,
+        time_budget=time_budget,
+        workers=workers,
+        seed=seed,
+        rollout_policy=rollout_policy,
+        exploration=exploration,
+    )
+    if stats is not None:
+        stats["iterations"] = total_iterations
+    with open_schedule_writer(output_schedule_filename, log_filename, compress_log) as writer:
+        for actions, eus, deltas in ranked:
+            writer.write(actions, eus, deltas)
+    return ranked
@@ -0,0 +1,320 @@
+"""Best-first branch-and-bound search over cloned worlds.
+
+Every node owns a copy of the world. Frontier nodes are ordered by an
+optimistic bound on their final score (see :mod:`search.ranking`), so
+complete schedules are popped best first and the search stops as soon as no
+frontier node is able to enter the top-k. The frontier is trimmed to its
+maximum size after every expansion, and nodes past its memory budget are
+spilled to disk (see :mod:`search.frontier`).
+
+Template feasibility is inherited from the parent as a bitmask and
+rechecked only for templates that read a resource the last action changed.
+Nodes can be reused from a :class:`search.replan.TranspositionTable` filled
+by an earlier search.
+"""
+
+import itertools
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from models.world_model import World
+from search.frontier import SpillingFrontier
+from search.hooks import SearchHooks
+from search.macros import covered_after, follow_macro, iter_macro_actions
+from search.options import SearchOptions
+from search.por import IndependenceOracle
+from search.ranking import TopKSchedules, score_schedule, step_score
+from transformations.transformations import action_delta_score, generate_successors, iter_actions
+
+counter = itertools.count()
+
+
+@dataclass
+class Schedule:
+    """A frontier node: a partial schedule and the world it leads to.
+
+    ``covered`` holds the remaining steps of macros that an ancestor also
+    expanded and whose first steps this node's path just took (see
+    :func:`search.macros.covered_after`).
+    """
+
+    actions: List[str]
+    world: World
+    eus: List[float]
+    deltas: List[dict]
+    depth: int
+    sleep: tuple = ()
+    feasible: Optional[int] = None
+    covered: tuple = ()
+
+
+class BestFirstSearch:
+    """One best-first search, ranking schedules of ``options.depth_bound`` steps."""
+
+    def __init__(
+        self,
+        world: World,
+        country_name: str,
+        library,
+        weights: dict,
+        options: SearchOptions,
+        top_schedules: TopKSchedules,
+        step_gain: float,
+        macros=(),
+        hooks: SearchHooks = None,
+        deadline: float = None,
+        on_schedule=None,
+        transpositions=None,
+    ):
+        """Prepare a search; :meth:`run` performs it.
+
+        :param world: The world to plan in; left unchanged.
+        :param country_name: Name of the planning country.
+        :param library: The compiled TemplateLibrary.
+        :param weights: Dictionary of resource weights, or a QualityModel.
+        :param options: The :class:`SearchOptions`; ``depth_bound``,
+            ``frontier_max_size``, ``partial_order_reduction`` and
+            ``frontier_memory`` are used.
+        :param top_schedules: Receives every complete schedule good enough to rank.
+        :param step_gain: Upper bound on a single step's score.
+        :param macros: Compiled macro-actions (see :mod:`search.macros`).
+        :param hooks: Receives search events (see :mod:`search.hooks`).
+        :param deadline: :func:`time.monotonic` value after which no further
+            node is expanded, or None.
+        :param on_schedule: Called as ``on_schedule(actions, eus, deltas)`` for
+            every schedule once its place in the top-k is final, best first.
+        :param transpositions: A :class:`search.replan.TranspositionTable` that
+            nodes are reused from and recorded into, or None.
+        """
+        self.world = world
+        self.country_name = country_name
+        self.library = library
+        self.weights = weights
+        self.depth_bound = options.depth_bound
+        self.frontier_max_size = options.frontier_max_size
+        self.oracle = IndependenceOracle(country_name, library) if options.partial_order_reduction else None
+        self.top = top_schedules
+        self.step_gain = step_gain
+        self.macros = macros
+        # Unused events are None, so an unhooked search pays one check per event site.
+        self.events = hooks or SearchHooks()
+        self.deadline = deadline
+        self.on_schedule = on_schedule
+        self.transpositions = transpositions
+        self.shifts = {}
+        # Frontier nodes past the memory budget (if any) are spilled to disk.
+        self.frontier = SpillingFrontier(options.frontier_memory)
+
+    def bound(self, schedule: Schedule) -> float:
+        """Return an upper bound on the final score of any completion of ``schedule``."""
+        remaining = self.depth_bound - schedule.depth
+        return score_schedule(schedule.actions, schedule.eus) + remaining * self.step_gain
+
+    def push(self, schedule: Schedule, action_str: str, score: float):
+        """Add a child to the frontier, unless it cannot reach the top-k."""
+        events = self.events
+        if events.on_successor is not None:
+            events.on_successor(schedule.depth, action_str, score)
+        bound = self.bound(schedule)
+        if self.top.can_enter(bound):
+            self.frontier.push((-bound, next(counter), schedule))
+            if events.on_push is not None:
+                events.on_push(schedule.depth, bound)
+        elif events.on_prune is not None:
+            events.on_prune(schedule.depth, bound)
+
+    def shift_since(self, epoch: int) -> dict:
+        """Return the net change of this country's resources since ``epoch``."""
+        if epoch not in self.shifts:
+            shift = self.shifts[epoch] = {}
+            for country, resource, amount in self.transpositions.since(epoch):
+                if country == self.country_name:
+                    shift[resource] = shift.get(resource, 0) + amount
+        return self.shifts[epoch]
+
+    def reuse_child(self, schedule: Schedule, action, child_sleep):
+        """Return the cached child of ``schedule`` through ``action`` and its
+        step score, or None.
+
+        A cached node reached by the same path is this child once the world
+        changes recorded since it was stored are applied to it.
+        """
+        transpositions = self.transpositions
+        path = tuple(schedule.actions) + (action.action_str,)
+        hit = transpositions.get(path)
+        if hit is None:
+            return None
+        node, epoch = hit
+        feasible = node.feasible
+        resources = node.world.get_country(self.country_name).resources
+        if epoch < transpositions.epoch:
+            node.world.apply_changes(transpositions.since(epoch))
+            feasible = self.library.shift_feasible_mask(feasible, resources, self.shift_since(epoch))
+        delta = node.deltas[-1]
+        parent_resources = schedule.world.get_country(self.country_name).resources
+        score = step_score(
+            action.action_str, action_delta_score(action, parent_resources, resources, delta, self.weights)
+        )
+        new_schedule = Schedule(
+            actions=list(path),
+            world=node.world,
+            eus=schedule.eus + [schedule.eus[-1] + score],
+            deltas=schedule.deltas + [delta],
+            depth=schedule.depth + 1,
+            sleep=child_sleep,
+            feasible=feasible,
+        )
+        transpositions.put(path, new_schedule)
+        return new_schedule, score
+
+    def complete(self, schedule: Schedule):
+        """Offer a schedule of ``depth_bound`` steps to the top-k."""
+        complete = (schedule.actions, schedule.eus, schedule.deltas)
+        score = score_schedule(schedule.actions, schedule.eus)
+        kept = self.top.offer(score, complete)
+        if self.events.on_complete is not None:
+            self.events.on_complete(schedule.actions, schedule.eus, score, kept)
+        if kept and self.on_schedule is not None:
+            self.on_schedule(*complete)
+
+    def expand(self, schedule: Schedule):
+        """Push every child of ``schedule`` that can still reach the top-k."""
+        library, country_name, weights = self.library, self.country_name, self.weights
+        if self.events.on_node is not None:
+            self.events.on_node(schedule.depth, schedule.actions)
+        feasible = schedule.feasible
+        if feasible is None:
+            feasible = library.feasible_mask(schedule.world.get_country(country_name).resources)
+        available = iter_actions(schedule.world, country_name, library, weights, feasible)
+        if self.oracle is not None:
+            # Expand one canonical order of independent actions (sleep sets).
+            expansion = self.oracle.expand(available, schedule.sleep, schedule.world)
+        else:
+            expansion = [(action, ()) for action in available]
+        macros = list(iter_macro_actions(schedule.world, self.macros, self.depth_bound - schedule.depth))
+        macro_children = []
+        if macros:
+            first_sleeps = {action.action_str: child_sleep for action, child_sleep in expansion}
+            for macro in macros:
+                first = macro.steps[0].action_str
+                if first in first_sleeps:
+                    first_node = (first_sleeps[first], covered_after(schedule.covered, macros, first))
+                    child = self.macro_child(schedule, macro, feasible, first_node)
+                    if child is not None:
+                        macro_children.append((macro.action_str, child))
+        if schedule.covered:
+            # Skipped actions stay in the siblings' sleep sets: the macro
+            # child of an ancestor already leads to their child.
+            expansion = [pair for pair in expansion if (pair[0].action_str,) not in schedule.covered]
+        reused = [None] * len(expansion)
+        if self.transpositions is not None:
+            reused = [self.reuse_child(schedule, action, child_sleep) for action, child_sleep in expansion]
+        successors = iter(generate_successors(
+            schedule.world, country_name, library, weights,
+            actions=[action for (action, _), cached in zip(expansion, reused) if cached is None],
+        ))
+        if self.events.on_expand is not None:
+            self.events.on_expand(schedule.depth, len(expansion) + len(macro_children))
+
+        # Children are pushed in expansion order, reused or not, so ties
+        # are broken as in a search without a transposition table.
+        for (action, child_sleep), cached in zip(expansion, reused):
+            if cached is not None:
+                self.push(cached[0], action.action_str, cached[1])
+                continue
+            action_str, new_world, delta, delta_score = next(successors)
+            new_country = new_world.get_country(country_name)
+            # Penalize transfers and score based on delta
+            score = step_score(action_str, delta_score)
+            new_schedule = Schedule(
+                actions=schedule.actions + [action_str],
+                world=new_world,
+                eus=schedule.eus + [schedule.eus[-1] + score],
+                deltas=schedule.deltas + [delta],
+                depth=schedule.depth + 1,
+                sleep=child_sleep,
+                feasible=library.update_feasible_mask(feasible, new_country.resources, delta),
+                covered=covered_after(schedule.covered, macros, action_str),
+            )
+            if self.transpositions is not None:
+                self.transpositions.put(tuple(new_schedule.actions), new_schedule)
+            self.push(new_schedule, action_str, score)
+
+        for macro_str, child in macro_children:
+            self.push(child, macro_str, child.eus[-1] - schedule.eus[-1])
+
+    def macro_child(self, schedule: Schedule, macro, feasible: int, first: tuple) -> Optional[Schedule]:
+        """Return the child of ``schedule`` reached through every step of
+        ``macro``, or None if a search without macros would not reach it
+        (see :func:`search.macros.follow_macro`).
+        """
+        new_world = schedule.world.clone()
+        followed = follow_macro(
+            new_world, self.country_name, self.library, self.weights, macro, first,
+            self.oracle, self.macros, self.depth_bound - schedule.depth,
+        )
+        if followed is None:
+            return None
+        _, steps, sleep, covered = followed
+        new_eus = list(schedule.eus)
+        for action_str, _, delta_score in steps:
+            new_eus.append(new_eus[-1] + step_score(action_str, delta_score))
+        return Schedule(
+            actions=schedule.actions + [action_str for action_str, _, _ in steps],
+            world=new_world,
+            eus=new_eus,
+            deltas=schedule.deltas + [delta for _, delta, _ in steps],
+            depth=schedule.depth + len(steps),
+            sleep=sleep,
+            feasible=self.library.update_feasible_mask(
+                feasible,
+                new_world.get_country(self.country_name).resources,
+                {resource for _, delta, _ in steps for resource in delta},
+            ),
+            covered=covered,
+        )
+
+    def run(self, initial_eu: float, seeds=()):
+        """Search until the top-k is final, the frontier is empty or the deadline passes.
+
+        :param initial_eu: The planning country's state quality in the world.
+        :param seeds: Complete ``(actions, eus, deltas)`` schedules, best first,
+            ranked as if popped from the frontier, where eviction cannot lose them.
+        """
+        frontier, top, events = self.frontier, self.top, self.events
+        initial_schedule = Schedule([], self.world, [initial_eu], [], 0)
+        frontier.push((-self.bound(initial_schedule), next(counter), initial_schedule))
+        seeds = iter(seeds)
+        seed = next(seeds, None)
+
+        def offer_seeds(bound):
+            nonlocal seed
+            while seed is not None and score_schedule(*seed[:2]) >= bound:
+                if top.offer(score_schedule(*seed[:2]), seed) and self.on_schedule is not None:
+                    self.on_schedule(*seed)
+                seed = next(seeds, None)
+
+        try:
+            while frontier:
+                neg_bound, _, schedule = frontier.pop()
+                offer_seeds(-neg_bound)
+                if not top.can_enter(-neg_bound):
+                    # Every remaining node is bounded by this one: the top-k is final.
+                    if events.on_prune is not None:
+                        events.on_prune(schedule.depth, -neg_bound)
+                    break
+                if schedule.depth == self.depth_bound:
+                    self.complete(schedule)
+                    continue
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    break
+                self.expand(schedule)
+                if len(frontier) > self.frontier_max_size:
+                    # Evict the lowest-priority nodes, in memory and on disk.
+                    if events.on_evict is not None:
+                        events.on_evict(len(frontier) - self.frontier_max_size)
+                    frontier.trim(self.frontier_max_size)
+            offer_seeds(float("-inf"))
+        finally:
+            frontier.close()
@@ -0,0 +1,163 @@
+"""Depth-first branch-and-bound search on a single mutable world.
+
+Instead of cloning the world for every successor, each action is applied in
+place with :meth:`World.apply_changes` and reverted with
+:meth:`World.undo_changes` on backtrack. Only the current path (actions, EUs
+and deltas) and the pending actions of each level are alive at any time, so
+memory grows with the depth bound rather than with the frontier size times
+the size of the world. Template feasibility is carried down the path as a
+bitmask and rechecked only for templates that read a resource the last
+action changed.
+"""
+
+import time
+
+from evaluations.state_quality import compute_state_quality
+from models.world_model import World
+from transformations.transformations import apply_action, as_library, iter_actions
+from search.hooks import SearchHooks
+from search.macros import covered_after, follow_macro, iter_macro_actions
+from search.por import IndependenceOracle
+from search.ranking import TopKSchedules, score_schedule, step_score
+
+
+def depth_first_search(
+    world: World,
+    country_name: str,
+    library,
+    weights: dict,
+    depth_bound: int,
+    top_schedules: TopKSchedules,
+    step_gain: float = float("inf"),
+    partial_order_reduction: bool = True,
+    macros=(),
+    hooks: SearchHooks = None,
+    deadline: float = None,
+) -> int:
+    """Enumerate schedules of exactly ``depth_bound`` steps depth-first.
+
+    Children are visited best step first, and a branch is cut as soon as its
+    optimistic bound cannot enter ``top_schedules``. The world is mutated
+    during the search and restored before returning.
+
+    :param world: The world to plan in; restored on return.
+    :param country_name: Name of the planning country.
+    :param library: The TemplateLibrary used to generate TRANSFORMs.
+    :param weights: Dictionary of resource weights.
+    :param depth_bound: Number of actions in a complete schedule.
+    :param top_schedules: Receives every complete schedule good enough to rank.
+    :param step_gain: Upper bound on a single step's score, used for pruning.
+    :param partial_order_reduction: Skip orderings of independent actions
+        already covered by an earlier sibling (see :mod:`search.por`).
+    :param macros: Compiled macro-actions (see :mod:`search.macros`), each
+        expanded as one child that advances several steps at once. Pass a
+        ``TopKSchedules(k, unique=True)`` with them, since two macros can
+        reach the same schedule.
+    :param hooks: Receives search events (see :mod:`search.hooks`).
+    :param deadline: :func:`time.monotonic` value after which no further node
+        is expanded, or None.
+    :return: The number of nodes expanded.
+    """
+    self_resources = world.get_country(country_name).resources
+    actions = []
+    eus = [compute_state_quality(self_resources, weights)]
+    deltas = []
+    expanded = 0
+    oracle = IndependenceOracle(country_name, as_library(library)) if partial_order_reduction else None
+    hooks = hooks or SearchHooks()
+    on_node, on_expand, on_successor, on_push = hooks.on_node, hooks.on_expand, hooks.on_successor, hooks.on_push
+    on_prune, on_complete = hooks.on_prune, hooks.on_complete
+
+    def visit(depth, sleep, feasible, covered):
+        nonlocal expanded
+        if depth == depth_bound:
+            score = score_schedule(actions, eus)
+            kept = top_schedules.offer(score, (list(actions), list(eus), list(deltas)))
+            if on_complete is not None:
+                on_complete(actions, eus, score, kept)
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+
+        expanded += 1
+        if on_node is not None:
+            on_node(depth, actions)
+        node_quality = compute_state_quality(self_resources, weights)
+        gained = score_schedule(actions, eus)
+        remaining = depth_bound - depth - 1
+
+        available = iter_actions(world, country_name, library, weights, feasible)
+        if oracle is None:
+            expansion = [(action, ()) for action in available]
+        else:
+            # Sleep sets follow the enumeration order, as in best-first search,
+            # so macro children can rebuild the ones of the nodes they stand for.
+            expansion = oracle.expand(available, sleep, world)
+        enabled_macros = list(iter_macro_actions(world, macros, depth_bound - depth))
+
+        # Score every child by applying and immediately undoing it.
+        children = []
+        for order, (action, child_sleep) in enumerate(expansion):
+            if (action.action_str,) in covered:
+                # The macro child of an ancestor leads to this child.
+                continue
+            undo, delta, delta_score = apply_action(world, country_name, action, weights, node_quality)
+            world.undo_changes(undo)
+            score = step_score(action.action_str, delta_score)
+            children.append((
+                gained + score + remaining * step_gain, order, action, [(action.action_str, delta, score)],
+                child_sleep, covered_after(covered, enabled_macros, action.action_str),
+            ))
+        first_sleeps = {action.action_str: child_sleep for action, child_sleep in expansion}
+        for order, macro in enumerate(enabled_macros, len(expansion)):
+            first = macro.steps[0].action_str
+            if first not in first_sleeps:
+                continue
+            followed = follow_macro(
+                world, country_name, library, weights, macro,
+                (first_sleeps[first], covered_after(covered, enabled_macros, first)),
+                oracle, macros, depth_bound - depth,
+            )
+            if followed is None:
+                continue
+            undo, steps, child_sleep, child_covered = followed
+            world.undo_changes(undo)
+            steps = [(step_str, delta, step_score(step_str, delta_score)) for step_str, delta, delta_score in steps]
+            total = sum(score for _, _, score in steps)
+            bound = gained + total + (depth_bound - depth - len(steps)) * step_gain
+            children.append((bound, order, macro, steps, child_sleep, child_covered))
+        children.sort(key=lambda child: (-child[0], child[1]))
+        if on_expand is not None:
+            on_expand(depth, len(children))
+        if on_successor is not None:
+            for _, _, action, steps, _, _ in children:
+                on_successor(depth + len(steps), action.action_str, sum(score for _, _, score in steps))
+
+        for index, (bound, _, action, steps, child_sleep, child_covered) in enumerate(children):
+            if not top_schedules.can_enter(bound):
+                if on_prune is not None:
+                    # Children are sorted by bound, so every later one is cut too.
+                    for later in children[index:]:
+                        on_prune(depth + len(later[3]), later[0])
+                break
+            if on_push is not None:
+                on_push(depth + len(steps), bound)
+            undo = world.apply_changes(
+                change for step in action.steps or (action,) for change in step.changes
+            )
+            for action_str, delta, score in steps:
+                actions.append(action_str)
+                eus.append(eus[-1] + score)
+                deltas.append(delta)
+            changed = {resource for _, delta, _ in steps for resource in delta}
+            visit(
+                depth + len(steps),
+                child_sleep,
+                library.update_feasible_mask(feasible, self_resources, changed),
+                child_covered,
+            )
+            del actions[-len(steps):], eus[-len(steps):], deltas[-len(steps):]
+            world.undo_changes(undo)
+
+    visit(0, (), library.feasible_mask(self_resources), ())
+    return expanded
@@ -0,0 +1,229 @@
+"""A best-first frontier that spills to disk under a memory budget.
+
+Entries are ``(key, tiebreak, node)`` tuples popped smallest first, like a
+heap of tuples; tiebreaks must be unique. While the nodes held in memory fit
+the budget, the frontier is a plain binary heap. Past it, the lower-priority
+half of the heap is serialised (pickled, then zlib-compressed) into a run
+file sorted by key, and only the ``(key, tiebreak)`` pairs of spilled
+entries stay in memory.
+
+Spilled nodes are merged back as their turn comes: :meth:`pop` returns
+whichever of the heap top and the best run head comes first, so entries
+leave in exactly the order an all-in-memory heap would give. Run files are
+read sequentially, and they are merged into one whenever there are more
+than :data:`MAX_RUNS` of them.
+
+Node sizes are estimated from their pickled size, measured on the first
+node pushed and then on every spilled node.
+"""
+
+import heapq
+import itertools
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import zlib
+from bisect import bisect_right
+from typing import Optional
+
+# Run files are merged into one once there are more than this many.
+MAX_RUNS = 16
+
+_LENGTH = struct.Struct("<I")
+
+
+class _Run:
+    """One sorted run file and the keys of its entries."""
+
+    def __init__(self, path: str, keys: list):
+        self.path = path
+        self.keys = keys
+        self.position = 0
+        # Entries from here on were trimmed away.
+        self.limit = len(keys)
+        self._file = open(path, "rb")
+
+    def head(self):
+        """Return the next ``(key, tiebreak)``, or None when exhausted."""
+        return self.keys[self.position] if self.position < self.limit else None
+
+    def read(self) -> bytes:
+        """Return the next entry's encoded node and advance past it."""
+        (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+        self.position += 1
+        return self._file.read(length)
+
+    def records(self):
+        """Yield ``((key, tiebreak), encoded_node)`` for every remaining entry."""
+        while self.position < self.limit:
+            key = self.keys[self.position]
+            yield key, self.read()
+
+    def close(self):
+        self._file.close()
+        os.remove(self.path)
+
+
+class SpillingFrontier:
+    """A priority queue of search nodes bounded in memory, not in size.
+
+    :ivar spills: Number of run files written (merges included).
+    :ivar spilled: Number of nodes written to disk.
+    :ivar bytes_written: Bytes written to run files.
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None, directory: Optional[str] = None):
+        """Create an empty frontier.
+
+        :param memory_budget: Approximate bytes of nodes kept in memory, or
+            None to never spill.
+        :param directory: Where run files go; defaults to a fresh temporary
+            directory, removed by :meth:`close`.
+        :raises ValueError: If ``memory_budget`` is not positive.
+        """
+        if memory_budget is not None and memory_budget <= 0:
+            raise ValueError(f"memory_budget must be positive, got {memory_budget}.")
+        self.memory_budget = memory_budget
+        self.directory = directory
+        self._owns_directory = False
+        self._heap = []
+        self._runs = []
+        self._on_disk = 0
+        self._node_bytes = None
+        self.spills = 0
+        self.spilled = 0
+        self.bytes_written = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) + self._on_disk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def capacity(self) -> Optional[int]:
+        """Number of nodes the budget allows in memory, or None if unbounded."""
+        if self.memory_budget is None or self._node_bytes is None:
+            return None
+        return max(2, int(self.memory_budget // self._node_bytes))
+
+    def push(self, entry: tuple):
+        """Add a ``(key, tiebreak, node)`` entry, spilling if over budget."""
+        heapq.heappush(self._heap, entry)
+        if self.memory_budget is None:
+            return
+        if self._node_bytes is None:
+            self._node_bytes = len(pickle.dumps(entry[2], pickle.HIGHEST_PROTOCOL))
+        if len(self._heap) > self.capacity:
+            self._spill()
+
+    def pop(self) -> tuple:
+        """Remove and return the smallest entry.
+
+        :raises IndexError: If the frontier is empty.
+        """
+        best = None
+        for run in self._runs:
+            head = run.head()
+            if head is not None and (best is None or head < best.head()):
+                best = run
+        if best is None or (self._heap and self._heap[0][:2] < best.head()):
+            return heapq.heappop(self._heap)
+        key, tiebreak = best.head()
+        node = pickle.loads(zlib.decompress(best.read()))
+        self._on_disk -= 1
+        if best.head() is None:
+            self._runs.remove(best)
+            best.close()
+        return key, tiebreak, node
+
+    def trim(self, max_size: int):
+        """Drop the largest entries until at most ``max_size`` remain."""
+        if len(self) <= max_size:
+            return
+        if not self._runs:
+            # A sorted list is a valid heap.
+            self._heap = heapq.nsmallest(max_size, self._heap)
+            return
+        if max_size <= 0:
+            self.clear()
+            return
+        keys = itertools.chain(
+            (entry[:2] for entry in self._heap),
+            *(run.keys[run.position:run.limit] for run in self._runs),
+        )
+        cutoff = heapq.nsmallest(max_size, keys)[-1]
+        self._heap = [entry for entry in self._heap if entry[:2] <= cutoff]
+        heapq.heapify(self._heap)
+        for run in list(self._runs):
+            run.limit = bisect_right(run.keys, cutoff, run.position, run.limit)
+            if run.head() is None:
+                self._runs.remove(run)
+                run.close()
+        self._on_disk = sum(run.limit - run.position for run in self._runs)
+
+    def clear(self):
+        """Drop every entry."""
+        self._heap = []
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._on_disk = 0
+
+    def close(self):
+        """Drop every entry and remove the run files (and owned directory)."""
+        self.clear()
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+            self._owns_directory = False
+
+    def _new_run_file(self):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="frontier-")
+            self._owns_directory = True
+        handle, path = tempfile.mkstemp(suffix=".run", dir=self.directory)
+        return os.fdopen(handle, "wb"), path
+
+    def _write_run(self, records) -> _Run:
+        """Write ``((key, tiebreak), encoded_node)`` records, already sorted."""
+        f, path = self._new_run_file()
+        keys = []
+        with f:
+            for key, data in records:
+                f.write(_LENGTH.pack(len(data)))
+                f.write(data)
+                keys.append(key)
+                self.bytes_written += _LENGTH.size + len(data)
+        self.spills += 1
+        return _Run(path, keys)
+
+    def _spill(self):
+        """Move the lower-priority half of the heap to a new run file."""
+        entries = sorted(self._heap)
+        keep = max(1, self.capacity // 2)
+        self._heap = entries[:keep]
+        spilled = entries[keep:]
+        pickled_bytes = 0
+
+        def encode():
+            nonlocal pickled_bytes
+            for key, tiebreak, node in spilled:
+                data = pickle.dumps(node, pickle.HIGHEST_PROTOCOL)
+                pickled_bytes += len(data)
+                yield (key, tiebreak), zlib.compress(data, 1)
+
+        self._runs.append(self._write_run(encode()))
+        self._on_disk += len(spilled)
+        self.spilled += len(spilled)
+        self._node_bytes = pickled_bytes / len(spilled)
+        if len(self._runs) > MAX_RUNS:
+            runs, self._runs = self._runs, []
+            self._runs.append(self._write_run(heapq.merge(*(run.records() for run in runs))))
+            for run in runs:
+                run.close()
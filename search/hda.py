@@ -0,0 +1,427 @@
+"""Hash-distributed best-first search (HDA*) across local processes.
+
+A single frontier shared by several processes would need a lock on every
+push and pop. Instead, every worker process owns the search nodes whose
+canonical world hash (see :func:`world_hash`) maps to it, and keeps its own
+open list (a :class:`search.frontier.SpillingFrontier`) and closed list:
+
+* a worker pops its locally best node and expands it as the best-first
+  scheduler does, with partial-order reduction and inherited feasibility
+  masks; complete schedules are ranked at once in its local top-k;
+* every other child is routed to the child's owner: kept locally, or
+  buffered and sent to the owner's queue in batches of ``batch_size``
+  nodes (partial batches are flushed every :data:`FLUSH_EVERY` expansions
+  and whenever the worker runs out of local work);
+* the owner's closed list maps ``(depth, world hash)`` to the best path
+  scores that reached that state. A node arriving with k scores at least
+  as good already recorded is a duplicate: each of those k paths continues
+  with the same suffixes, so it cannot contribute a top-k schedule;
+* a shared top-k threshold (the best k-th score any worker has found) and
+  the usual optimistic bound prune nodes everywhere.
+
+Termination is detected by counting live nodes: a shared counter holds the
+number of nodes buffered, in flight or in an open list. A worker adds its
+children before they can be seen by anybody and may subtract finished
+nodes late, so the counter never undercounts and reaches zero exactly when
+every node has been expanded, pruned or dropped. Idle workers then exit
+and send their local top-k, which the caller merges.
+
+All workers attach to one :class:`search.shared.SharedProblem`, so only
+search nodes and results travel through the queues. Run it through
+:func:`scheduler.plan_schedules` with ``search_mode="hda"``.
+"""
+
+import bisect
+import hashlib
+import itertools
+import queue
+import time
+from typing import Dict, List, Optional
+
+from evaluations.state_quality import compute_state_quality
+from models.world_model import World
+from search.frontier import SpillingFrontier
+from search.por import IndependenceOracle
+from search.ranking import TopKSchedules, optimistic_step_gain, score_schedule, step_score
+from transformations.transformations import generate_successors, iter_actions
+
+# Nodes per message sent to another worker.
+DEFAULT_BATCH_SIZE = 32
+
+# Expansions after which partially filled batches are sent anyway.
+FLUSH_EVERY = 16
+
+# Seconds an idle worker waits for a batch before checking for termination.
+IDLE_WAIT = 0.005
+
+# Counters each worker reports, summed into ``stats`` by the caller.
+# World hashes compare amounts as whole multiples of 1 / HASH_SCALE, as the
+# fixed-point turn engine does, so float drift between paths cannot split a state.
+HASH_SCALE = 10 ** 6
+
+STAT_KEYS = ("expanded", "generated", "received", "sent", "batches", "duplicates", "pruned", "evicted")
+
+
+def world_hash(world: World) -> bytes:
+    """Return a 16-byte hash of every country's resources.
+
+    It does not depend on country or resource order, on ``int`` versus
+    ``float`` amounts, or on the process (unlike :func:`hash` of strings), so
+    every worker assigns a state to the same owner. Amounts are rounded to
+    ``1 / HASH_SCALE`` units, so states reached through differently ordered
+    float additions hash alike.
+    """
+    canonical = sorted(
+        (country.name, sorted((res, round(amount * HASH_SCALE)) for res, amount in country.resources.items()))
+        for country in world.all_countries()
+    )
+    return hashlib.blake2b(repr(canonical).encode("utf-8"), digest_size=16).digest()
+
+
+def owner_of(key: bytes, workers: int) -> int:
+    """Return the index of the worker owning the state hashed as ``key``."""
+    return int.from_bytes(key[:8], "little") % workers
+
+
+class _Node:
+    """A partial schedule and the world it leads to."""
+
+    __slots__ = ("actions", "eus", "deltas", "world", "sleep", "feasible", "key")
+
+    def __init__(self, actions, eus, deltas, world, sleep=(), feasible=None, key=None):
+        self.actions = actions
+        self.eus = eus
+        self.deltas = deltas
+        self.world = world
+        self.sleep = sleep
+        self.feasible = feasible
+        self.key = key
+
+
+class _Worker:
+    """The search state of one worker process."""
+
+    def __init__(self, index, config, inboxes, outstanding, threshold, stop):
+        from search.shared import worker_problem
+
+        self.index = index
+        self.workers = len(inboxes)
+        self.inbox = inboxes[index]
+        self.inboxes = inboxes
+        self.outstanding = outstanding
+        self.threshold = threshold
+        self.stop = stop
+        self.world, self.weights, self.library = worker_problem(config["handle"])
+        self.country = config["country"]
+        self.k = config["num_output_schedules"]
+        self.depth_bound = config["depth_bound"]
+        self.frontier_max_size = config["frontier_max_size"]
+        self.batch_size = config["batch_size"]
+        self.deadline = config["deadline"]
+        resources = self.world.get_country(self.country).resources
+        self.step_gain = optimistic_step_gain(
+            self.library, self.weights, resources.get("Population", 0), self.depth_bound, resources
+        )
+        self.oracle = IndependenceOracle(self.country, self.library) if config["partial_order_reduction"] else None
+        self.top = TopKSchedules(self.k, floor=config["floor"])
+        self.open = SpillingFrontier(config["frontier_memory"])
+        self.closed: Dict[tuple, List[float]] = {}
+        self.outboxes: List[list] = [[] for _ in inboxes]
+        self.counter = itertools.count()
+        self.stats = dict.fromkeys(STAT_KEYS, 0)
+        # Change to the live-node count not yet added to ``outstanding``;
+        # kept at or below zero so the shared count never undercounts.
+        self.unreported = 0
+        self.global_threshold = float("-inf")
+
+    def change_live(self, change: int):
+        """Record a change in live nodes, publishing it before it can be an increase."""
+        self.unreported += change
+        if self.unreported > 0:
+            self.report()
+
+    def report(self):
+        """Add the unreported change in live nodes to the shared count."""
+        if self.unreported:
+            with self.outstanding.get_lock():
+                self.outstanding.value += self.unreported
+            self.unreported = 0
+
+    def admits(self, bound: float) -> bool:
+        """Return True if a node bounded by ``bound`` can still reach the top-k."""
+        return self.top.can_enter(bound) and not bound <= self.global_threshold
+
+    def bound(self, node: _Node) -> float:
+        """Return an upper bound on the final score of any completion of ``node``."""
+        return score_schedule(node.actions, node.eus) + (self.depth_bound - len(node.actions)) * self.step_gain
+
+    def admit(self, node: _Node):
+        """Add a node this worker owns to the open list, unless it is dominated."""
+        score = score_schedule(node.actions, node.eus)
+        seen = self.closed.setdefault((len(node.actions), node.key), [])
+        if len(seen) >= self.k and score <= seen[0]:
+            self.stats["duplicates"] += 1
+            self.change_live(-1)
+            return
+        bisect.insort(seen, score)
+        if len(seen) > self.k:
+            del seen[0]
+        self.open.push((-self.bound(node), next(self.counter), node))
+
+    def receive(self, block: bool) -> bool:
+        """Admit every batch waiting in the inbox; return True if any arrived."""
+        received = False
+        while True:
+            try:
+                batch = self.inbox.get(timeout=IDLE_WAIT) if block and not received else self.inbox.get_nowait()
+            except queue.Empty:
+                return received
+            received = True
+            self.stats["received"] += len(batch)
+            for node in batch:
+                if self.deadline is not None and time.monotonic() >= self.deadline:
+                    self.change_live(-1)
+                else:
+                    self.admit(node)
+
+    def send(self, owner: int):
+        """Send the nodes batched for worker ``owner``, if any."""
+        batch = self.outboxes[owner]
+        if batch:
+            self.outboxes[owner] = []
+            self.inboxes[owner].put(batch)
+            self.stats["sent"] += len(batch)
+            self.stats["batches"] += 1
+
+    def flush(self):
+        """Send every pending batch."""
+        for owner in range(self.workers):
+            self.send(owner)
+
+    def drop_open(self):
+        """Discard the whole open list."""
+        self.change_live(-len(self.open))
+        self.open.clear()
+
+    def offer_complete(self, actions, eus, deltas):
+        """Rank a complete schedule and raise the shared threshold if the local top-k did."""
+        score = score_schedule(actions, eus)
+        if self.top.offer(score, (actions, eus, deltas)) and self.top.full():
+            threshold = self.top.threshold()
+            if threshold > self.global_threshold:
+                with self.threshold.get_lock():
+                    self.threshold.value = max(self.threshold.value, threshold)
+
+    def expand(self, node: _Node):
+        """Generate the children of ``node`` and route each to its owner."""
+        library, country, weights = self.library, self.country, self.weights
+        world = node.world
+        feasible = node.feasible
+        if feasible is None:
+            feasible = library.feasible_mask(world.get_country(country).resources)
+        available = iter_actions(world, country, library, weights, feasible)
+        if self.oracle is not None:
+            expansion = self.oracle.expand(available, node.sleep, world)
+        else:
+            expansion = [(action, ()) for action in available]
+        successors = generate_successors(world, country, library, weights, actions=[a for a, _ in expansion])
+        self.stats["expanded"] += 1
+        self.stats["generated"] += len(successors)
+
+        live = 0
+        local = []
+        for (_, child_sleep), (action_str, new_world, delta, delta_score) in zip(expansion, successors):
+            actions = node.actions + [action_str]
+            eus = node.eus + [node.eus[-1] + step_score(action_str, delta_score)]
+            deltas = node.deltas + [delta]
+            if len(actions) == self.depth_bound:
+                self.offer_complete(actions, eus, deltas)
+                continue
+            child = _Node(
+                actions, eus, deltas, new_world, child_sleep,
+                library.update_feasible_mask(feasible, new_world.get_country(country).resources, delta),
+            )
+            if not self.admits(self.bound(child)):
+                self.stats["pruned"] += 1
+                continue
+            child.key = world_hash(new_world)
+            owner = owner_of(child.key, self.workers)
+            live += 1
+            if owner == self.index:
+                local.append(child)
+            else:
+                self.outboxes[owner].append(child)
+        # Children count as live before any of them is sent; the parent is done.
+        self.change_live(live - 1)
+        for child in local:
+            self.admit(child)
+        for owner, batch in enumerate(self.outboxes):
+            if len(batch) >= self.batch_size:
+                self.send(owner)
+
+    def run(self):
+        """Search until every worker's nodes are exhausted."""
+        expansions = 0
+        while not self.stop.is_set():
+            self.receive(block=not self.open)
+            if not self.open:
+                self.flush()
+                self.report()
+                if self.outstanding.value == 0:
+                    break
+                continue
+            self.global_threshold = self.threshold.value
+            neg_bound, _, node = self.open.pop()
+            if not self.admits(-neg_bound) or (self.deadline is not None and time.monotonic() >= self.deadline):
+                # Every other local node is bounded by this one.
+                self.stats["pruned"] += 1 + len(self.open)
+                self.change_live(-1)
+                self.drop_open()
+                continue
+            self.expand(node)
+            if len(self.open) > self.frontier_max_size:
+                # Evict the lowest-priority local nodes, in memory and on disk.
+                evicted = len(self.open) - self.frontier_max_size
+                self.stats["evicted"] += evicted
+                self.change_live(-evicted)
+                self.open.trim(self.frontier_max_size)
+            expansions += 1
+            if expansions % FLUSH_EVERY == 0:
+                self.flush()
+        self.open.close()
+        return self.top.ranked()
+
+
+def _worker_main(index, config, inboxes, results, outstanding, threshold, stop):
+    """Process entry point: run one worker and send back its top-k and counters."""
+    for inbox in inboxes:
+        # Batches left behind after an abort must not block this process's exit.
+        inbox.cancel_join_thread()
+    try:
+        worker = _Worker(index, config, inboxes, outstanding, threshold, stop)
+        ranked = worker.run()
+        results.put((index, ranked, worker.stats, None))
+    except (ValueError, LookupError, RuntimeError, OSError, MemoryError) as exc:
+        # Reported to the caller, which re-raises it; any other error ends
+        # the process, which the caller reports by its exit code.
+        stop.set()
+        results.put((index, [], {}, exc))
+
+
+def hash_distributed_search(
+    world: World,
+    weights: dict,
+    library,
+    country_name: str,
+    num_output_schedules: int,
+    depth_bound: int,
+    frontier_max_size: int,
+    workers: int = 2,
+    partial_order_reduction: bool = True,
+    deadline: Optional[float] = None,
+    frontier_memory: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    floor: float = float("-inf"),
+    stats: Optional[dict] = None,
+) -> List[tuple]:
+    """Search for one country's best schedules with ``workers`` processes.
+
+    :param world: The world to plan in; left unchanged.
+    :param weights: Dictionary of resource weights.
+    :param library: The compiled TemplateLibrary.
+    :param country_name: Name of the planning country.
+    :param num_output_schedules: Number of schedules to return.
+    :param depth_bound: Number of actions in a complete schedule.
+    :param frontier_max_size: Open-list size of each worker; lower-priority
+        nodes beyond it are evicted.
+    :param workers: Number of worker processes.
+    :param partial_order_reduction: Expand one canonical order of
+        independent actions (see :mod:`search.por`).
+    :param deadline: :func:`time.monotonic` value after which no further
+        node is expanded, or None.
+    :param frontier_memory: Bytes of open-list nodes each worker keeps in
+        memory before spilling to disk, or None.
+    :param batch_size: Nodes per message between workers.
+    :param floor: A score k known schedules reach; see :class:`TopKSchedules`.
+    :param stats: Optional dictionary that receives the summed counters of
+        :data:`STAT_KEYS` and ``"expanded_per_worker"``.
+    :return: The ranked top schedules as ``(actions, eus, deltas)`` tuples.
+    :raises ValueError: If ``workers`` or ``batch_size`` is below 1.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    # Imported here: the process machinery and numpy are slow to load and
+    # only parallel searches need them.
+    import multiprocessing
+
+    from search.shared import SharedProblem
+
+    initial_eu = compute_state_quality(world.get_country(country_name).resources, weights)
+    root = _Node([], [initial_eu], [], world, key=world_hash(world))
+    inboxes = [multiprocessing.Queue() for _ in range(workers)]
+    results = multiprocessing.Queue()
+    outstanding = multiprocessing.Value("q", 1)
+    threshold = multiprocessing.Value("d", float("-inf"))
+    stop = multiprocessing.Event()
+
+    with SharedProblem(world, weights, library) as shared:
+        config = {
+            "handle": shared.handle,
+            "country": country_name,
+            "num_output_schedules": num_output_schedules,
+            "depth_bound": depth_bound,
+            "frontier_max_size": frontier_max_size,
+            "partial_order_reduction": partial_order_reduction,
+            "deadline": deadline,
+            "frontier_memory": frontier_memory,
+            "batch_size": batch_size,
+            "floor": floor,
+        }
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(i, config, inboxes, results, outstanding, threshold, stop),
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        inboxes[owner_of(root.key, workers)].put([root])
+
+        reports = {}
+        try:
+            while len(reports) < workers:
+                try:
+                    index, ranked, counts, error = results.get(timeout=0.1)
+                except queue.Empty as exc:
+                    dead = [
+                        p.exitcode for i, p in enumerate(processes) if i not in reports and p.exitcode is not None
+                    ]
+                    if dead:
+                        raise RuntimeError(f"An HDA* worker exited with code {dead[0]} before reporting.") from exc
+                    continue
+                if error is not None:
+                    raise error
+                reports[index] = (ranked, counts)
+        finally:
+            stop.set()
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+    merged = TopKSchedules(num_output_schedules)
+    totals = dict.fromkeys(STAT_KEYS, 0)
+    for index in range(workers):
+        ranked, counts = reports[index]
+        for schedule in ranked:
+            merged.offer(score_schedule(*schedule[:2]), schedule)
+        for key in STAT_KEYS:
+            totals[key] += counts[key]
+    if stats is not None:
+        stats.update(totals)
+        stats["expanded_per_worker"] = [reports[index][1]["expanded"] for index in range(workers)]
+    return merged.ranked()
@@ -0,0 +1,137 @@
+"""Search-event hooks.
+
+A hook is any object defining some of the methods below. Searches report
+events to it as they happen:
+
+``on_node(depth, actions)``
+    The node reached through ``actions`` is about to be expanded; copy
+    ``actions`` to keep it, the search reuses the list.
+``on_expand(depth, branching)``
+    A node at ``depth`` was expanded into ``branching`` children.
+``on_successor(depth, action, score)``
+    A child at ``depth`` was generated through ``action``, with step score
+    ``score`` (summed over the steps of a macro).
+``on_push(depth, bound)``
+    A child with optimistic bound ``bound`` was queued (best-first) or
+    descended into (depth-first).
+``on_prune(depth, bound)``
+    A node was dropped because its bound cannot enter the top-k.
+``on_evict(count)``
+    ``count`` nodes were evicted to keep the frontier within its size.
+``on_complete(actions, eus, score, kept)``
+    A complete schedule was reached; ``kept`` tells if it entered the top-k.
+
+:class:`SearchHooks` binds each event to the registered methods, or to None
+when no hook defines it, so searches pay a single ``is None`` check per
+event site when nothing listens.
+"""
+
+from collections import Counter, defaultdict
+from typing import Iterable
+
+HOOK_EVENTS = ("on_node", "on_expand", "on_successor", "on_push", "on_prune", "on_evict", "on_complete")
+
+
+def _fan_out(handlers):
+    def dispatch(*args):
+        for handler in handlers:
+            handler(*args)
+
+    return dispatch
+
+
+class SearchHooks:
+    """The registered hooks, bound per event.
+
+    Each event in :data:`HOOK_EVENTS` is an attribute: None when no hook
+    defines it, the hook's method when exactly one does, or a function
+    calling every defining hook in registration order.
+    """
+
+    def __init__(self, hooks: Iterable[object] = ()):
+        """Bind the events of ``hooks``.
+
+        :param hooks: Hook objects; each may define any subset of the events.
+        """
+        self.hooks = list(hooks)
+        self.on_node = self._bind("on_node")
+        self.on_expand = self._bind("on_expand")
+        self.on_successor = self._bind("on_successor")
+        self.on_push = self._bind("on_push")
+        self.on_prune = self._bind("on_prune")
+        self.on_evict = self._bind("on_evict")
+        self.on_complete = self._bind("on_complete")
+
+    def _bind(self, event: str):
+        """Return what ``event`` is bound to: None when no hook defines it."""
+        handlers = [getattr(hook, event) for hook in self.hooks if callable(getattr(hook, event, None))]
+        if not handlers:
+            return None
+        return handlers[0] if len(handlers) == 1 else _fan_out(handlers)
+
+
+class SearchCounters:
+    """Counts every event, plus the schedules kept.
+
+    :ivar counts: Mapping from event name (without ``on_``) to its count;
+        evictions count nodes, not trims.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def on_node(self, depth, actions):
+        del depth, actions
+        self.counts["node"] += 1
+
+    def on_expand(self, depth, branching):
+        del depth, branching
+        self.counts["expand"] += 1
+
+    def on_successor(self, depth, action, score):
+        del depth, action, score
+        self.counts["successor"] += 1
+
+    def on_push(self, depth, bound):
+        del depth, bound
+        self.counts["push"] += 1
+
+    def on_prune(self, depth, bound):
+        del depth, bound
+        self.counts["prune"] += 1
+
+    def on_evict(self, count):
+        self.counts["evict"] += count
+
+    def on_complete(self, actions, eus, score, kept):
+        del actions, eus, score
+        self.counts["complete"] += 1
+        self.counts["kept"] += bool(kept)
+
+
+class BranchingHistogram:
+    """Histogram of the branching factor at each depth.
+
+    :ivar histograms: Mapping from depth to a Counter of branching factors.
+    """
+
+    def __init__(self):
+        self.histograms = defaultdict(Counter)
+
+    def on_expand(self, depth, branching):
+        self.histograms[depth][branching] += 1
+
+    def summary(self) -> dict:
+        """Return ``{depth: {"nodes", "mean", "min", "max", "histogram"}}``."""
+        report = {}
+        for depth in sorted(self.histograms):
+            histogram = self.histograms[depth]
+            nodes = sum(histogram.values())
+            report[depth] = {
+                "nodes": nodes,
+                "mean": sum(b * n for b, n in histogram.items()) / nodes,
+                "min": min(histogram),
+                "max": max(histogram),
+                "histogram": dict(sorted(histogram.items())),
+            }
+        return report
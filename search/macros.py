@@ -0,0 +1,271 @@
+"""Macro-actions: frequent action sequences searched as a single step.
+
+A macro bundles a fixed sequence of primitive actions. Its net resource
+changes and its feasibility thresholds are computed once, when it is
+compiled, so checking whether the whole sequence can run from a state is a
+single pass over its preconditions. Search still records every primitive
+step of a macro, so schedules, scores and logs read as if found without
+macros.
+
+Candidate sequences come from two places: n-grams that recur in earlier
+schedule logs (:func:`mine_log_macros`), and producer/consumer template
+chains found by static analysis (:func:`template_chain_macros`).
+
+A macro child stands in for the node its steps lead to: the primitive path
+to that node is cut at its last step (:func:`covered_after`), and the
+macro child takes over that node's sleep set (:func:`follow_macro`). A
+macro whose path the search without macros would not take, e.g. through an
+action asleep under partial-order reduction, is dropped. Without frontier
+eviction or a time budget the schedules found are therefore the same, ties
+aside. Macros still cost the intermediate nodes' action enumeration and pay
+off only when the schedules they reach early raise the top-k floor enough
+to prune more nodes than that. On the sample problem they do not: at depth
+4, the six macros mined from a plain run's log take best-first search from
+212 expansions and 1260 successors to 215 and 1332. Compare the
+``expansions`` of ``cli.py`` runs with and without ``--macros-from``
+before relying on them.
+"""
+
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Sequence, Tuple
+
+from models.world_model import World
+from parsers.schedule_log_parser import iter_schedule_log
+from transformations.transformations import (
+    MAX_TRANSFER_AMOUNT, Action, action_from_string, apply_action, as_library, iter_actions, transfer_items,
+)
+
+
+def compile_macro(steps: Sequence[Action]) -> Action:
+    """Fold a sequence of primitive actions into one macro action.
+
+    The macro's changes are the net change to each ``(country, resource)``
+    it touches (zero nets included, so the resources a state holds do not
+    depend on whether a macro or its steps were applied).
+    Its preconditions hold exactly when every step is feasible at its turn:
+    a step needing ``m`` of a resource after the earlier steps changed it by
+    ``c`` needs ``m - c`` before the macro starts.
+
+    :param steps: Two or more primitive actions, in order.
+    :return: The macro Action, with ``steps`` set to the primitives.
+    :raises ValueError: If fewer than two steps are given, a step is
+        itself a macro, or a TRANSFER moves more than
+        :data:`~transformations.transformations.MAX_TRANSFER_AMOUNT` of a
+        resource (the step gain bounding the search assumes no more).
+    """
+    if len(steps) < 2:
+        raise ValueError("A macro needs at least two steps.")
+    net = OrderedDict()
+    thresholds = OrderedDict()
+    for step in steps:
+        if step.steps:
+            raise ValueError(f"Macros cannot nest: {step.action_str}")
+        if step.is_transfer and any(amount > MAX_TRANSFER_AMOUNT for _, amount in transfer_items(step)):
+            raise ValueError(f"Transfers move at most {MAX_TRANSFER_AMOUNT} of a resource: {step.action_str}")
+        for country, resource, minimum in step.preconditions:
+            key = (country, resource)
+            needed = minimum - net.get(key, 0)
+            thresholds[key] = max(thresholds.get(key, needed), needed)
+        for country, resource, amount in step.changes:
+            key = (country, resource)
+            net[key] = net.get(key, 0) + amount
+    action_str = "(MACRO " + " ".join(step.action_str for step in steps) + ")"
+    return Action(
+        action_str,
+        any(step.is_transfer for step in steps),
+        tuple((country, resource, amount) for (country, resource), amount in net.items()),
+        tuple((country, resource, minimum) for (country, resource), minimum in thresholds.items()),
+        tuple(steps),
+    )
+
+
+def compile_macros(
+    sequences: Iterable[Sequence[str]], country_name: str, library, weights: dict
+) -> List[Action]:
+    """Compile action-string sequences into macros for one planning country.
+
+    Sequences with a TRANSFORM in another country, or a TRANSFER the
+    planning country takes no part in, are skipped, as are duplicates.
+
+    :param sequences: Sequences of primitive actions in schedule notation.
+    :param country_name: The planning country.
+    :param library: A TemplateLibrary or a list of TransformTemplate.
+    :param weights: Dictionary of resource weights (sets transfer costs).
+    :return: The compiled macros, in input order.
+    :raises ValueError: If an action string cannot be parsed or a sequence
+        cannot be compiled (see :func:`compile_macro`).
+    """
+    library = as_library(library)
+    macros, seen = [], set()
+    for sequence in sequences:
+        sequence = tuple(sequence)
+        if len(sequence) < 2 or sequence in seen:
+            continue
+        steps = [action_from_string(action_str, library, weights) for action_str in sequence]
+        if all(_involves(step, country_name) for step in steps):
+            seen.add(sequence)
+            macros.append(compile_macro(steps))
+    return macros
+
+
+def _involves(action: Action, country_name: str) -> bool:
+    """True if ``action`` can appear in ``country_name``'s schedules."""
+    if action.is_transfer:
+        return country_name in (action.changes[0][0], action.changes[-1][0])
+    return action.changes[0][0] == country_name if action.changes else False
+
+
+def mine_log_macros(
+    log_paths: Iterable[str], max_length: int = 3, min_support: int = 2, limit: int = 8
+) -> List[Tuple[str, ...]]:
+    """Find action sequences that recur in earlier schedule logs.
+
+    Every run of 2 to ``max_length`` consecutive actions in every logged
+    schedule is counted. Sequences are ranked by how many search levels
+    they would save (count x (length - 1)).
+
+    :param log_paths: Schedule logs readable by :func:`iter_schedule_log`.
+    :param max_length: Longest sequence to consider.
+    :param min_support: Minimum number of occurrences to keep a sequence.
+    :param limit: Maximum number of sequences returned.
+    :return: The best sequences of action strings, most useful first.
+    """
+    counts = Counter()
+    for path in log_paths:
+        for record in iter_schedule_log(path):
+            actions = [step["action"] for step in record.get("actions", [])]
+            for length in range(2, max_length + 1):
+                for start in range(len(actions) - length + 1):
+                    counts[tuple(actions[start:start + length])] += 1
+    frequent = [(seq, n) for seq, n in counts.items() if n >= min_support]
+    frequent.sort(key=lambda item: -item[1] * (len(item[0]) - 1))
+    return [seq for seq, _ in frequent[:limit]]
+
+
+def template_chain_macros(library, country_name: str, weights: dict, limit: int = 8) -> List[Tuple[str, ...]]:
+    """Find producer/consumer template pairs by static analysis.
+
+    A pair qualifies when the first template (at scale 1) outputs something
+    the second one consumes and the pair's net weighted change is positive.
+
+    :param library: A TemplateLibrary or a list of TransformTemplate.
+    :param country_name: The country the transforms run in.
+    :param weights: Dictionary of resource weights.
+    :param limit: Maximum number of pairs returned.
+    :return: Pairs of TRANSFORM action strings, highest net gain first.
+    """
+    library = as_library(library)
+    scaled = [(template.name, library.scaled(template.name, 1)) for template in library]
+
+    def gain(template):
+        produced = sum(weights.get(r, 0) * amt for r, amt in template.outputs.items())
+        return produced - sum(weights.get(r, 0) * amt for r, amt in template.inputs.items())
+
+    chains = []
+    for producer_name, producer in scaled:
+        for consumer_name, consumer in scaled:
+            if not set(producer.outputs) & set(consumer.inputs):
+                continue
+            total = gain(producer) + gain(consumer)
+            if total > 0:
+                chains.append((total, (
+                    f"(TRANSFORM {country_name} {producer_name} x1)",
+                    f"(TRANSFORM {country_name} {consumer_name} x1)",
+                )))
+    chains.sort(key=lambda item: -item[0])
+    return [chain for _, chain in chains[:limit]]
+
+
+def covered_after(covered: tuple, macros: Iterable[Action], action_str: str) -> tuple:
+    """Return the macro remainders covered below the child through ``action_str``.
+
+    A macro expanded at a node reaches the same state, with the same steps
+    and scores, as its primitive steps taken one at a time below that node.
+    Each node therefore carries the remaining steps of the macros its path
+    has followed so far. Once one step remains, the search skips that step:
+    the macro child already leads to the same node.
+
+    :param covered: The parent's remainders, as tuples of action strings.
+    :param macros: The macros expanded at the parent.
+    :param action_str: The primitive action taken from the parent.
+    :return: The child's remainders.
+    """
+    if not covered and not macros:
+        return ()
+    followed = tuple(rest[1:] for rest in covered if len(rest) > 1 and rest[0] == action_str)
+    started = tuple(
+        tuple(step.action_str for step in macro.steps[1:])
+        for macro in macros
+        if macro.steps[0].action_str == action_str
+    )
+    return followed + started
+
+
+def follow_macro(
+    world: World,
+    country_name: str,
+    library,
+    weights: dict,
+    macro: Action,
+    first: tuple,
+    oracle=None,
+    macros: Sequence[Action] = (),
+    max_steps: int = 0,
+):
+    """Apply ``macro`` in place one step at a time, as the primitive search would take it.
+
+    The macro child must stand in for the node its last step leads to, so
+    it is only kept when the search without macros would reach that node:
+    every later step must be among the actions enabled, and not asleep,
+    after the earlier ones. The child then gets that node's sleep set and
+    covered remainders, so both searches expand the same schedules.
+
+    :param world: The world to mutate.
+    :param country_name: Name of the planning country.
+    :param library: The TemplateLibrary actions are generated from.
+    :param weights: Dictionary of resource weights.
+    :param macro: A macro feasible in ``world``.
+    :param first: ``(sleep, covered)`` of the child through the macro's first step.
+    :param oracle: The search's :class:`search.por.IndependenceOracle`, or None.
+    :param macros: Every compiled macro of the search.
+    :param max_steps: Primitive steps left before the depth bound.
+    :return: ``(undo, steps, sleep, covered)`` with ``undo`` and ``steps``
+        as for :func:`apply_action_steps`, or None (with ``world`` unchanged)
+        if the search without macros never takes the macro's path.
+    """
+    sleep, covered = first
+    undo, steps = [], []
+    for index, step in enumerate(macro.steps):
+        if index:
+            available = iter_actions(world, country_name, library, weights)
+            if oracle is not None:
+                expansion = oracle.expand(available, sleep, world)
+            else:
+                expansion = [(action, ()) for action in available]
+            sleep = next((s for action, s in expansion if action.action_str == step.action_str), None)
+            if sleep is None:
+                world.undo_changes(undo)
+                return None
+            enabled = list(iter_macro_actions(world, macros, max_steps - index))
+            covered = covered_after(covered, enabled, step.action_str)
+        step_undo, delta, delta_score = apply_action(world, country_name, step, weights)
+        undo.extend(step_undo)
+        steps.append((step.action_str, delta, delta_score))
+    return undo, steps, sleep, covered
+
+
+def iter_macro_actions(world: World, macros: Iterable[Action], max_steps: int):
+    """Yield the macros that are feasible in ``world`` and fit in ``max_steps``.
+
+    :param world: The current state.
+    :param macros: Compiled macro actions.
+    :param max_steps: Primitive steps left before the depth bound.
+    """
+    for macro in macros:
+        if len(macro.steps) > max_steps:
+            continue
+        if all(
+            world.countries[country].resources.get(resource, 0) >= minimum
+            for country, resource, minimum in macro.preconditions
+        ):
+            yield macro
@@ -0,0 +1,311 @@
+"""Monte Carlo Tree Search over schedules.
+
+Each iteration walks the tree from the root with UCT selection over the
+actions produced by :func:`iter_actions`, expands one untried action, and then
+plays a cheap rollout to the depth bound. All of it happens in place on one
+world with apply/undo, so a rollout never clones state. The rollout's total
+gain is backed up along the tree path, and every complete rollout is offered
+to a top-k of schedules.
+
+Root parallelism runs independent seeded trees in a process pool and merges
+their top-k lists, so a run is reproducible for a given seed, worker count
+and iteration budget. The problem is published once in shared memory (see
+:mod:`search.shared`) and each worker attaches to it, instead of every job
+pickling the world and the compiled templates. A time budget trades that
+reproducibility for a fixed wall-clock cost.
+"""
+
+import math
+import random
+import time
+from typing import List, Optional
+
+from evaluations.state_quality import compute_state_quality
+from models.world_model import World
+from transformations.transformations import apply_action, iter_actions
+from search.ranking import TopKSchedules, score_schedule, step_score
+
+ROLLOUT_POLICIES = ("random", "greedy")
+
+# Probability that a greedy rollout still picks a uniformly random action.
+GREEDY_EPSILON = 0.1
+
+
+class _Node:
+    """One tree node: the action leading to it and its visit statistics."""
+
+    __slots__ = ("action", "delta", "score", "children", "untried", "visits", "total")
+
+    def __init__(self, action=None, delta=None, score=0.0):
+        self.action = action
+        self.delta = delta
+        self.score = score
+        self.children: List["_Node"] = []
+        self.untried = None
+        self.visits = 0
+        self.total = 0.0
+
+
+class MCTSPlanner:
+    """A single-threaded UCT planner for one country.
+
+    :ivar iterations: Number of iterations run so far.
+    :ivar top_schedules: The best complete schedules found by rollouts.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        country_name: str,
+        library,
+        weights: dict,
+        depth_bound: int,
+        num_output_schedules: int,
+        seed: int = 0,
+        rollout_policy: str = "random",
+        exploration: float = math.sqrt(2),
+    ):
+        """Create a planner rooted at the current state of ``world``.
+
+        :param world: The world to plan in; mutated during iterations and
+            restored after each one.
+        :param country_name: Name of the planning country.
+        :param library: The TemplateLibrary used to generate TRANSFORMs.
+        :param weights: Dictionary of resource weights.
+        :param depth_bound: Number of actions in a complete schedule.
+        :param num_output_schedules: Size of the top-k kept.
+        :param seed: Seed for selection ties and rollouts.
+        :param rollout_policy: ``"random"`` or epsilon-``"greedy"``.
+        :param exploration: UCT exploration constant.
+        :raises ValueError: If ``rollout_policy`` is unknown.
+        """
+        if rollout_policy not in ROLLOUT_POLICIES:
+            raise ValueError(f"Unknown rollout_policy '{rollout_policy}'; expected one of {ROLLOUT_POLICIES}.")
+        self.world = world
+        self.country_name = country_name
+        self.library = library
+        self.weights = weights
+        self.depth_bound = depth_bound
+        self.rollout_policy = rollout_policy
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = _Node()
+        self.iterations = 0
+        self.top_schedules = TopKSchedules(num_output_schedules)
+        self._resources = world.get_country(country_name).resources
+        self._initial_eu = compute_state_quality(self._resources, weights)
+        self._seen = set()
+        self._low = math.inf
+        self._high = -math.inf
+
+    def _actions(self):
+        return list(iter_actions(self.world, self.country_name, self.library, self.weights))
+
+    def _apply(self, action):
+        """Apply an action in place; return its undo entry, delta and step score."""
+        undo, delta, delta_score = apply_action(self.world, self.country_name, action, self.weights)
+        return undo, delta, step_score(action.action_str, delta_score)
+
+    def _select(self, node: _Node) -> _Node:
+        """Pick the child maximising UCT, with values scaled to [0, 1]."""
+        spread = self._high - self._low
+        log_visits = math.log(node.visits)
+        best, best_value = None, -math.inf
+        for child in node.children:
+            mean = child.total / child.visits
+            exploit = (mean - self._low) / spread if spread > 0 else 0.5
+            value = exploit + self.exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    def _rollout_choice(self, actions):
+        """Choose the next rollout action; returns ``(action, undo, delta, score)``."""
+        if self.rollout_policy == "random" or self.rng.random() < GREEDY_EPSILON:
+            action = actions[self.rng.randrange(len(actions))]
+            return (action,) + self._apply(action)
+        best = None
+        quality = compute_state_quality(self._resources, self.weights)
+        for action in actions:
+            undo, _, delta_score = apply_action(
+                self.world, self.country_name, action, self.weights, quality
+            )
+            self.world.undo_changes(undo)
+            score = step_score(action.action_str, delta_score)
+            if best is None or score > best[1]:
+                best = (action, score)
+        return (best[0],) + self._apply(best[0])
+
+    def iterate(self):
+        """Run one selection, expansion, rollout and backpropagation pass."""
+        node = self.root
+        path = [node]
+        undos = []
+        actions, eus, deltas = [], [self._initial_eu], []
+
+        def step(action, undo, delta, score):
+            undos.append(undo)
+            actions.append(action.action_str)
+            eus.append(eus[-1] + score)
+            deltas.append(delta)
+
+        # Selection: descend through fully expanded nodes.
+        while len(actions) < self.depth_bound and node.untried == [] and node.children:
+            node = self._select(node)
+            undos.append(self.world.apply_changes(node.action.changes))
+            actions.append(node.action.action_str)
+            eus.append(eus[-1] + node.score)
+            deltas.append(node.delta)
+            path.append(node)
+
+        # Expansion: add one untried action as a new child.
+        if len(actions) < self.depth_bound:
+            if node.untried is None:
+                node.untried = self._actions()
+            if node.untried:
+                action = node.untried.pop(self.rng.randrange(len(node.untried)))
+                undo, delta, score = self._apply(action)
+                step(action, undo, delta, score)
+                child = _Node(action, delta, score)
+                node.children.append(child)
+                path.append(child)
+
+        # Rollout: play to the depth bound on the same world.
+        while len(actions) < self.depth_bound:
+            available = self._actions()
+            if not available:
+                break
+            step(*self._rollout_choice(available))
+
+        value = score_schedule(actions, eus)
+        if len(actions) == self.depth_bound and tuple(actions) not in self._seen:
+            self._seen.add(tuple(actions))
+            self.top_schedules.offer(value, (list(actions), list(eus), list(deltas)))
+
+        for undo in reversed(undos):
+            self.world.undo_changes(undo)
+
+        self._low = min(self._low, value)
+        self._high = max(self._high, value)
+        for visited in path:
+            visited.visits += 1
+            visited.total += value
+        self.iterations += 1
+
+    def run(self, iterations: Optional[int] = None, time_budget: Optional[float] = None):
+        """Iterate until the iteration count or the time budget runs out.
+
+        :param iterations: Maximum number of iterations, or None.
+        :param time_budget: Maximum wall-clock seconds, or None.
+        :return: The ranked top schedules.
+        """
+        deadline = None if time_budget is None else time.monotonic() + time_budget
+        while iterations is None or self.iterations < iterations:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            self.iterate()
+        return self.top_schedules.ranked()
+
+    def root_statistics(self):
+        """Return ``(action_str, visits, mean_value)`` for every root child."""
+        return [
+            (child.action.action_str, child.visits, child.total / child.visits)
+            for child in self.root.children
+        ]
+
+
+def _run_tree(job):
+    """Process-pool entry point: build one seeded tree and return its results."""
+    world, country_name, library, weights, depth_bound, k, seed, policy, exploration, iterations, time_budget = job
+    planner = MCTSPlanner(world, country_name, library, weights, depth_bound, k, seed, policy, exploration)
+    planner.run(iterations, time_budget)
+    return planner.top_schedules.ranked(), planner.root_statistics(), planner.iterations
+
+
+def _run_shared_tree(job):
+    """Process-pool entry point for a problem published in shared memory."""
+    from search.shared import worker_problem
+
+    handle, country_name = job[:2]
+    world, weights, library = worker_problem(handle)
+    return _run_tree((world, country_name, library, weights) + job[2:])
+
+
+def root_parallel_mcts(
+    world: World,
+    country_name: str,
+    library,
+    weights: dict,
+    depth_bound: int,
+    num_output_schedules: int,
+    iterations: Optional[int] = 1000,
+    time_budget: Optional[float] = None,
+    workers: int = 1,
+    seed: int = 0,
+    rollout_policy: str = "random",
+    exploration: float = math.sqrt(2),
+):
+    """Run ``workers`` independent trees and merge their results.
+
+    Tree ``i`` is seeded with ``seed + i`` and gets an equal share of
+    ``iterations``. With one worker the tree runs in this process.
+
+    :param world: The world to plan in; left unchanged.
+    :param country_name: Name of the planning country.
+    :param library: The TemplateLibrary used to generate TRANSFORMs.
+    :param weights: Dictionary of resource weights.
+    :param depth_bound: Number of actions in a complete schedule.
+    :param num_output_schedules: Number of schedules to return.
+    :param iterations: Total iteration budget across workers, or None.
+    :param time_budget: Wall-clock seconds per worker, or None.
+    :param workers: Number of worker processes.
+    :param seed: Base seed.
+    :param rollout_policy: ``"random"`` or epsilon-``"greedy"``.
+    :param exploration: UCT exploration constant.
+    :return: ``(ranked_schedules, root_statistics, total_iterations)``, where
+        root statistics are summed over workers.
+    :raises ValueError: If neither budget is given or ``workers`` < 1.
+    """
+    if iterations is None and time_budget is None:
+        raise ValueError("MCTS needs an iteration budget, a time budget, or both.")
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    jobs = []
+    for i in range(workers):
+        share = None
+        if iterations is not None:
+            share = iterations // workers + (1 if i < iterations % workers else 0)
+        jobs.append(
+            (depth_bound, num_output_schedules, seed + i, rollout_policy, exploration, share, time_budget)
+        )
+
+    if workers == 1:
+        results = [_run_tree((world, country_name, library, weights) + jobs[0])]
+    else:
+        # Imported here: the process pool machinery and numpy are slow to load
+        # and only parallel runs need them.
+        from concurrent.futures import ProcessPoolExecutor
+        from search.shared import SharedProblem
+
+        with SharedProblem(world, weights, library) as shared, ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_shared_tree, [(shared.handle, country_name) + job for job in jobs]))
+
+    merged = TopKSchedules(num_output_schedules)
+    seen = set()
+    stats = {}
+    total_iterations = 0
+    for ranked, root_stats, count in results:
+        total_iterations += count
+        for schedule in ranked:
+            key = tuple(schedule[0])
+            if key not in seen:
+                seen.add(key)
+                merged.offer(score_schedule(schedule[0], schedule[1]), schedule)
+        for action_str, visits, mean in root_stats:
+            prev_visits, prev_total = stats.get(action_str, (0, 0.0))
+            stats[action_str] = (prev_visits + visits, prev_total + mean * visits)
+    root_statistics = sorted(
+        ((action_str, visits, total / visits) for action_str, (visits, total) in stats.items()),
+        key=lambda item: -item[1],
+    )
+    return merged.ranked(), root_statistics, total_iterations
@@ -0,0 +1,72 @@
+"""Options shared by every search mode.
+
+A :class:`SearchOptions` describes how a search explores, independently of
+the problem it runs on and of where its results go, so one value can be
+passed from the CLI or the service down to :func:`scheduler.plan_schedules`
+and keyed in the result cache.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Optional, Sequence
+
+# "best_first" clones the world per successor and keeps a bounded frontier;
+# "dfs" applies and undoes actions on one world, using O(depth) memory;
+# "hda" runs best-first in worker processes that own states by world hash.
+SEARCH_MODES = ("best_first", "dfs", "hda")
+
+
+@dataclass(frozen=True)
+class SearchOptions:
+    """How a search explores.
+
+    :ivar num_output_schedules: Number of schedules ranked.
+    :ivar depth_bound: Number of actions in a complete schedule.
+    :ivar frontier_max_size: Best-first frontier size (split between the
+        workers of the hda mode).
+    :ivar search_mode: One of :data:`SEARCH_MODES`.
+    :ivar partial_order_reduction: Expand one order of independent actions
+        only (see :mod:`search.por`).
+    :ivar macros: Sequences of action strings also searched as single steps
+        (see :mod:`search.macros`); not supported by the hda mode.
+    :ivar time_budget: Wall-clock seconds after which no further node is
+        expanded; the best schedules completed by then are returned.
+    :ivar frontier_memory: Approximate bytes of best-first frontier nodes
+        kept in memory; lower-priority nodes beyond it are spilled to disk
+        (see :mod:`search.frontier`). None keeps the whole frontier in memory.
+    :ivar workers: Number of worker processes of the hda mode (see
+        :mod:`search.hda`).
+    """
+
+    num_output_schedules: int = 5
+    depth_bound: int = 3
+    frontier_max_size: int = 100
+    search_mode: str = "best_first"
+    partial_order_reduction: bool = True
+    macros: Optional[Sequence[Sequence[str]]] = None
+    time_budget: Optional[float] = None
+    frontier_memory: Optional[int] = None
+    workers: int = 2
+
+    def __post_init__(self):
+        """Reject modes and combinations no search supports.
+
+        :raises ValueError: If ``search_mode`` is unknown, or if macros are
+            given to the hda mode.
+        """
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search_mode '{self.search_mode}'; expected one of {SEARCH_MODES}.")
+        if self.search_mode == "hda" and self.macros:
+            raise ValueError("The hda search does not support macros.")
+
+    def cache_params(self) -> dict:
+        """Return the options a search's result depends on, for
+        :func:`cache.result_cache.problem_key`.
+
+        The time budget is left out: time-budgeted runs bypass the cache.
+        """
+        params = asdict(self)
+        del params["time_budget"], params["frontier_memory"]
+        params["macros"] = [list(sequence) for sequence in self.macros or ()]
+        # A bounded hda frontier is split per worker, so its results depend on the count.
+        params["workers"] = self.workers if self.search_mode == "hda" else None
+        return params
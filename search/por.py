@@ -0,0 +1,140 @@
+"""Partial-order reduction with sleep sets.
+
+Every action changes resources additively, so two actions that are both
+enabled in a state reach the same state in either order as long as neither
+disables the other. Their step scores must not depend on the order either:
+TRANSFORM scores are fixed by the template, and TRANSFER scores are divided
+by the planning country's Population. Such a pair is *independent* in that
+state. Expanding both orders only duplicates work.
+
+TRANSFER bundles are sized from the surplus and deficit of both countries
+(see :func:`transformations.transformations.trade_bundles`), so an action
+that changes what the sender can spare or what the receiver lacks can make a
+TRANSFER vanish or change size. A TRANSFER therefore depends on every action
+writing one of those resources.
+
+Sleep sets drop the duplicates. Actions are explored in their canonical
+(enumeration) order. The child reached through action ``a`` inherits, as
+asleep, every earlier sibling and every already-sleeping action that is
+independent of ``a``, and it never expands a sleeping action. Each
+equivalence class of schedules is therefore expanded in exactly one order.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from models.world_model import World
+from transformations.transformations import VALID_TRANSFERABLES, Action
+
+SleepSet = Tuple[Action, ...]
+
+
+class IndependenceOracle:
+    """Decides whether two actions commute in a given state.
+
+    Static footprints (resources read and written, as bitmasks) are computed
+    once per action string. Pairs with disjoint footprints are independent in every
+    state. Pairs that only share consumed resources are independent when the
+    state holds enough slack for both.
+    """
+
+    def __init__(self, country_name: str, library=None):
+        """Create an oracle for schedules planned by ``country_name``.
+
+        :param country_name: The planning country, whose Population scales
+            TRANSFER scores.
+        :param library: The TemplateLibrary the TRANSFERs were generated
+            with; its ``demand`` is what a receiver's deficit reads. Without
+            it, a TRANSFER depends on every action touching its receiver.
+        """
+        self.country_name = country_name
+        self.library = library
+        self._footprints: Dict[str, tuple] = {}
+        self._bits: Dict[Tuple[str, str], int] = {}
+
+    def _mask(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """Encode ``(country, resource)`` keys as a bitmask."""
+        mask = 0
+        for key in keys:
+            bit = self._bits.get(key)
+            if bit is None:
+                bit = self._bits[key] = 1 << len(self._bits)
+            mask |= bit
+        return mask
+
+    def _footprint(self, action: Action):
+        footprint = self._footprints.get(action.action_str)
+        if footprint is None:
+            writes = defaultdict(float)
+            for country, resource, amount in action.changes:
+                writes[(country, resource)] += amount
+            reads = [(country, resource) for country, resource, _ in action.preconditions]
+            score_reads, trade_reads, receivers = [], [], frozenset()
+            if action.is_transfer:
+                sender, receiver = action.changes[0][0], action.changes[-1][0]
+                score_reads = [(self.country_name, "Population")]
+                trade_reads = [(sender, resource) for resource in VALID_TRANSFERABLES]
+                if self.library is None:
+                    receivers = frozenset((receiver,))
+                else:
+                    trade_reads += [(receiver, resource) for resource in self.library.demand]
+            footprint = (
+                dict(writes), self._mask(writes), self._mask(reads), self._mask(score_reads),
+                self._mask(trade_reads), receivers, frozenset(country for country, _ in writes),
+            )
+            self._footprints[action.action_str] = footprint
+        return footprint
+
+    @staticmethod
+    def _enabled_after(action: Action, other_writes: dict, world: World) -> bool:
+        """True if ``action`` stays feasible once ``other_writes`` are applied."""
+        for country, resource, minimum in action.preconditions:
+            change = other_writes.get((country, resource))
+            if change is not None and change < 0:
+                if world.countries[country].resources.get(resource, 0) + change < minimum:
+                    return False
+        return True
+
+    def independent(self, first: Action, second: Action, world: World) -> bool:
+        """Return True if both orders of the two actions are feasible from
+        ``world`` and give the same state and the same total score.
+
+        Both actions must be enabled in ``world``.
+
+        :param first: An enabled action.
+        :param second: Another enabled action.
+        :param world: The current state.
+        """
+        if first.action_str == second.action_str:
+            return False
+        writes_a, keys_a, reads_a, score_a, trade_a, receivers_a, countries_a = self._footprint(first)
+        writes_b, keys_b, reads_b, score_b, trade_b, receivers_b, countries_b = self._footprint(second)
+        if keys_a & score_b or keys_b & score_a:
+            return False
+        # A TRANSFER is regenerated from both countries' trade index.
+        if keys_a & trade_b or keys_b & trade_a or receivers_a & countries_b or receivers_b & countries_a:
+            return False
+        if not (keys_a & reads_b or keys_b & reads_a):
+            return True
+        return self._enabled_after(second, writes_a, world) and self._enabled_after(first, writes_b, world)
+
+    def expand(
+        self, actions: Iterable[Action], sleep: SleepSet, world: World
+    ) -> List[Tuple[Action, SleepSet]]:
+        """Pair each action to expand with the sleep set of its child.
+
+        :param actions: The enabled actions, in the order they will be explored.
+        :param sleep: The sleep set of the current node.
+        :param world: The current state.
+        :return: ``(action, child_sleep)`` for every action not asleep.
+        """
+        asleep = {action.action_str for action in sleep}
+        explored: List[Action] = list(sleep)
+        expanded = []
+        for action in actions:
+            if action.action_str in asleep:
+                continue
+            child_sleep = tuple(b for b in explored if self.independent(b, action, world))
+            expanded.append((action, child_sleep))
+            explored.append(action)
+        return expanded
@@ -0,0 +1,69 @@
+"""cProfile and tracemalloc capture around a scheduler run.
+
+Reports are written next to the schedule output, sharing its base name:
+
+* ``<base>.prof``: raw cProfile statistics, for ``pstats`` or snakeviz.
+* ``<base>.profile.txt``: the hottest functions by cumulative time.
+* ``<base>.memory.txt``: peak traced memory and the top allocation sites.
+"""
+
+import io
+from contextlib import contextmanager
+
+PROFILE_MODES = ("cpu", "memory", "all")
+
+# Number of entries listed in the text reports.
+REPORT_LINES = 30
+
+
+@contextmanager
+def profile_capture(base_path: str, mode: str = "all"):
+    """Profile the enclosed block and write reports to ``base_path.*``.
+
+    :param base_path: Output path without extension.
+    :param mode: ``"cpu"`` (cProfile), ``"memory"`` (tracemalloc) or ``"all"``.
+    :return: A dictionary that receives the report paths once the block exits.
+    :raises ValueError: If ``mode`` is unknown.
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}'; expected one of {PROFILE_MODES}.")
+    # Profilers are imported on use, keeping them off the planner's startup path.
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    cpu = mode in ("cpu", "all")
+    memory = mode in ("memory", "all")
+    reports = {}
+    profiler = cProfile.Profile() if cpu else None
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif memory and hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+        tracemalloc.reset_peak()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield reports
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            reports["prof"] = base_path + ".prof"
+            profiler.dump_stats(reports["prof"])
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(REPORT_LINES)
+            reports["profile"] = base_path + ".profile.txt"
+            with open(reports["profile"], "w", encoding="utf-8") as f:
+                f.write(text.getvalue())
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            reports["memory"] = base_path + ".memory.txt"
+            with open(reports["memory"], "w", encoding="utf-8") as f:
+                f.write(f"Current traced memory: {current / 1024:.1f} KiB\n")
+                f.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+                f.write(f"Top {REPORT_LINES} allocation sites still held:\n")
+                for stat in snapshot.statistics("lineno")[:REPORT_LINES]:
+                    f.write(f"{stat}\n")
@@ -0,0 +1,182 @@
+"""Ranking of complete schedules and optimistic bounds used to stop the search
+early.
+
+A schedule's score is its total utility gain, ``eus[-1] - eus[0]``. Every
+search step changes that score by at most :func:`optimistic_step_gain`, so a
+partial schedule at depth ``d`` can never finish above
+``score + (depth_bound - d) * step_gain``. Once the best such bound left in the
+frontier cannot beat the worst of the top-k complete schedules, the search
+can stop.
+"""
+
+import heapq
+import itertools
+from typing import List, Optional, Tuple
+
+from evaluations.state_quality import is_quality_model
+from transformations.transformations import (
+    MAX_BUNDLE_RESOURCES,
+    MAX_TRANSFER_AMOUNT,
+    TRANSFER_PENALTY_FACTOR,
+    VALID_TRANSFERABLES,
+    TemplateLibrary,
+)
+
+# Flat penalty the scheduler subtracts from the score of every TRANSFER step.
+TRANSFER_ACTION_PENALTY = 10
+
+
+def score_schedule(actions, eus) -> float:
+    """Total utility gain across all steps of a schedule.
+
+    :param actions: Action strings of the schedule (unused, kept for symmetry
+        with the schedule tuples the scheduler produces).
+    :param eus: EU values, starting with the initial state's EU.
+    :return: ``eus[-1] - eus[0]``.
+    """
+    del actions
+    return eus[-1] - eus[0]
+
+
+def step_score(action_str: str, delta_score: float) -> float:
+    """Score of one search step: its delta score, less the transfer penalty.
+
+    :param action_str: The action in schedule notation.
+    :param delta_score: The action's delta score.
+    :return: The penalized step score.
+    """
+    penalty = TRANSFER_ACTION_PENALTY if "TRANSFER" in action_str else 0
+    return delta_score - penalty
+
+
+def optimistic_step_gain(
+    library: TemplateLibrary, weights: dict, population: float, depth_bound: int, resources: Optional[dict] = None
+) -> float:
+    """Upper bound on the score change of any single search step.
+
+    TRANSFORM steps score the weighted net change of their variant, which does
+    not depend on the state, so the bound is exact for them. TRANSFER steps
+    score the per-capita quality change of the planning country minus
+    :data:`TRANSFER_ACTION_PENALTY`; the bound divides the largest possible
+    weighted change of a bundle (its best resources, each moved at the
+    largest amount) by the smallest population reachable within
+    ``depth_bound`` steps.
+
+    Under a quality model every step scores a quality change, bounded by
+    :meth:`~evaluations.quality_model.QualityModel.step_bounds` from the
+    planning country's initial ``resources``.
+
+    :param library: The compiled templates used by the search.
+    :param weights: Dictionary of resource weights, or a QualityModel.
+    :param population: Initial population of the planning country.
+    :param depth_bound: Number of steps the search may take.
+    :param resources: Initial resources of the planning country; needed only
+        for a quality model (without them the bound is infinite).
+    :return: The largest score change any one step can produce.
+    """
+    if is_quality_model(weights):
+        if resources is None:
+            return float("inf")
+        transform_bound, transfer_bound = weights.step_bounds(library, resources, depth_bound)
+        return max(transform_bound, transfer_bound - TRANSFER_ACTION_PENALTY)
+    best = float("-inf")
+    largest_loss = 0.0
+    for variant in library.variants:
+        net = dict(variant.transform.outputs)
+        for res, amt in variant.transform.inputs.items():
+            net[res] = net.get(res, 0) - amt
+        best = max(best, sum(weights.get(res, 0) * amt for res, amt in net.items()))
+        largest_loss = max(largest_loss, -net.get("Population", 0))
+
+    min_population = max(1.0, population - depth_bound * largest_loss)
+    energy_weight = weights.get("PotentialEnergyUsable", 0)
+    item_gains = []
+    for res in VALID_TRANSFERABLES:
+        weight = weights.get(res, 0)
+        cost = weights.get(res, 1) * TRANSFER_PENALTY_FACTOR
+        received = weight * MAX_TRANSFER_AMOUNT
+        sent = (-weight - energy_weight * cost) * MAX_TRANSFER_AMOUNT
+        item_gains.append(max(received, sent, 0.0))
+    # A bundle moves up to MAX_BUNDLE_RESOURCES resources in one direction.
+    numerator = sum(sorted(item_gains, reverse=True)[:MAX_BUNDLE_RESOURCES])
+    best = max(best, numerator / min_population - TRANSFER_ACTION_PENALTY)
+    return best
+
+
+class TopKSchedules:
+    """Bounded min-heap of the best complete schedules seen so far.
+
+    The worst kept schedule sits at the root, so deciding whether a new
+    schedule (or a frontier bound) can still enter the top-k is O(1).
+    """
+
+    def __init__(self, k: int, unique: bool = False, floor: float = float("-inf")):
+        """Create an empty top-k store.
+
+        :param k: Number of schedules to keep.
+        :param unique: Reject a schedule whose action sequence is already
+            kept, for searches (such as those with macro-actions) that can
+            reach the same schedule along several paths.
+        :param floor: A score that k reachable schedules are already known to
+            reach (e.g. the previous turn's best, replayed); anything scoring
+            below it is rejected even before k schedules are kept.
+        """
+        self.k = k
+        self.unique = unique
+        self.floor = floor
+        self._heap: List[Tuple[float, int, tuple]] = []
+        self._counter = itertools.count()
+        self._kept = set()
+
+    def __len__(self):
+        """Return the number of schedules currently kept."""
+        return len(self._heap)
+
+    def full(self) -> bool:
+        """Return True once k schedules are kept."""
+        return len(self._heap) >= self.k
+
+    def threshold(self) -> float:
+        """Score a schedule must beat to enter, or -inf while not full."""
+        return self._heap[0][0] if self.full() else float("-inf")
+
+    def can_enter(self, bound: float) -> bool:
+        """Return True if a schedule scoring ``bound`` would be kept.
+
+        :param bound: Score, or an upper bound on a future score.
+        """
+        if self.k <= 0:
+            return False
+        if self.full():
+            # Everything kept already clears the floor.
+            return bound > self._heap[0][0]
+        return not bound < self.floor
+
+    def offer(self, score: float, schedule: tuple) -> bool:
+        """Keep ``schedule`` if it ranks among the best k.
+
+        :param score: The schedule's ranking score.
+        :param schedule: An ``(actions, eus, deltas)`` tuple.
+        :return: True if the schedule was kept.
+        """
+        if not self.can_enter(score):
+            return False
+        if self.unique:
+            key = tuple(schedule[0])
+            if key in self._kept:
+                return False
+            self._kept.add(key)
+        entry = (score, -next(self._counter), schedule)
+        if self.full():
+            evicted = heapq.heapreplace(self._heap, entry)
+            self._kept.discard(tuple(evicted[2][0]))
+        else:
+            heapq.heappush(self._heap, entry)
+        return True
+
+    def ranked(self) -> List[tuple]:
+        """Return the kept schedules, best first.
+
+        Ties keep the order in which schedules were found.
+        """
+        return [schedule for _, _, schedule in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
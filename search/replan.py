@@ -0,0 +1,137 @@
+"""Support for warm-start replanning between turns.
+
+From one turn to the next the world changes only slightly. A replanning
+search (see :func:`scheduler.replan_schedules`) reuses two things from the
+previous one:
+
+* the previous best schedules, replayed on the new world: those still
+  feasible give a score that k schedules are known to reach, which the new
+  search uses as a pruning floor from its first expansion;
+* a :class:`TranspositionTable` of the nodes generated so far, keyed by
+  action path. Every action changes resources additively, so a node reached
+  by the same path from a changed root is the old node shifted by the root's
+  change. Cached nodes are repaired in place, and template feasibility is
+  rechecked only for templates reading a changed resource, instead of being
+  cloned, re-applied and fully rechecked (see
+  :meth:`transformations.transformations.TemplateLibrary.shift_feasible_mask`).
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models.world_model import World
+from search.ranking import step_score
+from transformations.transformations import action_from_string, apply_action
+
+Change = Tuple[str, str, float]
+
+
+def changes_from_deltas(deltas: Dict[str, dict]) -> List[Change]:
+    """Flatten ``{country: {resource: change}}`` into sorted change triples."""
+    return [
+        (country, resource, amount)
+        for country in sorted(deltas)
+        for resource, amount in sorted(deltas[country].items())
+        if amount
+    ]
+
+
+def replay_schedule(world: World, country_name: str, actions: List[str], library, weights: dict) -> Optional[tuple]:
+    """Re-run a schedule's actions from ``world`` and rescore it.
+
+    :param world: The state to start from; not modified.
+    :param country_name: Name of the planning country.
+    :param actions: The schedule's action strings.
+    :param library: The TemplateLibrary the actions refer to.
+    :param weights: Dictionary of resource weights.
+    :return: The ``(actions, eus, deltas)`` schedule, or None if an action is
+        unknown or no longer feasible.
+    """
+    from evaluations.state_quality import compute_state_quality
+
+    world = world.clone()
+    eus = [compute_state_quality(world.get_country(country_name).resources, weights)]
+    deltas = []
+    for action_str in actions:
+        try:
+            action = action_from_string(action_str, library, weights)
+        except ValueError:
+            return None
+        countries = world.countries
+        if not all(
+            country in countries and countries[country].resources.get(resource, 0) >= minimum
+            for country, resource, minimum in action.preconditions
+        ):
+            return None
+        _, delta, delta_score = apply_action(world, country_name, action, weights)
+        eus.append(eus[-1] + step_score(action_str, delta_score))
+        deltas.append(delta)
+    return list(actions), eus, deltas
+
+
+class TranspositionTable:
+    """Search nodes kept between searches, keyed by action path.
+
+    World changes observed between searches are recorded with
+    :meth:`advance` and applied to a node lazily, when it is next looked up,
+    so nodes the next search never reaches cost nothing to keep current.
+
+    :ivar hits: Lookups answered from the table.
+    :ivar misses: Lookups of unknown paths.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        """Create an empty table.
+
+        :param max_entries: Paths kept at most; further new paths are not
+            stored.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._epochs: List[Tuple[Change, ...]] = []
+        self._since = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def epoch(self) -> int:
+        """Number of world changes recorded so far."""
+        return len(self._epochs)
+
+    def advance(self, changes: Iterable[Change]):
+        """Record a change of the root world, to be applied to every node."""
+        self._epochs.append(tuple(changes))
+        self._since.clear()
+
+    def since(self, epoch: int) -> Tuple[Change, ...]:
+        """Return every change recorded from ``epoch`` on, in order."""
+        pending = self._since.get(epoch)
+        if pending is None:
+            pending = self._since[epoch] = tuple(c for changes in self._epochs[epoch:] for c in changes)
+        return pending
+
+    def get(self, path: tuple):
+        """Look up a node.
+
+        :param path: The node's action strings, as a tuple.
+        :return: ``(node, epoch)``, where the changes in :meth:`since`
+            ``(epoch)`` are still to be applied to the node's world, or None
+            for an unknown path.
+        """
+        entry = self._entries.get(path)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, path: tuple, node):
+        """Store ``node``, current as of the latest recorded change."""
+        if len(self._entries) < self.max_entries or path in self._entries:
+            self._entries[path] = (node, self.epoch)
+
+    def clear(self):
+        """Drop every node."""
+        self._entries.clear()
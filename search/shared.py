@@ -0,0 +1,449 @@
+"""Read-only planning data in shared memory for worker processes.
+
+Process pools normally receive the world, the weights and the compiled
+templates by pickling them into every job (or every worker). A
+:class:`SharedProblem` instead publishes them once into a single
+:mod:`multiprocessing.shared_memory` block:
+
+* the world as a ``(countries x resources)`` matrix,
+* the weights as a vector over the same resource columns,
+* the base templates as input, output and required matrices, and the
+  compiled variants as ``need`` and ``delta`` matrices (what a variant must
+  find held, and its net change), laid out like those of
+  :class:`simulation.turn_engine.TurnEngine`.
+
+Each dictionary-backed table is stored with a key-order matrix (``-1`` for
+missing keys) and an integer flag, so the dictionaries rebuilt in a worker
+equal the originals, key order and ``int``/``float`` types included, and
+searches there produce the same schedules.
+
+Workers receive a small picklable :class:`ProblemHandle` and attach to the
+block by name with :func:`attach_problem`; the arrays are read-only views of
+the shared pages, never copies. :func:`worker_problem` attaches once per
+process and rebuilds the search objects from the views. The publishing
+process owns the block and unlinks it on :meth:`SharedProblem.close`, on
+leaving its ``with`` block, or at the latest when it is garbage collected.
+
+``python -m search.shared`` compares worker startup time and memory against
+pickling on an enlarged copy of the sample problem.
+"""
+
+import argparse
+import json
+import pickle
+import sys
+import time
+import weakref
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from evaluations.quality_model import QualityModel
+from evaluations.state_quality import is_quality_model
+from models.world_model import Country, World
+from parsers.problem_parser import load_problem
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+# Byte alignment of every array in the block.
+ALIGNMENT = 64
+
+TEMPLATE_SECTIONS = ("inputs", "outputs", "required")
+
+
+@dataclass(frozen=True)
+class ProblemHandle:
+    """Everything a worker needs to attach to a :class:`SharedProblem`.
+
+    :ivar name: Name of the shared-memory block.
+    :ivar layout: ``(key, offset, shape, dtype)`` of every array in the block.
+    :ivar countries: Country names, in row order.
+    :ivar resources: Resource names, in column order.
+    :ivar templates: Base template names, in row order.
+    :ivar scales: Scale factors the library is compiled for.
+    :ivar digest: The library's source digest, or None.
+    :ivar quality_spec: The terms of a
+        :class:`~evaluations.quality_model.QualityModel` passed as the
+        weights, or None for plain weights.
+    """
+
+    name: str
+    layout: Tuple[Tuple[str, int, Tuple[int, ...], str], ...]
+    countries: Tuple[str, ...]
+    resources: Tuple[str, ...]
+    templates: Tuple[str, ...]
+    scales: Tuple[int, ...]
+    digest: Optional[str]
+    quality_spec: Optional[tuple] = None
+
+
+def _encode_rows(rows: List[dict], index: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Encode dictionaries over resource columns as values, key order and int flags."""
+    shape = (len(rows), len(index))
+    values = np.zeros(shape)
+    order = np.full(shape, -1, dtype=np.int16)
+    integral = np.zeros(shape, dtype=bool)
+    for r, row in enumerate(rows):
+        for position, (res, amount) in enumerate(row.items()):
+            column = index[res]
+            values[r, column] = amount
+            order[r, column] = position
+            integral[r, column] = isinstance(amount, int)
+    return {"values": values, "order": order, "integral": integral}
+
+
+def _decode_rows(values: np.ndarray, order: np.ndarray, integral: np.ndarray, resources) -> List[dict]:
+    """Rebuild the dictionaries encoded by :func:`_encode_rows`."""
+    rows, columns = np.nonzero(order >= 0)
+    # Entries row by row, each row's keys in their original order.
+    sort = np.lexsort((order[rows, columns], rows))
+    rows, columns = rows[sort], columns[sort]
+    amounts = values[rows, columns].tolist()
+    integral = integral[rows, columns].tolist()
+    decoded = [{} for _ in range(values.shape[0])]
+    for row, column, amount, is_int in zip(rows.tolist(), columns.tolist(), amounts, integral):
+        decoded[row][resources[column]] = int(amount) if is_int else amount
+    return decoded
+
+
+def _problem_arrays(world: World, weights: dict, library: TemplateLibrary, resources) -> Dict[str, np.ndarray]:
+    """Return every array a :class:`SharedProblem` publishes, by key."""
+    index = {res: i for i, res in enumerate(resources)}
+    arrays = {}
+    tables = {
+        "world": [country.resources for country in world.all_countries()],
+        "weights": [weights],
+    }
+    for section in TEMPLATE_SECTIONS:
+        tables[section] = [getattr(template, section) for template in library.templates]
+    for table, rows in tables.items():
+        for part, array in _encode_rows(rows, index).items():
+            arrays[f"{table}.{part}"] = array
+
+    need = np.zeros((len(library.variants), len(resources)))
+    delta = np.zeros_like(need)
+    for v, variant in enumerate(library.variants):
+        scaled = variant.transform
+        for res, amount in scaled.required.items():
+            need[v, index[res]] = max(need[v, index[res]], amount)
+        for res, amount in scaled.inputs.items():
+            need[v, index[res]] = max(need[v, index[res]], amount)
+            delta[v, index[res]] -= amount
+        for res, amount in scaled.outputs.items():
+            delta[v, index[res]] += amount
+    arrays["need"] = need
+    arrays["delta"] = delta
+    return arrays
+
+
+def _release(block: shared_memory.SharedMemory, unlink: bool):
+    """Close ``block`` and, for its owner, remove it."""
+    block.close()
+    if unlink:
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedProblem:
+    """Owner of a shared-memory block holding one planning problem.
+
+    :ivar handle: The :class:`ProblemHandle` to send to workers.
+    """
+
+    def __init__(self, world: World, weights: dict, library: TemplateLibrary):
+        """Copy the problem into a new shared-memory block.
+
+        :param world: The world to publish; not modified.
+        :param weights: Dictionary of resource weights, or a QualityModel.
+        :param library: The compiled TemplateLibrary.
+        """
+        names = set(library.resources) | set(weights)
+        for country in world.all_countries():
+            names |= set(country.resources)
+        resources = tuple(sorted(names))
+        arrays = _problem_arrays(world, weights, library, resources)
+
+        layout, offset = [], 0
+        for key, array in arrays.items():
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            layout.append((key, offset, array.shape, array.dtype.str))
+            offset += array.nbytes
+        self._block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for key, start, shape, dtype in layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self._block.buf, offset=start)
+            view[...] = arrays[key]
+        # No view of the buffer may outlive this point, or closing it fails.
+        del view
+
+        self.handle = ProblemHandle(
+            name=self._block.name,
+            layout=tuple(layout),
+            countries=tuple(country.name for country in world.all_countries()),
+            resources=resources,
+            templates=tuple(template.name for template in library.templates),
+            scales=tuple(library.scales),
+            digest=library.digest,
+            quality_spec=weights.spec if is_quality_model(weights) else None,
+        )
+        self._finalizer = weakref.finalize(self, _release, self._block, True)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the shared block in bytes."""
+        return self._block.size
+
+    def close(self):
+        """Release and unlink the block; workers must not attach afterwards."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AttachedProblem:
+    """A worker's read-only view of a :class:`SharedProblem`.
+
+    :ivar handle: The handle it was attached with.
+    :ivar arrays: Read-only numpy views of the shared arrays, by key (e.g.
+        ``"world.values"``, ``"weights.values"``, ``"need"``, ``"delta"``).
+    """
+
+    def __init__(self, handle: ProblemHandle):
+        """Attach to the block named by ``handle``.
+
+        :param handle: The owner's :class:`ProblemHandle`.
+        :raises FileNotFoundError: If the owner has already closed the block.
+        """
+        self.handle = handle
+        self._block = shared_memory.SharedMemory(name=handle.name)
+        self.arrays: Dict[str, np.ndarray] = {}
+        for key, offset, shape, dtype in handle.layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self._block.buf, offset=offset)
+            view.flags.writeable = False
+            self.arrays[key] = view
+
+    def _table(self, table: str) -> List[dict]:
+        arrays = self.arrays
+        return _decode_rows(
+            arrays[f"{table}.values"], arrays[f"{table}.order"], arrays[f"{table}.integral"],
+            self.handle.resources,
+        )
+
+    def world(self) -> World:
+        """Build a new World from the shared world matrix."""
+        return World([Country(name, res) for name, res in zip(self.handle.countries, self._table("world"))])
+
+    def weights(self) -> dict:
+        """Build the weights dictionary from the shared weight vector, or the
+        quality model compiled from it and the handle's spec."""
+        weights = self._table("weights")[0]
+        if self.handle.quality_spec is None:
+            return weights
+        return QualityModel(weights, self.handle.quality_spec)
+
+    def library(self) -> TemplateLibrary:
+        """Compile a TemplateLibrary from the shared template matrices."""
+        sections = [self._table(section) for section in TEMPLATE_SECTIONS]
+        templates = [
+            TransformTemplate(name, inputs, outputs, required)
+            for name, inputs, outputs, required in zip(self.handle.templates, *sections)
+        ]
+        return TemplateLibrary(templates, self.handle.scales, self.handle.digest)
+
+    def close(self):
+        """Drop the views and detach; the block itself stays for its owner."""
+        self.arrays = {}
+        self._block.close()
+
+
+def attach_problem(handle: ProblemHandle) -> AttachedProblem:
+    """Attach to a published problem by name, without copying it.
+
+    :param handle: The owner's :class:`ProblemHandle`.
+    :return: The :class:`AttachedProblem`.
+    """
+    return AttachedProblem(handle)
+
+
+# Per-process cache of attached problems: block name -> (attached, world,
+# weights, library).
+_WORKER_PROBLEMS: Dict[str, tuple] = {}
+
+
+def worker_problem(handle: ProblemHandle) -> Tuple[World, dict, TemplateLibrary]:
+    """Return ``(world, weights, library)`` for ``handle``, attaching and
+    rebuilding them only on this process's first call.
+
+    The world is shared by every call in the process, so callers must leave
+    it as they found it (as the in-place searches do).
+
+    :param handle: The owner's :class:`ProblemHandle`.
+    :return: ``(world, weights, template_library)``.
+    """
+    cached = _WORKER_PROBLEMS.get(handle.name)
+    if cached is None:
+        attached = attach_problem(handle)
+        cached = (attached, attached.world(), attached.weights(), attached.library())
+        _WORKER_PROBLEMS[handle.name] = cached
+    return cached[1:]
+
+
+def process_memory() -> Optional[dict]:
+    """Return this process's resident (``rss``), proportional (``pss``) and
+    private memory in KiB, or None where ``/proc`` is unavailable.
+
+    Shared pages count fully towards ``rss`` but are split between the
+    processes mapping them in ``pss``; ``private`` counts pages no other
+    process maps.
+    """
+    fields = {
+        "Rss:": "rss_kib",
+        "Pss:": "pss_kib",
+        "Private_Clean:": "private_kib",
+        "Private_Dirty:": "private_kib",
+    }
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    key = fields[parts[0]]
+                    memory[key] = memory.get(key, 0) + int(parts[1])
+    except OSError:
+        return None
+    return memory
+
+
+def _benchmark_worker(inbox, outbox):
+    """Benchmark process: receive the problem or a handle and report the cost."""
+    before = process_memory()
+    sent, payload = inbox.get()
+    received = time.time()
+    if isinstance(payload, ProblemHandle):
+        attached = attach_problem(payload)
+        attach_s = time.perf_counter()
+        world, weights, library = attached.world(), attached.weights(), attached.library()
+        attach_s = time.perf_counter() - attach_s
+    else:
+        world, weights, library = payload
+        attach_s = 0.0
+    ready = time.time()
+    after = process_memory()
+    outbox.put(
+        {
+            "transfer_s": received - sent,
+            "attach_s": attach_s,
+            "ready_s": ready - sent,
+            "countries": len(world.countries),
+            "variants": len(library.variants),
+            "weights": len(weights),
+            "memory_before": before,
+            "memory_after": after,
+        }
+    )
+    # Hold the problem until the parent has read every report.
+    inbox.get()
+
+
+def benchmark_startup(world: World, weights: dict, library: TemplateLibrary, workers: int = 2) -> dict:
+    """Time how long ``workers`` fresh processes take to hold the problem.
+
+    In ``"pickle"`` mode the problem itself is sent to each worker through a
+    queue, as a process pool sends job arguments; in ``"shared"`` mode it is
+    published once and each worker receives a :class:`ProblemHandle` and
+    rebuilds the search objects from the shared arrays.
+
+    :param world: The world to send.
+    :param weights: Dictionary of resource weights.
+    :param library: The compiled TemplateLibrary.
+    :param workers: Number of worker processes per mode.
+    :return: Per mode: the wall time until every worker was ready, the
+        payload size, and per-worker means of the time to receive and
+        rebuild the problem and of the memory it added.
+    """
+    import multiprocessing
+
+    results = {}
+    for mode in ("pickle", "shared"):
+        started = time.perf_counter()
+        shared = SharedProblem(world, weights, library) if mode == "shared" else None
+        payload = shared.handle if shared is not None else (world, weights, library)
+        inbox, outbox = multiprocessing.Queue(), multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_benchmark_worker, args=(inbox, outbox)) for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            inbox.put((time.time(), payload))
+        reports = [outbox.get() for _ in processes]
+        wall = time.perf_counter() - started
+        for _ in processes:
+            inbox.put(None)
+        for process in processes:
+            process.join()
+        if shared is not None:
+            shared.close()
+
+        summary = {
+            "workers": workers,
+            "wall_s": round(wall, 6),
+            "payload_bytes": len(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)),
+            "shared_bytes": shared.nbytes if shared is not None else 0,
+        }
+        for key in ("transfer_s", "attach_s", "ready_s"):
+            summary[key] = round(sum(report[key] for report in reports) / workers, 6)
+        if all(report["memory_before"] and report["memory_after"] for report in reports):
+            for key in ("rss_kib", "pss_kib", "private_kib"):
+                growth = [report["memory_after"][key] - report["memory_before"][key] for report in reports]
+                summary[key.replace("_kib", "_growth_kib")] = round(sum(growth) / workers)
+        results[mode] = summary
+    return results
+
+
+def enlarged_problem(world: World, weights: dict, library: TemplateLibrary, copies: int):
+    """Return a problem with ``copies`` renamed copies of every country and
+    base template, for benchmarks.
+
+    :return: ``(world, weights, template_library)``.
+    """
+    countries = [
+        Country(f"{country.name}{i}", dict(country.resources))
+        for i in range(copies)
+        for country in world.all_countries()
+    ]
+    templates = [
+        TransformTemplate(
+            f"{template.name}{i}", dict(template.inputs), dict(template.outputs), dict(template.required)
+        )
+        for i in range(copies)
+        for template in library.templates
+    ]
+    return World(countries), dict(weights), TemplateLibrary(templates, library.scales)
+
+
+def main(argv=None):
+    """Print a JSON comparison of worker startup with pickling and shared memory."""
+    parser = argparse.ArgumentParser(description="Compare worker startup: pickled problem vs shared memory.")
+    parser.add_argument("--resources", default="data/weights.csv")
+    parser.add_argument("--initial-state", default="data/resources.csv")
+    parser.add_argument("--templates", default="data/templates.txt")
+    parser.add_argument("--copies", type=int, default=1000, help="Copies of every country and template.")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    problem = enlarged_problem(*load_problem(args.resources, args.initial_state, args.templates), args.copies)
+    results = benchmark_startup(*problem, workers=args.workers)
+    json.dump(results, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Re-score one explored search tree under many weight vectors.
+
+State quality is linear in the weights, so every schedule's score can be
+written once as vectors over the resources and then evaluated for a whole
+batch of weight sets with matrix products:
+
+* a TRANSFORM step scores ``delta . w``, where ``delta`` is the template's
+  net change;
+* a TRANSFER step scores ``(free_after / pop_after - free_before /
+  pop_before) . w``, minus the energy its sender paid, which is itself
+  ``TRANSFER_PENALTY_FACTOR`` x amount x the weight of the resource sent.
+
+Summed over a schedule, with ``W`` a ``(resources, weight sets)`` matrix::
+
+    score = G @ W - W[energy] * (H @ W_cost) - TRANSFER_ACTION_PENALTY * transfers
+
+where ``free`` vectors exclude transfer costs, ``H`` collects those costs per
+unit of weight, and ``W_cost`` is ``W`` with unlisted resources weighted 1
+(the default of :func:`transformations.transformations.transfer_action`).
+
+:func:`record_sweep_tree` enumerates every schedule reachable under one
+weight set; :meth:`SweepTree.top_schedules` ranks them under each weight set
+of a batch. A weight set that makes a recorded TRANSFER unaffordable drops
+every schedule through it. TRANSFERs only affordable under cheaper weights
+than the recording ones are not in the tree, and TRANSFER bundles are
+composed by the recording weights, so record with the cheapest weights of
+the sweep, and expect exact results only for sets ranking resources alike.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from evaluations.state_quality import is_quality_model
+from models.world_model import World
+from search.por import IndependenceOracle
+from search.ranking import TRANSFER_ACTION_PENALTY
+from transformations.transformations import TRANSFER_PENALTY_FACTOR, iter_actions, transfer_items
+
+ENERGY = "PotentialEnergyUsable"
+
+
+class SweepTree:
+    """Every complete schedule of a search tree, as weight-independent vectors.
+
+    :ivar resources: Resource names, in vector order.
+    :ivar actions: The action strings of each schedule.
+    :ivar score_vectors: ``(schedules, resources)`` array ``G``.
+    :ivar cost_vectors: ``(schedules, resources)`` array ``H``.
+    :ivar transfers: Number of TRANSFERs in each schedule.
+    :ivar expanded: Number of nodes expanded while recording.
+    """
+
+    def __init__(self, resources: List[str]):
+        self.resources = list(resources)
+        self.actions: List[Tuple[str, ...]] = []
+        self.expanded = 0
+        self._g, self._h, self._transfers, self._leaves = [], [], [], []
+        # Tree nodes (root first) and the energy constraints of their last step.
+        self._parents, self._depths = [-1], [0]
+        self._constraints: List[Tuple[int, float, np.ndarray]] = []
+        self.score_vectors = self.cost_vectors = self.transfers = None
+
+    def add_node(
+        self, parent: int, depth: int, slack: Optional[float] = None, costs: Optional[np.ndarray] = None
+    ) -> int:
+        """Add a tree node and return its index; the root is node 0.
+
+        :param parent: Index of the parent node.
+        :param depth: Depth of the node.
+        :param slack: Energy left for the node's last step under the recording
+            weights, or None when that step has no weight-dependent energy need.
+        :param costs: Cost vector whose product with the cost weights must
+            not exceed ``slack``.
+        """
+        node = len(self._parents)
+        self._parents.append(parent)
+        self._depths.append(depth)
+        if slack is not None:
+            self._constraints.append((node, slack, costs))
+        return node
+
+    def add_leaf(self, node: int, actions: Tuple[str, ...], g: np.ndarray, h: np.ndarray, transfers: int):
+        """Add the complete schedule ending at ``node``.
+
+        :param node: Index of the schedule's last node.
+        :param actions: The schedule's action strings.
+        :param g: Its score vector.
+        :param h: Its cost vector.
+        :param transfers: Its number of TRANSFERs.
+        """
+        self.actions.append(actions)
+        self._g.append(g)
+        self._h.append(h)
+        self._transfers.append(transfers)
+        self._leaves.append(node)
+
+    def finish(self):
+        """Stack the added schedules into arrays; call once, after the last one."""
+        width = len(self.resources)
+        self.score_vectors = np.array(self._g).reshape(-1, width)
+        self.cost_vectors = np.array(self._h).reshape(-1, width)
+        self.transfers = np.array(self._transfers, dtype=np.int64)
+        self._leaves = np.array(self._leaves, dtype=np.intp)
+        self._parents = np.array(self._parents, dtype=np.intp)
+        self._depths = np.array(self._depths, dtype=np.intp)
+        del self._g, self._h
+
+    def weight_matrices(self, weight_sets: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ``(resources, weight sets)`` quality and cost weight matrices."""
+        quality = np.array([[weights.get(res, 0) for weights in weight_sets] for res in self.resources], dtype=float)
+        cost = np.array([[weights.get(res, 1) for weights in weight_sets] for res in self.resources], dtype=float)
+        return quality.reshape(len(self.resources), -1), cost.reshape(len(self.resources), -1)
+
+    def feasible(self, cost_weights: np.ndarray) -> np.ndarray:
+        """Return a ``(schedules, weight sets)`` mask of affordable schedules.
+
+        :param cost_weights: Cost weight matrix from :meth:`weight_matrices`.
+        """
+        ok = np.ones((len(self._parents), cost_weights.shape[1]), dtype=bool)
+        if self._constraints:
+            nodes, slack, costs = zip(*self._constraints)
+            required = np.array(costs) @ cost_weights
+            # Tolerate rounding in the slack, which was exact when recorded.
+            ok[list(nodes)] = np.array(slack)[:, None] + 1e-9 >= required
+        for depth in range(1, int(self._depths.max(initial=0)) + 1):
+            level = np.flatnonzero(self._depths == depth)
+            ok[level] &= ok[self._parents[level]]
+        return ok[self._leaves]
+
+    def scores(self, weight_sets: List[dict]) -> np.ndarray:
+        """Score every schedule under every weight set.
+
+        :param weight_sets: Weight dictionaries, as read from ``weights.csv``.
+        :return: ``(schedules, weight sets)`` scores; -inf where a schedule
+            cannot be afforded.
+        """
+        quality, cost = self.weight_matrices(weight_sets)
+        energy = self.resources.index(ENERGY)
+        raw = (
+            self.score_vectors @ quality
+            - quality[energy][None, :] * (self.cost_vectors @ cost)
+            - TRANSFER_ACTION_PENALTY * self.transfers[:, None]
+        )
+        return np.where(self.feasible(cost), raw, -np.inf)
+
+    def top_schedules(self, weight_sets: List[dict], k: int) -> List[List[Tuple[List[str], float]]]:
+        """Return the best ``k`` schedules for each weight set.
+
+        :param weight_sets: Weight dictionaries.
+        :param k: Number of schedules per weight set.
+        :return: For each weight set, ``(actions, score)`` pairs, best first;
+            ties keep enumeration order.
+        """
+        scores = self.scores(weight_sets)
+        report = []
+        for column in scores.T:
+            order = np.argsort(-column, kind="stable")[:k]
+            report.append([(list(self.actions[i]), float(column[i])) for i in order if np.isfinite(column[i])])
+        return report
+
+
+def record_sweep_tree(
+    world: World,
+    country_name: str,
+    library,
+    weights: dict,
+    depth_bound: int,
+    partial_order_reduction: bool = True,
+) -> SweepTree:
+    """Enumerate every schedule of ``depth_bound`` steps, without pruning.
+
+    The world is mutated during the enumeration and restored before
+    returning, as in :func:`search.dfs.depth_first_search`.
+
+    :param world: The world to plan in.
+    :param country_name: Name of the planning country.
+    :param library: The TemplateLibrary used to generate TRANSFORMs.
+    :param weights: Weights deciding which TRANSFERs are affordable.
+    :param depth_bound: Number of actions in a complete schedule.
+    :param partial_order_reduction: Enumerate one order of independent
+        actions only; their scores agree under every weight set.
+    :return: The recorded :class:`SweepTree`.
+    :raises ValueError: If ``weights`` is a quality model, whose scores are
+        not linear in the weights.
+    """
+    if is_quality_model(weights):
+        raise ValueError("Weight sweeps re-score linear weights; a quality model cannot be swept.")
+    resources = set(weights) | set(library.resources) | {ENERGY}
+    for country in world.all_countries():
+        resources |= set(country.resources)
+    tree = SweepTree(sorted(resources))
+    index = {res: i for i, res in enumerate(tree.resources)}
+    energy = index[ENERGY]
+    recorded_cost = np.array([weights.get(res, 1) for res in tree.resources], dtype=float)
+    self_resources = world.get_country(country_name).resources
+    oracle = IndependenceOracle(country_name, library) if partial_order_reduction else None
+    zero = np.zeros(len(tree.resources))
+    actions: List[str] = []
+
+    def free_vector(resources: dict, paid: np.ndarray) -> np.ndarray:
+        vector = np.zeros(len(tree.resources))
+        for res, amount in resources.items():
+            vector[index[res]] = amount
+        vector[energy] += paid @ recorded_cost
+        return vector
+
+    def visit(depth, node, sleep, g, h, transfers, paid: Dict[str, np.ndarray]):
+        if depth == depth_bound:
+            tree.add_leaf(node, tuple(actions), g, h, transfers)
+            return
+        tree.expanded += 1
+        available = list(iter_actions(world, country_name, library, weights))
+        if oracle is not None:
+            expansion = oracle.expand(available, sleep, world)
+        else:
+            expansion = [(action, ()) for action in available]
+
+        for action, child_sleep in expansion:
+            child_g, child_h, child_paid = g, h, paid
+            if action.is_transfer:
+                sender = action.changes[0][0]
+                sender_paid = paid.get(sender, zero)
+                after_paid = sender_paid.copy()
+                sent_energy = 0
+                for resource, amount in transfer_items(action):
+                    after_paid[index[resource]] += TRANSFER_PENALTY_FACTOR * amount
+                    if resource == ENERGY:
+                        sent_energy += amount
+                sender_energy = world.get_country(sender).resources.get(ENERGY, 0) + sender_paid @ recorded_cost
+                slack = sender_energy - sent_energy
+                constraint = (slack, after_paid)
+                child_paid = dict(paid, **{sender: after_paid})
+                self_paid, self_after_paid = paid.get(country_name, zero), child_paid.get(country_name, zero)
+                before, population_before = free_vector(self_resources, self_paid), self_resources.get("Population", 0)
+            else:
+                # A TRANSFORM's energy need only moves with the weights once
+                # this country has paid for a TRANSFER.
+                self_paid = paid.get(country_name)
+                need = max((m for _, res, m in action.preconditions if res == ENERGY), default=None)
+                constraint = None
+                if self_paid is not None and need is not None:
+                    slack = self_resources.get(ENERGY, 0) + self_paid @ recorded_cost - need
+                    constraint = (slack, self_paid)
+
+            undo = world.apply_changes(action.changes)
+            if action.is_transfer:
+                population_after = self_resources.get("Population", 0)
+                if population_before == 0 or population_after == 0:
+                    # Quality is undefined without population; never ranked.
+                    world.undo_changes(undo)
+                    continue
+                after = free_vector(self_resources, self_after_paid)
+                child_g = g + after / population_after - before / population_before
+                child_h = h + self_after_paid / population_after - self_paid / population_before
+            else:
+                child_g = g.copy()
+                for _, res, amount in action.changes:
+                    child_g[index[res]] += amount
+
+            child = tree.add_node(node, depth + 1, *(constraint or ()))
+            actions.append(action.action_str)
+            visit(depth + 1, child, child_sleep, child_g, child_h, transfers + action.is_transfer, child_paid)
+            actions.pop()
+            world.undo_changes(undo)
+
+    visit(0, 0, (), zero, zero, 0, {})
+    tree.finish()
+    return tree
@@ -0,0 +1,358 @@
+"""Binary search traces and their offline analysis.
+
+:class:`TraceRecorder` is a search hook (see :mod:`search.hooks`) that
+writes every event as one fixed-width record of :data:`RECORD`::
+
+    kind (u8), depth (u8), flag (u16), a (u32), b (u32), c (u32),
+    time (f64, seconds since the recorder was opened), value (f64)
+
+========== ======================================================
+kind       fields
+========== ======================================================
+PHASE      ``a`` phase name (string id)
+NODE       ``a`` node about to be expanded
+EXPAND     ``a`` node, ``b`` branching factor
+SUCCESSOR  ``a`` child, ``b`` parent, ``c`` action (string id),
+           ``value`` step score
+PUSH       ``value`` bound
+PRUNE      ``value`` bound
+EVICT      ``a`` nodes evicted
+COMPLETE   ``a`` node, ``flag`` 1 if kept, ``value`` score
+FINAL      ``a`` node, ``b`` rank, ``value`` score
+========== ======================================================
+
+Nodes are numbered by the recorder in the order they are generated (the
+root is 0) and identified by their action path, so lineage survives the
+search's own bookkeeping. Records are packed into a buffer flushed in
+large writes; strings (actions and phase names) are written once, in a
+JSON trailer, when the recorder is closed.
+
+:func:`analyze_trace` reads a trace through :mod:`mmap` and summarizes the
+branching factor and node scores per depth, the time spent per phase and
+the lineage of the final schedules. Run ``python -m search.trace TRACE``
+to print that summary.
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Tuple
+
+MAGIC = b"AIWTRACE"
+END_MAGIC = b"TRACEEND"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<BBHIIIdd")
+TRAILER = struct.Struct("<Q8s")
+
+PHASE, NODE, EXPAND, SUCCESSOR, PUSH, PRUNE, EVICT, COMPLETE, FINAL = range(1, 10)
+KIND_NAMES = {
+    PHASE: "phase", NODE: "node", EXPAND: "expand", SUCCESSOR: "successor", PUSH: "push",
+    PRUNE: "prune", EVICT: "evict", COMPLETE: "complete", FINAL: "final",
+}
+
+# Buffered records are written once they reach this many bytes.
+FLUSH_BYTES = 1 << 20
+
+
+def _split_macro(action: str) -> Tuple[str, ...]:
+    """Return the steps of a ``(MACRO step step ...)`` string, or ``(action,)``."""
+    if not action.startswith("(MACRO "):
+        return (action,)
+    steps, depth, start = [], 0, None
+    for i, char in enumerate(action[len("(MACRO "):-1], len("(MACRO ")):
+        if char == "(":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                steps.append(action[start:i + 1])
+    return tuple(steps)
+
+
+class TraceRecorder:
+    """Search hook writing a binary trace of every event to ``path``.
+
+    :ivar records: Number of records written so far.
+    """
+
+    def __init__(self, path: str):
+        """Open the trace file.
+
+        :param path: Where to write the trace; overwritten.
+        """
+        self.path = path
+        self.records = 0
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._buffer = bytearray()
+        self._pack = RECORD.pack
+        self._clock = time.perf_counter
+        self._start = self._clock()
+        self._strings: Dict[str, int] = {}
+        # Nodes by path of action string ids; the current node's children
+        # are registered as its successors are generated.
+        self._nodes: Dict[tuple, int] = {(): 0}
+        self._path: tuple = ()
+        self._node = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _string(self, text: str) -> int:
+        sid = self._strings.get(text)
+        if sid is None:
+            sid = self._strings[text] = len(self._strings)
+        return sid
+
+    def _emit(self, kind, depth=0, flag=0, a=0, b=0, c=0, value=0.0):
+        self._buffer += self._pack(kind, min(depth, 255), flag, a, b, c, self._clock() - self._start, value)
+        self.records += 1
+        if len(self._buffer) >= FLUSH_BYTES:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def _lookup(self, actions) -> Tuple[tuple, int]:
+        path = tuple(self._string(action) for action in actions)
+        node = self._nodes.get(path)
+        if node is None:
+            node = self._nodes[path] = len(self._nodes)
+        return path, node
+
+    def phase(self, name: str):
+        """Mark the start of a named phase (e.g. ``load``, ``search``)."""
+        self._emit(PHASE, a=self._string(name))
+
+    def on_node(self, depth, actions):
+        self._path, self._node = self._lookup(actions)
+        self._emit(NODE, depth, a=self._node)
+
+    def on_expand(self, depth, branching):
+        self._emit(EXPAND, depth, a=self._node, b=branching)
+
+    def on_successor(self, depth, action, score):
+        path = self._path + tuple(self._string(step) for step in _split_macro(action))
+        child = self._nodes.get(path)
+        if child is None:
+            child = self._nodes[path] = len(self._nodes)
+        self._emit(SUCCESSOR, depth, a=child, b=self._node, c=self._string(action), value=score)
+
+    def on_push(self, depth, bound):
+        self._emit(PUSH, depth, value=bound)
+
+    def on_prune(self, depth, bound):
+        self._emit(PRUNE, depth, value=bound)
+
+    def on_evict(self, count):
+        self._emit(EVICT, a=count)
+
+    def on_complete(self, actions, eus, score, kept):
+        del eus  # The analyzer rebuilds EUs from the successor records.
+        self._emit(COMPLETE, len(actions), flag=int(bool(kept)), a=self._lookup(actions)[1], value=score)
+
+    def final(self, ranked, score):
+        """Record the search's result.
+
+        :param ranked: The ranked ``(actions, eus, deltas)`` schedules.
+        :param score: Ranking score function, called as ``score(actions, eus)``.
+        """
+        for rank, (actions, eus, _) in enumerate(ranked):
+            self._emit(FINAL, len(actions), a=self._lookup(actions)[1], b=rank, value=score(actions, eus))
+
+    def close(self):
+        """Flush the records and write the string table; idempotent."""
+        if self._file is None:
+            return
+        self._file.write(self._buffer)
+        self._buffer.clear()
+        offset = self._file.tell()
+        strings = sorted(self._strings, key=self._strings.get)
+        trailer = {"strings": strings, "records": self.records, "nodes": len(self._nodes)}
+        self._file.write(json.dumps(trailer).encode("utf-8"))
+        self._file.write(TRAILER.pack(offset, END_MAGIC))
+        self._file.close()
+        self._file = None
+
+
+def read_trace(path: str) -> Tuple[List[str], Iterator[tuple]]:
+    """Open a trace written by :class:`TraceRecorder`.
+
+    :param path: The trace file.
+    :return: ``(strings, records)``: the string table and an iterator of
+        ``(kind, depth, flag, a, b, c, time, value)`` records, read lazily
+        from a memory map.
+    :raises ValueError: If the file is not a complete trace.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < HEADER.size + TRAILER.size:
+        data.close()
+        raise ValueError(f"{path} is too short to be a search trace.")
+    magic, version, record_size = HEADER.unpack_from(data, 0)
+    offset, end_magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    if magic != MAGIC or end_magic != END_MAGIC or version != VERSION or record_size != RECORD.size:
+        data.close()
+        raise ValueError(f"{path} is not a complete version {VERSION} search trace.")
+    trailer = json.loads(data[offset:len(data) - TRAILER.size].decode("utf-8"))
+
+    def records():
+        view = memoryview(data)
+        body = view[HEADER.size:offset]
+        unpacked = RECORD.iter_unpack(body)
+        try:
+            yield from unpacked
+        finally:
+            # The map can only close once no view of it is left.
+            del unpacked
+            body.release()
+            view.release()
+            data.close()
+
+    return trailer["strings"], records()
+
+
+def _quantile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def analyze_trace(path: str) -> dict:
+    """Summarize a search trace.
+
+    :param path: A trace written by :class:`TraceRecorder`.
+    :return: A JSON-serializable summary with keys ``records``,
+        ``duration_s``, ``counts`` (records per kind, evicted nodes for
+        ``evict``), ``branching`` and ``scores`` (per depth), ``phases``
+        (seconds per named phase, plus the time spent generating children,
+        from each ``node`` to its ``expand``) and ``lineage`` (for every
+        final schedule, each step's action, step score, running score and
+        when and how widely its parent was expanded).
+    """
+    strings, records = read_trace(path)
+    counts = defaultdict(int)
+    branching = defaultdict(list)
+    scores = defaultdict(list)
+    parent, action, step, total = {}, {}, {}, {0: 0.0}
+    expanded_at, fan_out = {}, {}
+    phases, phase_name, phase_start = defaultdict(float), None, 0.0
+    generating, node_start, order = 0.0, None, 0
+    finals, end, seen = [], 0.0, 0
+    for kind, depth, _, a, b, c, when, value in records:
+        end = when
+        seen += 1
+        counts[KIND_NAMES[kind]] += a if kind == EVICT else 1
+        if kind == SUCCESSOR:
+            parent[a], action[a], step[a] = b, c, value
+            total[a] = total.get(b, 0.0) + value
+            scores[depth].append(total[a])
+        elif kind == NODE:
+            node_start = when
+        elif kind == EXPAND:
+            branching[depth].append(b)
+            expanded_at[a], fan_out[a] = (order, when), b
+            order += 1
+            if node_start is not None:
+                generating += when - node_start
+                node_start = None
+        elif kind == PHASE:
+            if phase_name is not None:
+                phases[phase_name] += when - phase_start
+            phase_name, phase_start = strings[a], when
+        elif kind == FINAL:
+            finals.append((b, a, value))
+    if phase_name is not None:
+        phases[phase_name] += end - phase_start
+
+    lineage = []
+    for rank, node, score in sorted(finals):
+        steps = []
+        while node in parent:
+            up = parent[node]
+            expansion, when = expanded_at.get(up, (None, None))
+            steps.append({
+                "action": strings[action[node]],
+                "step_score": step[node],
+                "score": total[node],
+                "parent_expansion": expansion,
+                "parent_expanded_s": when,
+                "parent_branching": fan_out.get(up),
+            })
+            node = up
+        steps.reverse()
+        for depth, entry in enumerate(steps, 1):
+            entry["depth"] = depth
+        lineage.append({"rank": rank, "score": score, "steps": steps})
+
+    return {
+        "records": seen,
+        "duration_s": end,
+        "counts": dict(counts),
+        "branching": {
+            depth: {"nodes": len(values), "mean": sum(values) / len(values), "max": max(values)}
+            for depth, values in sorted(branching.items())
+        },
+        "scores": {
+            depth: {
+                "count": len(values),
+                "min": values[0],
+                "p10": _quantile(values, 0.1),
+                "median": _quantile(values, 0.5),
+                "p90": _quantile(values, 0.9),
+                "max": values[-1],
+            }
+            for depth, values in sorted((d, sorted(v)) for d, v in scores.items())
+        },
+        "phases": dict(phases, generate_children=generating),
+        "lineage": lineage,
+    }
+
+
+def format_trace_report(summary: dict) -> str:
+    """Render :func:`analyze_trace` output as plain text."""
+    lines = [f"{summary['records']} records over {summary['duration_s']:.3f} s"]
+    lines.append("counts: " + ", ".join(f"{k}={v}" for k, v in sorted(summary["counts"].items())))
+    lines.append("phases: " + ", ".join(f"{k}={v:.3f}s" for k, v in summary["phases"].items()))
+    lines.append("depth  expanded  mean_branching  max  children  min_score  median  max_score")
+    for depth in sorted(set(summary["branching"]) | set(summary["scores"])):
+        level = summary["branching"].get(depth, {"nodes": 0, "mean": 0.0, "max": 0})
+        dist = summary["scores"].get(depth)
+        row = f"{depth:>5}  {level['nodes']:>8}  {level['mean']:>14.2f}  {level['max']:>3}"
+        if dist is not None:
+            row += f"  {dist['count']:>8}  {dist['min']:>9.2f}  {dist['median']:>6.2f}  {dist['max']:>9.2f}"
+        lines.append(row)
+    for entry in summary["lineage"]:
+        lines.append(f"schedule {entry['rank'] + 1} (score {entry['score']:.2f}):")
+        for step in entry["steps"]:
+            lines.append(
+                f"  {step['depth']}. {step['action']}  step {step['step_score']:.2f}  "
+                f"total {step['score']:.2f}  (parent expansion #{step['parent_expansion']}, "
+                f"{step['parent_branching']} children)"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """Print the summary of a trace file."""
+    parser = argparse.ArgumentParser(description="Summarize a binary search trace.")
+    parser.add_argument("trace")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    args = parser.parse_args(argv)
+    summary = analyze_trace(args.trace)
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print(format_trace_report(summary))
+    return summary
+
+
+if __name__ == "__main__":
+    main()
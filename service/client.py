@@ -0,0 +1,107 @@
+"""A small client for the local scheduling service.
+
+Run ``python -m service.client`` against a running service to fire a burst
+of concurrent schedule requests and print the service metrics.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+
+class ScheduleClient:
+    """One connection to a :class:`service.server.ScheduleService`.
+
+    Requests may be sent concurrently; replies are matched to requests by id.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765, path: str = None):
+        """Connect over TCP, or over the Unix socket ``path`` when given."""
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            future = self._waiting.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Service closed the connection."))
+
+    async def request(self, **message) -> dict:
+        """Send one request and wait for its reply.
+
+        :param message: The request fields, e.g. ``op="schedule"``.
+        :return: The decoded reply.
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps(dict(message, id=request_id)).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def schedule(self, country: str, **params) -> dict:
+        """Request schedules for ``country``; see the service for ``params``."""
+        return await self.request(op="schedule", country=country, **params)
+
+    async def metrics(self) -> dict:
+        """Return the service metrics."""
+        return (await self.request(op="metrics"))["metrics"]
+
+    async def close(self):
+        """Close the connection."""
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+
+
+async def burst(args):
+    """Send ``args.requests`` concurrent schedule requests and report."""
+    client = await ScheduleClient.connect(args.host, args.port, args.unix)
+    try:
+        started = time.perf_counter()
+        replies = await asyncio.gather(
+            *(client.schedule(args.country, depth_bound=args.depth_bound) for _ in range(args.requests))
+        )
+        elapsed = time.perf_counter() - started
+        best = replies[0]["schedules"][0] if replies[0].get("ok") and replies[0]["schedules"] else None
+        print(f"{len(replies)} replies in {elapsed:.3f}s")
+        if best is not None:
+            print(f"Best schedule: {[step['action'] for step in best['actions']]} (final EU {best['final_eu']:.3f})")
+        print(json.dumps(await client.metrics(), indent=2))
+    finally:
+        await client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exercise the local scheduling service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None)
+    parser.add_argument("--country", default="Atlantis")
+    parser.add_argument("--depth-bound", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=8)
+    asyncio.run(burst(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
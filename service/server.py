@@ -0,0 +1,393 @@
+"""A long-lived local scheduling service.
+
+The service loads the world, the weights and the compiled templates once
+and keeps them in memory. Clients connect over localhost TCP or a Unix
+socket and exchange newline-delimited JSON messages, one request per line:
+
+``{"op": "schedule", "country": "Atlantis", "depth_bound": 3, ...}``
+    Plan schedules. The other optional fields are ``num_output_schedules``,
+    ``frontier_max_size``, ``search_mode`` and ``partial_order_reduction``,
+    with the same meaning as for :func:`scheduler.country_scheduler`; a
+    request with a malformed value gets an error reply of its own.
+``{"op": "update", "country": "Atlantis", "resources": {"Timber": 4}}``
+    Set some resources, producing a new world snapshot.
+``{"op": "metrics"}``
+    Report queue depth, batching and response-time statistics.
+
+Every reply echoes the request's ``id`` field when one is given.
+
+Schedule requests are queued and collected into batches for up to
+``batch_window`` seconds. Requests in a batch that share a world snapshot
+are sent to the worker pool together, so the snapshot is serialised once
+per batch. Identical requests on the same snapshot are planned only once.
+Worker processes attach to the weights and compiled templates in shared
+memory (see :mod:`search.shared`) instead of each unpickling a copy.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import statistics
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from scheduler import load_problem, plan_schedules
+from search.options import SearchOptions
+from writers.schedule_writer import schedule_record
+
+# Request fields that select a search, with their defaults.
+SCHEDULE_DEFAULTS = {
+    "num_output_schedules": 5,
+    "depth_bound": 3,
+    "frontier_max_size": 100,
+    "search_mode": "best_first",
+    "partial_order_reduction": True,
+}
+
+# Search modes a request may select; the hda mode starts its own processes,
+# which pool workers cannot do.
+SERVICE_SEARCH_MODES = ("best_first", "dfs")
+
+# Number of recent response times kept for the latency percentiles.
+LATENCY_WINDOW = 1000
+
+
+def _attach_worker(handle):
+    """Process-pool initializer: attach to the shared weights and templates
+    before the first batch arrives."""
+    from search.shared import worker_problem
+
+    worker_problem(handle)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_schedule_params(params: dict) -> Optional[str]:
+    """Return why ``params`` cannot be planned, or None if they can.
+
+    :param params: The request's search fields, defaults filled in.
+    :return: An error message, or None.
+    """
+    for key in ("num_output_schedules", "depth_bound", "frontier_max_size"):
+        value = params[key]
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            return f"{key} must be a positive integer, got {value!r}"
+    if params["search_mode"] not in SERVICE_SEARCH_MODES:
+        return f"search_mode must be one of {SERVICE_SEARCH_MODES}, got {params['search_mode']!r}"
+    if not isinstance(params["partial_order_reduction"], bool):
+        return f"partial_order_reduction must be true or false, got {params['partial_order_reduction']!r}"
+    return None
+
+
+def check_resources(resources: dict) -> Optional[str]:
+    """Return why ``resources`` cannot be set, or None if they can.
+
+    :param resources: Resource names mapped to new quantities.
+    :return: An error message, or None.
+    """
+    for res, amount in resources.items():
+        if not _is_number(amount) or not math.isfinite(amount) or amount < 0:
+            return f"Resource {res!r} must be a finite, non-negative number, got {amount!r}"
+    return None
+
+
+def _run_batch(world, jobs, problem):
+    """Plan every job of a batch against one world snapshot.
+
+    :param world: The shared snapshot.
+    :param jobs: ``(country, params)`` pairs.
+    :param problem: ``(weights, library)`` in the service's own process, or
+        the :class:`~search.shared.ProblemHandle` pool workers attached to.
+    :return: One list of log records, or one error message, per job.
+    """
+    if isinstance(problem, tuple):
+        weights, library = problem
+    else:
+        from search.shared import worker_problem
+
+        _, weights, library = worker_problem(problem)
+    results = []
+    for country, params in jobs:
+        try:
+            ranked = plan_schedules(world, weights, library, country, SearchOptions(**params))
+            results.append([schedule_record(i, *schedule) for i, schedule in enumerate(ranked, 1)])
+        except (ValueError, KeyError) as exc:  # One rejected request must not fail the rest of its batch.
+            results.append(str(exc))
+    return results
+
+
+class ScheduleService:
+    """An asyncio scheduling server holding one warm world.
+
+    :ivar world: The current world snapshot; replaced, never mutated.
+    :ivar version: Number of updates applied since the service started.
+    """
+
+    def __init__(
+        self,
+        resources_filename: str,
+        initial_state_filename: str,
+        templates_filename: str = "data/templates.txt",
+        workers: int = 1,
+        batch_window: float = 0.005,
+        max_batch: int = 32,
+    ):
+        """Load the problem and prepare the worker pool.
+
+        :param resources_filename: CSV of resource weights.
+        :param initial_state_filename: CSV of initial country resources.
+        :param templates_filename: TRANSFORM template file.
+        :param workers: Number of worker processes; 0 plans on one thread in
+            this process instead.
+        :param batch_window: Seconds to wait for more requests before a batch
+            is dispatched.
+        :param max_batch: Maximum number of requests per batch.
+        """
+        self.world, self.weights, self.library = load_problem(
+            resources_filename, initial_state_filename, templates_filename
+        )
+        self.version = 0
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.address = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._server = None
+        self._batcher = None
+        self._executor = None
+        self._shared = None
+        self._problem = None
+        self._connections = {}
+        self._metrics = {
+            "requests": 0,
+            "batches": 0,
+            "searches": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+        }
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, path: Optional[str] = None):
+        """Start listening on ``host:port``, or on the Unix socket ``path``.
+
+        :return: The bound address: a ``(host, port)`` tuple or the socket path.
+        """
+        self._problem = (self.weights, self.library)
+        if self.workers > 0:
+            from search.shared import SharedProblem  # Loads numpy, which in-process planning never needs.
+
+            self._shared = SharedProblem(self.world, self.weights, self.library)
+            self._executor = ProcessPoolExecutor(
+                self.workers, initializer=_attach_worker, initargs=(self._shared.handle,)
+            )
+            self._problem = self._shared.handle
+        else:
+            self._executor = ThreadPoolExecutor(1)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=path)
+            self.address = path
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            self.address = self._server.sockets[0].getsockname()[:2]
+        return self.address
+
+    async def close(self):
+        """Stop accepting connections and shut the worker pool down."""
+        self._server.close()
+        # Closing a connection ends its handler at the next read.
+        connections = list(self._connections.items())
+        for _, writer in connections:
+            writer.close()
+        await asyncio.gather(*(task for task, _ in connections), return_exceptions=True)
+        self._batcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._batcher
+        await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+        if self._shared is not None:
+            self._shared.close()
+
+    def metrics(self) -> dict:
+        """Return the current counters, queue depth and response times (seconds)."""
+        latencies = sorted(self._latencies)
+        report = dict(self._metrics, queue_depth=self._queue.qsize() if self._queue else 0, version=self.version)
+        if latencies:
+            report["response_time"] = {
+                "count": len(latencies),
+                "mean": statistics.mean(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                "max": latencies[-1],
+            }
+        return report
+
+    async def _handle(self, reader, writer):
+        """Serve one connection; requests on it may be answered out of order."""
+        pending = set()
+        lock = asyncio.Lock()
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+
+        async def reply(message):
+            async with lock:
+                writer.write(json.dumps(message).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._dispatch(line, reply))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            self._connections.pop(connection, None)
+            writer.close()
+
+    async def _dispatch(self, line: bytes, reply):
+        """Answer one request line."""
+        started = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object.")
+        except ValueError as exc:
+            self._metrics["errors"] += 1
+            await reply({"ok": False, "error": f"Bad request: {exc}"})
+            return
+        response = await self._respond(request)
+        if "id" in request:
+            response["id"] = request["id"]
+        if request.get("op") == "schedule":
+            self._latencies.append(time.perf_counter() - started)
+        if not response["ok"]:
+            self._metrics["errors"] += 1
+        await reply(response)
+
+    async def _respond(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "metrics":
+            return {"ok": True, "metrics": self.metrics()}
+        if op == "update":
+            return self._update(request)
+        if op != "schedule":
+            return {"ok": False, "error": f"Unknown op {op!r}"}
+        country = request.get("country")
+        if country not in self.world.countries:
+            return {"ok": False, "error": f"Unknown country {country!r}"}
+        params = {key: request.get(key, default) for key, default in SCHEDULE_DEFAULTS.items()}
+        error = check_schedule_params(params)
+        if error is not None:
+            return {"ok": False, "error": error}
+        future = asyncio.get_running_loop().create_future()
+        self._metrics["requests"] += 1
+        await self._queue.put((self.world, self.version, country, params, future))
+        self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._queue.qsize())
+        result, batched, version = await future
+        if isinstance(result, str):
+            return {"ok": False, "error": result}
+        return {"ok": True, "version": version, "batched": batched, "schedules": result}
+
+    def _update(self, request: dict) -> dict:
+        """Replace the world snapshot with one where some resources are set."""
+        country = request.get("country")
+        resources = request.get("resources")
+        if country not in self.world.countries or not isinstance(resources, dict):
+            return {"ok": False, "error": "update needs a known country and a resources object"}
+        error = check_resources(resources)
+        if error is not None:
+            return {"ok": False, "error": error}
+        world = self.world.clone()
+        world.get_country(country).resources.update(resources)
+        self.world, self.version = world, self.version + 1
+        return {"ok": True, "version": self.version}
+
+    async def _batch_loop(self):
+        """Collect queued requests into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._metrics["batches"] += 1
+
+            # Group by snapshot, and plan identical requests only once.
+            groups = {}
+            for world, version, country, params, future in batch:
+                key = (country, tuple(sorted(params.items())))
+                groups.setdefault(version, (world, {}))[1].setdefault(key, []).append(future)
+            for version, (world, searches) in groups.items():
+                asyncio.ensure_future(self._run_group(world, version, searches, len(batch)))
+
+    async def _run_group(self, world, version, searches, batched):
+        """Plan one snapshot's searches on the pool and resolve their futures."""
+        jobs = [(country, dict(params)) for country, params in searches]
+        self._metrics["searches"] += len(jobs)
+        if self.workers == 0:
+            # Depth-first search mutates the world while it runs; give the
+            # thread its own copy so snapshots stay readable here.
+            world = world.clone()
+        loop = asyncio.get_running_loop()
+        # Any other error still answers the requests before it propagates.
+        results = ["Search failed."] * len(jobs)
+        try:
+            results = await loop.run_in_executor(self._executor, _run_batch, world, jobs, self._problem)
+        except BrokenExecutor as exc:  # A crashed worker fails its requests, not the service.
+            results = [f"Worker failed: {exc!r}"] * len(jobs)
+        finally:
+            for futures, result in zip(searches.values(), results):
+                for future in futures:
+                    if not future.done():
+                        future.set_result((result, batched, version))
+
+
+async def serve(args):
+    """Run the service until interrupted."""
+    service = ScheduleService(
+        args.resources, args.initial_state, args.templates, args.workers, args.batch_window
+    )
+    address = await service.start(args.host, args.port, args.unix)
+    print(f"Scheduling service listening on {address}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local scheduling service.")
+    parser.add_argument("--resources", default="data/weights.csv")
+    parser.add_argument("--initial-state", default="data/resources.csv")
+    parser.add_argument("--templates", default="data/templates.txt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-window", type=float, default=0.005)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+"""Multi-agent turn engine: every country acts every turn.
+
+The world is held as one ``(countries x resources)`` array. Each turn:
+
+1. Template feasibility is checked for every country and every template
+   variant in one broadcast comparison.
+2. Each country picks at most one TRANSFORM with the engine's policy, and
+   all chosen TRANSFORMs are applied as a single batched array update.
+   A country's TRANSFORM only touches its own row, so they never conflict.
+3. Each country may request one TRANSFER. Requests are granted in a fixed
+   (sender, resource, receiver) order, each in full or not at all, while
+   the sender can still cover the goods and the energy cost. The outcome
+   therefore depends on the requests, never on the order they were made.
+
+Per-turn snapshots are stored as delta-encoded columns (see
+:class:`TurnHistory`), so a run of hundreds of turns costs memory in
+proportion to what changed rather than to the size of the world.
+
+In fixed-point mode (``fixed_point=1000``, say) every quantity is held as
+an ``int64`` count of ``1 / fixed_point`` units: resources, template
+amounts and TRANSFER energy costs are scaled once when the engine is built
+and only converted back by :meth:`TurnEngine.to_world`. Arithmetic is then
+exact and identical on every machine, and :meth:`TurnEngine.state_key`
+gives an exact, hashable key for the whole state.
+"""
+
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from models.world_model import Country, World
+from transformations.transformations import (
+    MAX_TRANSFER_AMOUNT,
+    TRANSFER_PENALTY_FACTOR,
+    VALID_TRANSFERABLES,
+    as_library,
+)
+
+TURN_POLICIES = ("greedy", "random")
+
+ENERGY = "PotentialEnergyUsable"
+
+# Default number of fixed-point units per resource unit.
+FIXED_POINT_SCALE = 1000
+
+
+def to_fixed_point(values, scale: int) -> np.ndarray:
+    """Convert quantities to ``int64`` multiples of ``1 / scale``.
+
+    :param values: Array-like of quantities.
+    :param scale: Fixed-point units per resource unit.
+    :return: The scaled ``int64`` array.
+    :raises ValueError: If a quantity is not a whole number of units.
+    """
+    scaled = np.asarray(values, dtype=float) * scale
+    rounded = np.rint(scaled)
+    inexact = np.abs(scaled - rounded) > 1e-6 * np.maximum(1.0, np.abs(scaled))
+    if np.any(inexact):
+        value = np.asarray(values, dtype=float)[inexact].flat[0]
+        raise ValueError(f"{value} is not a multiple of 1/{scale}; use a larger fixed-point scale.")
+    return rounded.astype(np.int64)
+
+
+class TurnHistory:
+    """Snapshots of a simulation, stored as delta-encoded columns.
+
+    Turn 0 is the initial state. For every later turn, only the cells that
+    changed are stored, as parallel ``turn``, ``country``, ``resource`` and
+    ``value`` columns holding the new values, so any state can be rebuilt
+    exactly.
+
+    :ivar countries: Country names, in row order.
+    :ivar resources: Resource names, in column order.
+    :ivar initial: The ``(countries, resources)`` state at turn 0.
+    :ivar transforms: One array per turn of each country's chosen variant
+        index, or -1 for no TRANSFORM.
+    :ivar transfers: One ``(k, 4)`` array per turn of the granted
+        ``(sender, receiver, resource, amount)`` TRANSFERs.
+    :ivar quality: One array per turn (turn 0 first) of every country's
+        state quality.
+    :ivar elapsed: Seconds spent running turns.
+    :ivar scale: Units per resource unit of the stored values: 1 for float
+        states, the fixed-point scale for ``int64`` ones.
+    """
+
+    def __init__(
+        self,
+        countries: List[str],
+        resources: List[str],
+        variant_names: List[str],
+        initial: np.ndarray,
+        scale: int = 1,
+    ):
+        """Start a history at the given initial state.
+
+        :param countries: Country names, in row order.
+        :param resources: Resource names, in column order.
+        :param variant_names: ``"Name xFactor"`` label of each template variant.
+        :param initial: The initial state array (copied).
+        :param scale: Units per resource unit of the state values.
+        """
+        self.countries = list(countries)
+        self.resources = list(resources)
+        self.variant_names = list(variant_names)
+        self.initial = initial.copy()
+        self.transforms: List[np.ndarray] = []
+        self.transfers: List[np.ndarray] = []
+        self.quality: List[np.ndarray] = []
+        self.elapsed = 0.0
+        self.scale = scale
+        self._chunks = []
+
+    @property
+    def turns(self) -> int:
+        """Number of turns recorded."""
+        return len(self.transforms)
+
+    def record(self, before: np.ndarray, after: np.ndarray, transforms: np.ndarray, transfers: np.ndarray):
+        """Append one turn.
+
+        :param before: The state at the start of the turn.
+        :param after: The state at the end of the turn.
+        :param transforms: Chosen variant index per country, -1 for none.
+        :param transfers: Granted ``(sender, receiver, resource, amount)`` rows.
+        """
+        rows, cols = np.nonzero(after != before)
+        turn = np.full(rows.shape, len(self.transforms) + 1, dtype=np.int32)
+        self._chunks.append((turn, rows.astype(np.int32), cols.astype(np.int32), after[rows, cols]))
+        self.transforms.append(transforms.astype(np.int32))
+        self.transfers.append(transfers)
+
+    def columns(self) -> dict:
+        """Return the delta-encoded columns: ``turn``, ``country``,
+        ``resource`` and ``value``, ordered by turn."""
+        if not self._chunks:
+            empty = np.zeros(0, dtype=np.int32)
+            return {"turn": empty, "country": empty, "resource": empty, "value": np.zeros(0, self.initial.dtype)}
+        turn, country, resource, value = (np.concatenate(part) for part in zip(*self._chunks))
+        return {"turn": turn, "country": country, "resource": resource, "value": value}
+
+    def state_at(self, turn: int) -> np.ndarray:
+        """Rebuild the full state at the end of ``turn``.
+
+        :param turn: 0 for the initial state, up to :attr:`turns`.
+        :return: A ``(countries, resources)`` array.
+        :raises ValueError: If ``turn`` is out of range.
+        """
+        if not 0 <= turn <= self.turns:
+            raise ValueError(f"turn must be between 0 and {self.turns}, got {turn}.")
+        cols = self.columns()
+        upto = cols["turn"] <= turn
+        flat = cols["country"][upto] * len(self.resources) + cols["resource"][upto]
+        # The last write to each cell wins.
+        cells, last = np.unique(flat[::-1], return_index=True)
+        state = self.initial.copy()
+        state.flat[cells] = cols["value"][upto][::-1][last]
+        return state
+
+    def series(self, country: str, resource: str) -> np.ndarray:
+        """Return one country's amount of one resource at every turn.
+
+        :param country: Country name.
+        :param resource: Resource name.
+        :return: Array of length ``turns + 1``, starting with turn 0.
+        """
+        c, r = self.countries.index(country), self.resources.index(resource)
+        cols = self.columns()
+        match = (cols["country"] == c) & (cols["resource"] == r)
+        turns, values = cols["turn"][match], cols["value"][match]
+        if not len(values):
+            return np.full(self.turns + 1, self.initial[c, r])
+        last = np.searchsorted(turns, np.arange(self.turns + 1), side="right") - 1
+        return np.where(last >= 0, values[np.maximum(last, 0)], self.initial[c, r])
+
+    def actions_at(self, turn: int) -> List[str]:
+        """Return the actions taken in ``turn`` (1-based) in schedule notation."""
+        actions = []
+        for c, v in enumerate(self.transforms[turn - 1]):
+            if v >= 0:
+                actions.append(f"(TRANSFORM {self.countries[c]} {self.variant_names[v]})")
+        for sender, receiver, resource, amount in self.transfers[turn - 1]:
+            actions.append(
+                f"(TRANSFER {self.countries[sender]} {self.countries[receiver]} "
+                f"(({self.resources[resource]} {amount})))"
+            )
+        return actions
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the recorded turns, in bytes."""
+        total = sum(sum(part.nbytes for part in chunk) for chunk in self._chunks)
+        total += sum(a.nbytes for a in self.transforms) + sum(a.nbytes for a in self.transfers)
+        return total + sum(a.nbytes for a in self.quality)
+
+    def throughput(self) -> float:
+        """Country-turns simulated per second of run time."""
+        return len(self.countries) * self.turns / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+class TurnEngine:
+    """Simulates rounds in which every country of a world takes a turn.
+
+    :ivar countries: Country names, in row order.
+    :ivar resources: Resource names, in column order.
+    :ivar state: The current ``(countries, resources)`` array.
+    :ivar history: The :class:`TurnHistory` of every turn run so far.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        library,
+        weights: dict,
+        policy: str = "greedy",
+        transfers: bool = True,
+        seed: int = 0,
+        fixed_point: Optional[int] = None,
+    ):
+        """Load a world into arrays.
+
+        :param world: The starting world; not modified.
+        :param library: A TemplateLibrary or a list of TransformTemplate.
+        :param weights: Dictionary of resource weights.
+        :param policy: ``"greedy"`` picks each country's best-gain feasible
+            TRANSFORM and requests the scarcest valuable resource from its richest
+            holder; ``"random"`` picks uniformly among feasible options.
+        :param transfers: Whether countries request TRANSFERs.
+        :param seed: Seed for the random policy.
+        :param fixed_point: Hold every quantity as an ``int64`` multiple of
+            ``1 / fixed_point`` (e.g. :data:`FIXED_POINT_SCALE`) instead of
+            as a float.
+        :raises ValueError: If ``policy`` is unknown, or if a quantity is not
+            a whole number of fixed-point units.
+        """
+        if policy not in TURN_POLICIES:
+            raise ValueError(f"Unknown policy '{policy}'; expected one of {TURN_POLICIES}.")
+        library = as_library(library)
+        self.policy = policy
+        self.transfers_enabled = transfers
+        self.rng = np.random.default_rng(seed)
+        self.scale = 1 if fixed_point is None else fixed_point
+
+        def encode(values):
+            return values if fixed_point is None else to_fixed_point(values, fixed_point)
+
+        self.countries = [country.name for country in world.all_countries()]
+        names = set(library.resources) | set(weights) | {ENERGY}
+        for country in world.all_countries():
+            names |= set(country.resources)
+        self.resources = sorted(names)
+        index = {res: i for i, res in enumerate(self.resources)}
+        self._energy = index[ENERGY]
+        self._population = index.get("Population")
+
+        state = np.zeros((len(self.countries), len(self.resources)))
+        self._present = np.zeros(state.shape, dtype=bool)
+        for c, country in enumerate(world.all_countries()):
+            for res, amount in country.resources.items():
+                state[c, index[res]] = amount
+                self._present[c, index[res]] = True
+        self.state = encode(state)
+
+        # Per variant: the amount of each resource that must be held (inputs
+        # and required) and the net change when applied.
+        need = np.zeros((len(library.variants), len(self.resources)))
+        delta = np.zeros_like(need)
+        for v, variant in enumerate(library.variants):
+            scaled = variant.transform
+            for res, amount in scaled.required.items():
+                need[v, index[res]] = max(need[v, index[res]], amount)
+            for res, amount in scaled.inputs.items():
+                need[v, index[res]] = max(need[v, index[res]], amount)
+                delta[v, index[res]] -= amount
+            for res, amount in scaled.outputs.items():
+                delta[v, index[res]] += amount
+        self._need, self._delta = encode(need), encode(delta)
+        self._weights = np.array([weights.get(res, 0) for res in self.resources], dtype=float)
+        self._gain = self._delta @ self._weights
+        # Energy cost of sending one unit of each resource.
+        self._unit_cost = encode(
+            np.array([weights.get(res, 1) * TRANSFER_PENALTY_FACTOR for res in self.resources], dtype=float)
+        )
+        self._transferable = np.array(
+            [i for i, res in enumerate(self.resources) if res in VALID_TRANSFERABLES], dtype=np.intp
+        )
+
+        variant_names = [f"{v.name} x{v.factor}" for v in library.variants]
+        self.history = TurnHistory(self.countries, self.resources, variant_names, self.state, self.scale)
+        self.history.quality.append(self.quality())
+
+    def state_key(self) -> bytes:
+        """Return a hashable key of the current state; exact in fixed-point mode."""
+        return self.state.tobytes()
+
+    def quality(self) -> np.ndarray:
+        """Return every country's state quality (per-capita weighted sum).
+
+        Totals and population share the fixed-point scale, so it cancels.
+        """
+        totals = self.state @ self._weights
+        if self._population is None:
+            return np.full(len(self.countries), -np.inf)
+        population = self.state[:, self._population]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(population != 0, totals / np.where(population != 0, population, 1), -np.inf)
+
+    def feasible(self) -> np.ndarray:
+        """Return a ``(countries, variants)`` mask of feasible TRANSFORMs."""
+        return np.all(self.state[:, None, :] >= self._need[None, :, :], axis=2)
+
+    def _choose_transforms(self, feasible: np.ndarray) -> np.ndarray:
+        """Pick one variant index per country, or -1 to skip the TRANSFORM."""
+        if self.policy == "greedy":
+            scores = np.where(feasible, self._gain[None, :], -np.inf)
+            return np.where(feasible.any(axis=1), np.argmax(scores, axis=1), -1)
+        # Uniform over the feasible variants and skipping (the last column).
+        keys = np.where(feasible, self.rng.random(feasible.shape), -1.0)
+        keys = np.hstack([keys, self.rng.random((len(keys), 1))])
+        choice = np.argmax(keys, axis=1)
+        return np.where(choice == feasible.shape[1], -1, choice)
+
+    def _request_transfers(self) -> np.ndarray:
+        """Return one ``(sender, receiver, resource, amount)`` request per
+        country that wants one."""
+        columns = self._transferable
+        if not self.transfers_enabled or len(columns) == 0 or len(self.countries) < 2:
+            return np.zeros((0, 4), dtype=np.int64)
+        held = self.state[:, columns] / self.scale
+        receivers = np.arange(len(self.countries))
+        if self.policy == "greedy":
+            want = np.floor(np.minimum(held.mean(axis=0)[None, :] - held, MAX_TRANSFER_AMOUNT))
+            value = np.where((want >= 1) & (self._weights[columns] > 0)[None, :], self._weights[columns], -np.inf)
+            pick = np.argmax(value, axis=1)
+            amounts = want[receivers, pick]
+            senders = np.argmax(held, axis=0)[pick]
+            wanted = np.isfinite(value[receivers, pick]) & (senders != receivers)
+        else:
+            pick = self.rng.integers(len(columns), size=len(receivers))
+            amounts = self.rng.integers(1, MAX_TRANSFER_AMOUNT + 1, size=len(receivers)).astype(float)
+            senders = (receivers + self.rng.integers(1, len(receivers), size=len(receivers))) % len(receivers)
+            wanted = np.ones(len(receivers), dtype=bool)
+        requests = np.stack([senders, receivers, columns[pick], amounts.astype(np.int64)], axis=1)
+        return requests[wanted].astype(np.int64)
+
+    def _grant_transfers(self, requests: np.ndarray) -> np.ndarray:
+        """Apply the requests in (sender, resource, receiver) order and return
+        the granted ones."""
+        order = np.lexsort((requests[:, 1], requests[:, 2], requests[:, 0]))
+        state, energy, scale = self.state, self._energy, self.scale
+        granted = []
+        for sender, receiver, resource, amount in requests[order].tolist():
+            # Requests are in whole units; the state holds ``scale`` units each.
+            moved = amount * scale
+            cost = self._unit_cost[resource] * amount
+            needed_energy = cost + moved if resource == energy else cost
+            if state[sender, resource] >= moved and state[sender, energy] >= needed_energy:
+                state[sender, energy] -= cost
+                state[sender, resource] -= moved
+                state[receiver, resource] += moved
+                granted.append((sender, receiver, resource, amount))
+        return np.array(granted, dtype=np.int64).reshape(-1, 4)
+
+    def step(self):
+        """Run one turn for every country and record it."""
+        before = self.state.copy()
+        transforms = self._choose_transforms(self.feasible())
+        acting = transforms >= 0
+        self.state[acting] += self._delta[transforms[acting]]
+        granted = self._grant_transfers(self._request_transfers())
+        self.history.record(before, self.state, transforms, granted)
+        self.history.quality.append(self.quality())
+
+    def run(self, turns: int) -> TurnHistory:
+        """Run ``turns`` more turns.
+
+        :param turns: Number of turns to simulate.
+        :return: The history, whose :meth:`TurnHistory.throughput` gives
+            country-turns per second.
+        """
+        start = time.perf_counter()
+        for _ in range(turns):
+            self.step()
+        self.history.elapsed += time.perf_counter() - start
+        return self.history
+
+    def to_world(self, turn: Optional[int] = None) -> World:
+        """Build a World from the current state, or from the state at ``turn``.
+
+        Resources a country started with are always listed; others only once
+        they are non-zero.
+        """
+        state = self.state if turn is None else self.history.state_at(turn)
+        countries = []
+        for c, name in enumerate(self.countries):
+            keep = self._present[c] | (state[c] != 0)
+            resources = {self.resources[r]: _plain(state[c, r] / self.scale) for r in np.flatnonzero(keep)}
+            countries.append(Country(name, resources))
+        return World(countries)
+
+
+def _plain(value: float):
+    """Return ``value`` as an int when it is whole, else as a float."""
+    return int(value) if float(value).is_integer() else float(value)
@@ -0,0 +1,40 @@
+"""Inputs shared by several test modules."""
+
+import os
+
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+
+def sample_scheduler_kwargs(output_dir, **overrides):
+    """Return ``country_scheduler`` keyword arguments planning for Atlantis
+    on the sample data, with its report written to ``output_dir``.
+
+    :param output_dir: Directory the text report and log are written to.
+    :param overrides: Arguments replacing or adding to the defaults.
+    """
+    kwargs = dict(
+        your_country_name="Atlantis",
+        resources_filename="data/weights.csv",
+        initial_state_filename="data/resources.csv",
+        output_schedule_filename=os.path.join(output_dir, "schedule.txt"),
+        num_output_schedules=3,
+        depth_bound=2,
+        frontier_max_size=10**6,
+    )
+    kwargs.update(overrides)
+    return kwargs
+
+
+def chain_problem():
+    """Return a fresh ``(library, weights)`` pair whose Lumber template
+    feeds its Housing template the Timber it consumes.
+    """
+    library = TemplateLibrary(
+        [
+            TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 5}),
+            TransformTemplate("Housing", {"Timber": 5}, {"Housing": 1}),
+        ],
+        scales=(1,),
+    )
+    weights = {"Timber": 0.5, "AvailableLand": 1, "Housing": 10, "Population": 1}
+    return library, weights
@@ -0,0 +1,166 @@
+"""Tests for the command-line entry point."""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import cli
+
+
+class TestCli(unittest.TestCase):
+    """Test suite running the CLI on the sample data."""
+
+    def setUp(self):
+        """Create a scratch output directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the scratch output directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def run_cli(self, *argv):
+        """Run the CLI without plotting and return its parsed stdout summary."""
+        argv = [
+            "--output", os.path.join(self.tmpdir, "schedule.txt"),
+            "--log", os.path.join(self.tmpdir, "schedule_log.jsonl"),
+            "--no-plot", "--depth", "2",
+        ] + list(argv)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            returned = cli.main(argv)
+        printed = json.loads(stdout.getvalue().strip().splitlines()[-1])
+        self.assertEqual(printed, returned)
+        return printed
+
+    def test_summary_reports_throughput(self):
+        """Test that the summary counts expansions and their rate.
+
+        :return: None
+        """
+        summary = self.run_cli("--search", "dfs", "--scales", "1,2")
+        self.assertEqual(summary["schedules"], 5)
+        self.assertGreater(summary["expansions"], 0)
+        self.assertGreater(summary["expansions_per_s"], 0)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir, "schedule.txt")))
+
+    def test_trace_option(self):
+        """Test that --trace writes a trace the analyzer can read.
+
+        :return: None
+        """
+        from search.trace import analyze_trace
+
+        trace = os.path.join(self.tmpdir, "search.trace")
+        summary = self.run_cli("--trace", trace)
+        self.assertEqual(summary["trace"], trace)
+        self.assertEqual(analyze_trace(trace)["counts"]["expand"], summary["expansions"])
+
+    def test_gzip_log_format(self):
+        """Test that the jsonl.gz format writes a gzipped log.
+
+        :return: None
+        """
+        summary = self.run_cli("--log-format", "jsonl.gz")
+        self.assertTrue(summary["log"].endswith(".jsonl.gz"))
+        with open(summary["log"], "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+
+    def test_weight_sweep_reports_every_set(self):
+        """Test that --weight-sets writes one ranked line per weight set.
+
+        :return: None
+        """
+        summary = self.run_cli("--weight-sets", "data/weight_sets.csv")
+        with open(summary["output"], encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["weight_set"] for line in lines], ["base", "housing_x2", "food_x3"])
+        self.assertTrue(all(len(line["schedules"]) == 5 for line in lines))
+
+    def test_success_samples_report_an_estimate(self):
+        """Test that --success-samples adds the best schedule's Monte Carlo estimate.
+
+        :return: None
+        """
+        summary = self.run_cli("--success-samples", "500")
+        self.assertEqual(summary["success"]["samples"], 500)
+        self.assertTrue(0 <= summary["success"]["success_rate"] <= 1)
+        self.assertIsNone(self.run_cli()["success"])
+
+    def test_macros_from_earlier_log(self):
+        """Test that --macros-from mines an earlier log without changing the best score.
+
+        :return: None
+        """
+        plain = self.run_cli("--depth", "3")
+        previous = os.path.join(self.tmpdir, "previous.jsonl")
+        os.replace(plain["log"], previous)
+        summary = self.run_cli("--depth", "3", "--macros-from", previous)
+        self.assertGreater(summary["macros"], 0)
+        self.assertAlmostEqual(summary["best_score"], plain["best_score"])
+        self.assertIsNone(plain["macros"])
+
+    def test_parse_scales(self):
+        """Test that scales are parsed and validated.
+
+        :return: None
+        """
+        self.assertEqual(cli.parse_scales("1,3,5"), (1, 3, 5))
+        for bad in ("1,x", "0,2"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                cli.parse_scales(bad)
+
+    def test_counts_must_be_positive(self):
+        """Test that depth, counts and worker numbers reject zero and negatives.
+
+        :return: None
+        """
+        self.assertEqual(cli.parse_positive_int("4"), 4)
+        for bad in ("0", "-2", "x", "1,2"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                cli.parse_positive_int(bad)
+        counts = (
+            "--depth", "--num-schedules", "--frontier", "--workers", "--plot-workers", "--iterations",
+            "--success-samples",
+        )
+        for flag in counts:
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                cli.main([flag, "0", "--no-plot"])
+
+    def test_seed_must_be_non_negative(self):
+        """Test that the MCTS seed accepts zero but rejects negatives.
+
+        :return: None
+        """
+        self.assertEqual(cli.parse_non_negative_int("0"), 0)
+        for bad in ("-1", "x"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                cli.parse_non_negative_int(bad)
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            cli.main(["--search", "mcts", "--seed", "-1", "--no-plot"])
+
+    def test_workers_require_mcts(self):
+        """Test that --workers is rejected for single-process searches.
+
+        :return: None
+        """
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            cli.main(["--workers", "2", "--no-plot"])
+
+    def test_hda_reports_worker_expansions(self):
+        """Test that --search hda counts expansions across its worker processes.
+
+        :return: None
+        """
+        summary = self.run_cli("--search", "hda", "--workers", "2")
+        serial = self.run_cli()
+        self.assertGreater(summary["expansions"], 0)
+        self.assertAlmostEqual(summary["best_score"], serial["best_score"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,9 @@
 import unittest
 from unittest.mock import patch
 import io
-from parsers.csv_parser import parse_country_resources, parse_resource_weights
+from parsers.csv_parser import (
+    parse_country_resources, parse_quality_model, parse_resource_weights, parse_weight_sets,
+)
 
 
 class TestCSVParsers(unittest.TestCase):
@@ -45,6 +47,47 @@ Water,2
         expected = {"Population": 0.0, "Food": 3.0, "Water": 2.0}
         self.assertEqual(result, expected)
 
+    def test_parse_weight_sets(self):
+        """Test parsing of named weight-set columns, skipping empty cells.
+
+        :return: None
+        :rtype: None
+        """
+        csv_data = """Resource,base,foodie
+Population,0,0
+Food,3,9
+Water,2,
+"""
+        with patch("builtins.open", return_value=io.StringIO(csv_data)):
+            result = parse_weight_sets("dummy.csv")
+
+        expected = {
+            "base": {"Population": 0.0, "Food": 3.0, "Water": 2.0},
+            "foodie": {"Population": 0.0, "Food": 9.0},
+        }
+        self.assertEqual(result, expected)
+
+    def test_parse_quality_model(self):
+        """Test parsing of quality-model rows, with empty cells as None.
+
+        :return: None
+        :rtype: None
+        """
+        csv_data = """Resource,Curve,Scale,Floor,FloorPenalty,WasteOf,RatioPenalty
+Food,log,1,0.5,20,,
+HousingWaste,,,,,Housing,2
+"""
+        with patch("builtins.open", return_value=io.StringIO(csv_data)):
+            result = parse_quality_model("dummy.csv")
+
+        expected = [
+            {"resource": "Food", "curve": "log", "scale": 1.0, "floor": 0.5, "floor_penalty": 20.0,
+             "waste_of": None, "ratio_penalty": None},
+            {"resource": "HousingWaste", "curve": None, "scale": None, "floor": None, "floor_penalty": None,
+             "waste_of": "Housing", "ratio_penalty": 2.0},
+        ]
+        self.assertEqual(result, expected)
+
 
 if __name__ == "__main__":
     unittest.main()
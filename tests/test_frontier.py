@@ -0,0 +1,74 @@
+"""Tests for the disk-spilling best-first frontier."""
+
+import heapq
+import os
+import random
+import unittest
+
+from search import frontier as frontier_module
+from search.frontier import SpillingFrontier
+
+
+class TestSpillingFrontier(unittest.TestCase):
+    """Test suite comparing SpillingFrontier against a plain heap."""
+
+    def test_matches_in_memory_heap(self):
+        """Test that pushes, pops and trims behave exactly like a heap.
+
+        :return: None
+        """
+        rng = random.Random(7)
+        reference = []
+        with SpillingFrontier(memory_budget=2000) as frontier:
+            for tiebreak in range(3000):
+                entry = (rng.randint(0, 50), tiebreak, {"payload": [tiebreak] * 10})
+                frontier.push(entry)
+                heapq.heappush(reference, entry)
+                if tiebreak % 3 == 0:
+                    self.assertEqual(frontier.pop(), heapq.heappop(reference))
+                if tiebreak % 500 == 499:
+                    frontier.trim(400)
+                    reference = heapq.nsmallest(400, reference)
+                self.assertEqual(len(frontier), len(reference))
+            self.assertGreater(frontier.spills, 1)
+            popped = [frontier.pop() for _ in range(len(frontier))]
+        self.assertEqual(popped, sorted(reference))
+
+    def test_runs_are_merged(self):
+        """Test that too many run files are merged into one.
+
+        :return: None
+        """
+        with SpillingFrontier(memory_budget=500) as frontier:
+            for tiebreak in range(2000):
+                frontier.push((-tiebreak, tiebreak, "x" * 40))
+            self.assertGreater(frontier.spills, frontier_module.MAX_RUNS + 1)
+            run_files = [name for name in os.listdir(frontier.directory) if name.endswith(".run")]
+            self.assertLessEqual(len(run_files), frontier_module.MAX_RUNS)
+            self.assertEqual([frontier.pop()[1] for _ in range(5)], [1999, 1998, 1997, 1996, 1995])
+
+    def test_close_removes_run_files(self):
+        """Test that closing deletes the temporary directory.
+
+        :return: None
+        """
+        frontier = SpillingFrontier(memory_budget=200)
+        for tiebreak in range(100):
+            frontier.push((tiebreak, tiebreak, "node"))
+        directory = frontier.directory
+        self.assertTrue(os.listdir(directory))
+        frontier.close()
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(len(frontier), 0)
+
+    def test_invalid_budget(self):
+        """Test that a non-positive budget is rejected.
+
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            SpillingFrontier(memory_budget=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Unit tests for the hash-distributed best-first search."""
+
+import unittest
+from models.world_model import Country, World
+from scheduler import load_problem, plan_schedules
+from search.hda import hash_distributed_search, owner_of, world_hash
+from search.options import SearchOptions
+from search.ranking import score_schedule
+
+
+class TestHashDistributedSearch(unittest.TestCase):
+    """Test suite for search.hda on the sample data."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample problem once."""
+        cls.world, cls.weights, cls.library = load_problem(
+            "data/weights.csv", "data/resources.csv", "data/templates.txt"
+        )
+
+    def scores(self, ranked):
+        return [round(score_schedule(actions, eus), 9) for actions, eus, _ in ranked]
+
+    def test_world_hash_is_canonical(self):
+        """Test that the hash ignores country, key order, int/float types and float drift.
+
+        :return: None
+        """
+        first = World([Country("A", {"Food": 1, "Water": 2.5}), Country("B", {"Timber": 3})])
+        second = World([Country("B", {"Timber": 3.0}), Country("A", {"Water": 2.5, "Food": 1})])
+        changed = World([Country("A", {"Food": 2, "Water": 2.5}), Country("B", {"Timber": 3})])
+        self.assertEqual(world_hash(first), world_hash(second))
+        self.assertNotEqual(world_hash(first), world_hash(changed))
+        drifted = World([Country("A", {"Food": 0.1 + 0.2, "Water": 2.5}), Country("B", {"Timber": 3})])
+        rounded = World([Country("A", {"Food": 0.3, "Water": 2.5}), Country("B", {"Timber": 3})])
+        self.assertEqual(world_hash(drifted), world_hash(rounded))
+        self.assertIn(owner_of(world_hash(first), 3), range(3))
+
+    def test_matches_best_first(self):
+        """Test that any number of workers ranks the scores a serial search ranks.
+
+        :return: None
+        """
+        for k, partial_order_reduction in ((1, False), (3, True)):
+            serial = plan_schedules(
+                self.world, self.weights, self.library, "Atlantis",
+                SearchOptions(k, 3, 10**6, partial_order_reduction=partial_order_reduction),
+            )
+            for workers in (1, 3):
+                stats = {}
+                ranked = hash_distributed_search(
+                    self.world, self.weights, self.library, "Atlantis", k, 3, 10**6, workers,
+                    partial_order_reduction, stats=stats,
+                )
+                self.assertEqual(self.scores(ranked), self.scores(serial))
+                self.assertEqual(len(stats["expanded_per_worker"]), workers)
+                self.assertEqual(stats["received"], stats["sent"] + 1)
+
+    def test_closed_lists_drop_dominated_paths(self):
+        """Test that permutations reaching a known state are dropped for k = 1.
+
+        :return: None
+        """
+        stats = {}
+        ranked = hash_distributed_search(
+            self.world, self.weights, self.library, "Atlantis", 1, 3, 10**6, 2, False, stats=stats
+        )
+        self.assertGreater(stats["duplicates"], 0)
+        serial = plan_schedules(
+            self.world, self.weights, self.library, "Atlantis",
+            SearchOptions(1, 3, 10**6, partial_order_reduction=False),
+        )
+        self.assertEqual(self.scores(ranked), self.scores(serial))
+
+    def test_scheduler_mode_and_errors(self):
+        """Test the hda search mode of plan_schedules and its argument checks.
+
+        :return: None
+        """
+        ranked = plan_schedules(
+            self.world, self.weights, self.library, "Atlantis", SearchOptions(2, 2, 10**6, "hda", workers=2)
+        )
+        serial = plan_schedules(self.world, self.weights, self.library, "Atlantis", SearchOptions(2, 2, 10**6))
+        self.assertEqual(self.scores(ranked), self.scores(serial))
+        with self.assertRaises(ValueError):
+            SearchOptions(2, 2, 10**6, "hda", macros=[["(TRANSFORM Atlantis Lumber x1)"]])
+        with self.assertRaises(ValueError):
+            hash_distributed_search(self.world, self.weights, self.library, "Atlantis", 2, 2, 10, workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
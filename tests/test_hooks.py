@@ -0,0 +1,93 @@
+"""Unit tests for search-event hooks and the profiler capture."""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from fixtures import sample_scheduler_kwargs
+from scheduler import country_scheduler
+from search.hooks import HOOK_EVENTS, BranchingHistogram, SearchCounters, SearchHooks
+from search.options import SearchOptions
+
+
+class Recorder:
+    """A hook listening to two events only."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_expand(self, depth, branching):
+        del branching
+        self.events.append(("expand", depth))
+
+    def on_complete(self, actions, eus, score, kept):
+        del eus, score, kept
+        self.events.append(("complete", len(actions)))
+
+
+class TestSearchHooks(unittest.TestCase):
+    """Test suite for SearchHooks and the built-in hooks."""
+
+    def run_scheduler(self, tmpdir, **overrides):
+        """Run the scheduler quietly on the sample data and return its results."""
+        params = sample_scheduler_kwargs(tmpdir, frontier_max_size=50)
+        params.update(overrides)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            ranked = country_scheduler(**params)
+        self.assertEqual(output.getvalue(), "")
+        return ranked
+
+    def test_unused_events_are_none(self):
+        """Test that events nobody listens to are bound to None.
+
+        :return: None
+        """
+        self.assertTrue(all(getattr(SearchHooks(), event) is None for event in HOOK_EVENTS))
+        first, second = Recorder(), Recorder()
+        hooks = SearchHooks([first, second])
+        self.assertIsNone(hooks.on_push)
+        hooks.on_expand(0, 4)
+        self.assertEqual(first.events, [("expand", 0)])
+        self.assertEqual(second.events, [("expand", 0)])
+        self.assertEqual(SearchHooks([first]).on_expand, first.on_expand)
+
+    def test_counters_and_histogram_in_both_modes(self):
+        """Test that the built-in hooks see a consistent event stream.
+
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for mode in ("best_first", "dfs"):
+                counters, histogram, recorder = SearchCounters(), BranchingHistogram(), Recorder()
+                ranked = self.run_scheduler(
+                    tmpdir, options=SearchOptions(search_mode=mode), hooks=[counters, histogram, recorder]
+                )
+                summary = histogram.summary()
+                self.assertEqual(summary[0]["nodes"], 1)
+                self.assertEqual(counters.counts["expand"], sum(level["nodes"] for level in summary.values()))
+                self.assertEqual(
+                    counters.counts["successor"],
+                    sum(level["mean"] * level["nodes"] for level in summary.values()),
+                )
+                self.assertGreaterEqual(counters.counts["kept"], len(ranked))
+                self.assertIn(("complete", 2), recorder.events)
+
+    def test_profile_reports_next_to_output(self):
+        """Test that profile mode writes cProfile and tracemalloc reports.
+
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.run_scheduler(tmpdir, profile="all")
+            for suffix in (".prof", ".profile.txt", ".memory.txt"):
+                self.assertTrue(os.path.exists(os.path.join(tmpdir, "schedule" + suffix)))
+            with open(os.path.join(tmpdir, "schedule.memory.txt")) as report:
+                self.assertIn("Peak traced memory", report.read())
+            with self.assertRaises(ValueError):
+                self.run_scheduler(tmpdir, profile="gpu")
+
+
+if __name__ == "__main__":
+    unittest.main()
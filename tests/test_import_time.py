@@ -0,0 +1,73 @@
+"""Cold-start guard for the planner entry points.
+
+The planner is invoked many times per minute, so importing an entry point
+must not load plotting, numeric or profiling packages that a plain run never
+uses. Import times are measured with ``python -X importtime`` in a fresh
+interpreter; run this module directly to print the slowest imports.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = ("main", "cli", "scheduler")
+
+# Loaded on demand only: plotting, sweeps and the turn engine, parallel MCTS, profiling.
+HEAVY_MODULES = ("matplotlib", "numpy", "multiprocessing", "cProfile", "tracemalloc")
+
+# Generous ceiling on the cumulative import time of the CLI, in microseconds.
+COLD_START_BUDGET_US = 500_000
+
+
+def import_times(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and time every import.
+
+    :param module: Dotted module name, importable from the repository root.
+    :return: Mapping from each imported module to its cumulative import
+        time in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+    """Test suite guarding the cold start of the entry points."""
+
+    def test_entry_points_skip_heavy_modules(self):
+        """Test that no entry point loads a heavy package at import.
+
+        :return: None
+        """
+        for module in ENTRY_POINTS:
+            times = import_times(module)
+            self.assertIn(module, times)
+            for heavy in HEAVY_MODULES:
+                self.assertNotIn(heavy, times, f"importing {module} loads {heavy}")
+
+    def test_cli_cold_start_budget(self):
+        """Test that importing the CLI stays within the cold-start budget.
+
+        :return: None
+        """
+        self.assertLess(import_times("cli")["cli"], COLD_START_BUDGET_US)
+
+
+if __name__ == "__main__":
+    slowest = sorted(import_times("main").items(), key=lambda item: -item[1])[:15]
+    for name, micros in slowest:
+        print(f"{micros / 1000:8.1f} ms  {name}")
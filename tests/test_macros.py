@@ -0,0 +1,159 @@
+"""Unit tests for macro-action mining, compilation and search."""
+
+import os
+import tempfile
+import unittest
+from fixtures import chain_problem
+from models.world_model import Country, World
+from scheduler import plan_schedules
+from search.macros import (
+    compile_macros,
+    iter_macro_actions,
+    mine_log_macros,
+    template_chain_macros,
+)
+from search.options import SearchOptions
+from transformations.transformations import apply_action_steps
+from writers.schedule_writer import ScheduleWriter
+
+TIMBER_IN = "(TRANSFER Carpania Atlantis ((Timber 1)))"
+
+
+class SuccessorRecorder:
+    """A hook recording every successor generated."""
+
+    def __init__(self):
+        self.successors = []
+
+    def on_successor(self, depth, action_str, score):
+        del score
+        self.successors.append((depth, action_str))
+
+
+class TestMacros(unittest.TestCase):
+    """Test suite for macro-actions."""
+
+    def setUp(self):
+        """Build a two-country world with a Lumber -> Housing chain."""
+        self.world = World(
+            [
+                Country("Atlantis", {"Population": 10, "AvailableLand": 3, "Timber": 0}),
+                Country("Carpania", {"Population": 5, "Timber": 6, "PotentialEnergyUsable": 25}),
+            ]
+        )
+        self.library, self.weights = chain_problem()
+
+    def test_thresholds_match_sequential_feasibility(self):
+        """Test that a macro is enabled exactly when its steps can run in turn.
+
+        :return: None
+        """
+        compiled = compile_macros(
+            [["(TRANSFORM Atlantis Lumber x1)", "(TRANSFORM Atlantis Housing x1)"]],
+            "Atlantis", self.library, self.weights,
+        )
+        self.assertEqual(len(compiled), 1)
+        chain = compiled[0]
+        # Housing's Timber comes from Lumber, so only the land is needed up front.
+        self.assertIn(("Atlantis", "Timber", 0), chain.preconditions)
+        self.assertEqual(list(iter_macro_actions(self.world, [chain], 2)), [chain])
+        self.assertEqual(list(iter_macro_actions(self.world, [chain], 1)), [])
+
+        compiled = compile_macros([[TIMBER_IN] * 3], "Atlantis", self.library, self.weights)
+        self.assertEqual(len(compiled), 1)
+        transfers = compiled[0]
+        self.assertIn(("Carpania", "PotentialEnergyUsable", 15), transfers.preconditions)
+        self.assertEqual(list(iter_macro_actions(self.world, [transfers], 3)), [transfers])
+        self.world.get_country("Carpania").resources["PotentialEnergyUsable"] = 14
+        self.assertEqual(list(iter_macro_actions(self.world, [transfers], 3)), [])
+
+    def test_steps_apply_like_primitives(self):
+        """Test that applying a macro's steps gives its net change and undoes cleanly.
+
+        :return: None
+        """
+        compiled = compile_macros([[TIMBER_IN] * 2], "Atlantis", self.library, self.weights)
+        self.assertEqual(len(compiled), 1)
+        macro = compiled[0]
+        before = {c.name: dict(c.resources) for c in self.world.all_countries()}
+        undo, steps = apply_action_steps(self.world, "Atlantis", macro, self.weights)
+        self.assertEqual([action_str for action_str, _, _ in steps], [TIMBER_IN] * 2)
+        for country, resource, amount in macro.changes:
+            self.assertAlmostEqual(
+                self.world.get_country(country).resources[resource], before[country].get(resource, 0) + amount
+            )
+        self.world.undo_changes(undo)
+        self.assertEqual({c.name: c.resources for c in self.world.all_countries()}, before)
+
+    def test_sequences_from_logs_and_templates(self):
+        """Test mining recurring log n-grams and static producer/consumer chains.
+
+        :return: None
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = os.path.join(tmpdir, "log.jsonl")
+            with ScheduleWriter(os.path.join(tmpdir, "out.txt"), log_path) as writer:
+                for _ in range(2):
+                    writer.write([TIMBER_IN, TIMBER_IN, "(TRANSFORM Atlantis Lumber x1)"], [0, 1, 2, 3], [{}] * 3)
+            mined = mine_log_macros([log_path], min_support=2)
+        self.assertEqual(mined[0], (TIMBER_IN, TIMBER_IN, "(TRANSFORM Atlantis Lumber x1)"))
+        self.assertNotIn(("(TRANSFORM Atlantis Lumber x1)", TIMBER_IN), mined)
+
+        chains = template_chain_macros(self.library, "Atlantis", self.weights)
+        self.assertEqual(chains, [("(TRANSFORM Atlantis Lumber x1)", "(TRANSFORM Atlantis Housing x1)")])
+        with self.assertRaises(ValueError):
+            compile_macros([["(TRANSFORM Atlantis Mill x1)", TIMBER_IN]], "Atlantis", self.library, self.weights)
+
+    def test_search_results_unchanged(self):
+        """Test that both searches find the same schedules with macros, with and without POR.
+
+        :return: None
+        """
+        sequences = [
+            ["(TRANSFORM Atlantis Lumber x1)", "(TRANSFORM Atlantis Housing x1)"],
+            [TIMBER_IN, "(TRANSFORM Atlantis Lumber x1)"],
+        ]
+        for mode in ("best_first", "dfs"):
+            for partial_order_reduction in (True, False):
+                results = []
+                for macros in (None, sequences):
+                    options = SearchOptions(100, 3, 10**6, mode, partial_order_reduction, macros=macros)
+                    ranked = plan_schedules(self.world, self.weights, self.library, "Atlantis", options)
+                    results.append(sorted(tuple(actions) for actions, _, _ in ranked))
+                self.assertEqual(results[0], results[1])
+                self.assertEqual(len(set(results[1])), len(results[1]))
+
+    def test_macro_replaces_its_steps(self):
+        """Test that the primitive path a macro child stands for is cut at its last step.
+
+        :return: None
+        """
+        housing = "(TRANSFORM Atlantis Housing x1)"
+        sequences = [["(TRANSFORM Atlantis Lumber x1)", housing]]
+        for mode in ("best_first", "dfs"):
+            successors = []
+            for macros in (None, sequences):
+                recorder = SuccessorRecorder()
+                options = SearchOptions(100, 2, 10**6, mode, macros=macros)
+                plan_schedules(self.world, self.weights, self.library, "Atlantis", options, hooks=[recorder])
+                successors.append(recorder.successors)
+            # Housing only becomes feasible after Lumber, so at depth 2 it
+            # is reached through Lumber or through the macro, never both.
+            self.assertIn((2, housing), successors[0])
+            self.assertNotIn((2, housing), successors[1])
+            self.assertIn((2, "(MACRO (TRANSFORM Atlantis Lumber x1) " + housing + ")"), successors[1])
+
+    def test_oversized_transfers_rejected(self):
+        """Test that a macro cannot move more per transfer than the search bound assumes.
+
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            compile_macros(
+                [["(TRANSFER Carpania Atlantis ((Timber 4)))", "(TRANSFORM Atlantis Lumber x1)"]],
+                "Atlantis", self.library, self.weights,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
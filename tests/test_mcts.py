@@ -0,0 +1,72 @@
+"""Unit tests for the Monte Carlo Tree Search planner."""
+
+import unittest
+from models.world_model import Country, World
+from search.mcts import MCTSPlanner, root_parallel_mcts
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+
+class TestMCTSPlanner(unittest.TestCase):
+    """Test suite for MCTSPlanner and root_parallel_mcts."""
+
+    def setUp(self):
+        """Build a one-country world with two simple transforms."""
+        self.world = World([Country("Atlantis", {"Population": 10, "Timber": 20, "AvailableLand": 5})])
+        self.library = TemplateLibrary(
+            [
+                TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 10}),
+                TransformTemplate("Housing", {"Timber": 5}, {"Housing": 1}),
+            ],
+            scales=(1, 2),
+        )
+        self.weights = {"Timber": 0.5, "AvailableLand": 3, "Housing": 11, "Population": 6}
+
+    def test_schedules_are_complete_and_world_restored(self):
+        """Test that rollouts yield full-length schedules and leave the world as found.
+
+        :return: None
+        """
+        before = dict(self.world.get_country("Atlantis").resources)
+        planner = MCTSPlanner(self.world, "Atlantis", self.library, self.weights, 3, 5, seed=1)
+        ranked = planner.run(iterations=200)
+        self.assertTrue(ranked)
+        for actions, eus, deltas in ranked:
+            self.assertEqual(len(actions), 3)
+            self.assertEqual(len(eus), 4)
+            self.assertEqual(len(deltas), 3)
+        finals = [eus[-1] for _, eus, _ in ranked]
+        self.assertEqual(finals, sorted(finals, reverse=True))
+        self.assertEqual(self.world.get_country("Atlantis").resources, before)
+
+    def test_finds_best_housing_plan(self):
+        """Test that the search finds the all-Housing schedule in this tiny world.
+
+        :return: None
+        """
+        ranked, _, _ = root_parallel_mcts(
+            self.world, "Atlantis", self.library, self.weights, 2, 1, iterations=300, rollout_policy="greedy"
+        )
+        self.assertEqual(ranked[0][0], ["(TRANSFORM Atlantis Housing x2)"] * 2)
+
+    def test_seeded_runs_are_reproducible(self):
+        """Test that the same seed and budget give identical results.
+
+        :return: None
+        """
+        first = root_parallel_mcts(self.world, "Atlantis", self.library, self.weights, 3, 3, iterations=100, seed=7)
+        second = root_parallel_mcts(self.world, "Atlantis", self.library, self.weights, 3, 3, iterations=100, seed=7)
+        self.assertEqual(first, second)
+
+    def test_invalid_arguments(self):
+        """Test that bad policies and missing budgets are rejected.
+
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            MCTSPlanner(self.world, "Atlantis", self.library, self.weights, 3, 5, rollout_policy="lazy")
+        with self.assertRaises(ValueError):
+            root_parallel_mcts(self.world, "Atlantis", self.library, self.weights, 3, 5, iterations=None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Unit tests for the Monte Carlo schedule simulator."""
+
+import unittest
+
+from evaluations.monte_carlo import ScheduleSimulator, estimate_schedule_success
+from evaluations.state_quality import compute_state_quality
+from models.world_model import Country, World
+from scheduler import load_problem, plan_schedules
+from search.options import SearchOptions
+from transformations.transformations import TransformTemplate, action_from_string, apply_action
+
+
+class TestScheduleSimulator(unittest.TestCase):
+    """Test suite for evaluations.monte_carlo on the sample data."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample problem and plan a few schedules once."""
+        cls.world, cls.weights, cls.library = load_problem(
+            "data/weights.csv", "data/resources.csv", "data/templates.txt"
+        )
+        cls.ranked = plan_schedules(cls.world, cls.weights, cls.library, "Atlantis", SearchOptions(5, 3, 100))
+
+    def test_certain_outcomes_match_the_world(self):
+        """Test that without uncertainty every sample ends in the applied state.
+
+        :return: None
+        """
+        simulator = ScheduleSimulator(
+            self.world, "Atlantis", self.weights, self.library, samples=10, yield_sd=0, acceptance=1, gamma=1
+        )
+        for actions, _, _ in self.ranked:
+            world = self.world.clone()
+            for action_str in actions:
+                action = action_from_string(action_str, self.library, self.weights)
+                apply_action(world, "Atlantis", action, self.weights)
+            expected = compute_state_quality(world.get_country("Atlantis").resources, self.weights)
+            expected -= compute_state_quality(self.world.get_country("Atlantis").resources, self.weights)
+            estimate = simulator.estimate(actions)
+            self.assertAlmostEqual(estimate.mean, expected)
+            self.assertAlmostEqual(estimate.variance, 0)
+            self.assertEqual(estimate.success_rate, 1)
+
+    def test_declined_transfers_fail(self):
+        """Test that the success rate of a TRANSFER follows its acceptance.
+
+        :return: None
+        """
+        transfer = ["(TRANSFORM Atlantis Birth x1)", "(TRANSFER Carpania Atlantis ((Water 1)))"]
+        simulator = ScheduleSimulator(self.world, "Atlantis", self.weights, self.library, acceptance=0.7)
+        self.assertAlmostEqual(simulator.estimate(transfer).success_rate, 0.7, delta=0.05)
+        never = ScheduleSimulator(self.world, "Atlantis", self.weights, self.library, acceptance=0)
+        self.assertEqual(never.estimate(transfer).success_rate, 0)
+
+    def test_missing_inputs_skip_steps(self):
+        """Test that a transform short of inputs in some samples is skipped there.
+
+        :return: None
+        """
+        world = World([Country("A", {"Population": 1, "Timber": 1, "Housing": 0})])
+        grow = TransformTemplate("Grow", {}, {"Timber": 1})
+        build = TransformTemplate("Build", {"Timber": 2}, {"Housing": 1})
+        simulator = ScheduleSimulator(world, "A", {"Housing": 1}, yield_sd=0.5, gamma=1)
+        utilities, succeeded = simulator.simulate([(grow, "A"), (build, "A")])
+        self.assertTrue(0 < succeeded.mean() < 1)
+        self.assertTrue((utilities[~succeeded] == 0).all())
+
+    def test_estimates_are_seeded(self):
+        """Test that estimates repeat for a seed and change with it.
+
+        :return: None
+        """
+        first = estimate_schedule_success(self.world, "Atlantis", self.ranked, self.weights, self.library, seed=1)
+        again = estimate_schedule_success(self.world, "Atlantis", self.ranked, self.weights, self.library, seed=1)
+        other = estimate_schedule_success(self.world, "Atlantis", self.ranked, self.weights, self.library, seed=2)
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(first), len(self.ranked))
+
+    def test_invalid_parameters_raise(self):
+        """Test that impossible sample counts and probabilities are rejected.
+
+        :return: None
+        """
+        for kwargs in ({"samples": 0}, {"yield_sd": -1}, {"acceptance": 1.5}):
+            with self.assertRaises(ValueError):
+                ScheduleSimulator(self.world, "Atlantis", self.weights, **kwargs)
+        with self.assertRaises(ValueError):
+            ScheduleSimulator(self.world, "Atlantis", self.weights).estimate(["(TRANSFORM Atlantis Birth x1)"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Unit tests for the schedule-log plotting pipeline."""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from visualizations.pipeline import (
+    downsample,
+    load_schedule_series,
+    plot_in_background,
+    plot_schedule_series,
+    render_schedule_series,
+)
+from writers.schedule_writer import schedule_record
+
+INITIAL = {"Population": 10, "Food": 5, "Water": 3}
+
+
+class TestPlotPipeline(unittest.TestCase):
+    """Test suite for visualizations.pipeline."""
+
+    def setUp(self):
+        """Write a small log and initial-resources CSV to a scratch directory."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.schedules = [
+            (["a", "b"], [0, 1, 2], [{"Food": 2}, {"Food": -1, "Timber": 4}]),
+            (["c"], [0, 5], [{"Water": -3, "Population": 1}]),
+            (["d", "e", "f"], [0, 1, 1, 3], [{"Timber": 1}, {}, {"Food": 0.5}]),
+        ]
+        self.log = os.path.join(self.tmpdir, "log.jsonl")
+        self.write_log(self.log, self.schedules)
+        self.csv = os.path.join(self.tmpdir, "resources.csv")
+        with open(self.csv, "w", encoding="utf-8") as f:
+            f.write("Country,Population,Food,Water\nCarpania,1,1,1\nAtlantis,10,5,3\n")
+
+    def tearDown(self):
+        """Remove the scratch directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def write_log(self, path, schedules, tail=""):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            for num, schedule in enumerate(schedules, 1):
+                f.write(json.dumps(schedule_record(num, *schedule)) + "\n")
+            f.write(tail)
+
+    def expected(self, deltas):
+        state = dict(INITIAL)
+        rows = [dict(state)]
+        for delta in deltas:
+            for res, amount in delta.items():
+                state[res] = state.get(res, 0) + amount
+            rows.append(dict(state))
+        return rows
+
+    def test_series_match_step_by_step_sums(self):
+        """Test that the single cumulative sum restarts at every schedule.
+
+        :return: None
+        """
+        gzipped = self.log + ".gz"
+        self.write_log(gzipped, self.schedules)
+        for path in (self.log, gzipped):
+            series = load_schedule_series(path, INITIAL)
+            self.assertEqual(series.schedule_nums, (1, 2, 3))
+            self.assertEqual(series.resources, ("Population", "Food", "Water", "Timber"))
+            for i, (_, eus, deltas) in enumerate(self.schedules):
+                values, logged_eus = series.schedule(i)
+                rows = [[row.get(res, 0) for res in series.resources] for row in self.expected(deltas)]
+                np.testing.assert_allclose(values, rows)
+                self.assertTrue(np.isnan(logged_eus[0]))
+                np.testing.assert_allclose(logged_eus[1:], eus[1:])
+
+    def test_subset_stops_reading_early(self):
+        """Test that reading stops once every requested schedule is found.
+
+        :return: None
+        """
+        self.write_log(self.log, self.schedules, tail="not json\n")
+        series = load_schedule_series(self.log, INITIAL, schedules=[2, 1])
+        self.assertEqual(series.schedule_nums, (1, 2))
+        np.testing.assert_allclose(series.schedule(1)[0][-1], [11, 5, 0, 0])
+        with self.assertRaises(ValueError):
+            load_schedule_series(os.path.join(self.tmpdir, "log.jsonl"), INITIAL, schedules=[7])
+
+    def test_downsample_keeps_endpoints(self):
+        """Test that long series are thinned to at most max_points steps.
+
+        :return: None
+        """
+        np.testing.assert_array_equal(downsample(5, 10), np.arange(5))
+        index = downsample(10001, 100)
+        self.assertLessEqual(len(index), 100)
+        self.assertEqual((index[0], index[-1]), (0, 10000))
+        self.assertTrue((np.diff(index) > 0).all())
+
+    def test_render_combined_and_per_schedule(self):
+        """Test that one combined image, or one image per schedule, is written.
+
+        :return: None
+        """
+        series = load_schedule_series(self.log, INITIAL)
+        combined = os.path.join(self.tmpdir, "all.png")
+        self.assertEqual(render_schedule_series(series, combined, max_points=2), [combined])
+        pattern = os.path.join(self.tmpdir, "plots", "s{schedule_num}.png")
+        written = render_schedule_series(series, pattern, workers=2)
+        self.assertEqual(written, [pattern.format(schedule_num=num) for num in (1, 2, 3)])
+        for path in [combined] + written:
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(4), b"\x89PNG")
+
+    def test_background_plot(self):
+        """Test that the background process writes the plot for the chosen country.
+
+        :return: None
+        """
+        output = os.path.join(self.tmpdir, "bg.png")
+        process = plot_in_background(self.log, output, self.csv, "Atlantis", [3])
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+        self.assertTrue(os.path.exists(output))
+        with self.assertRaises(ValueError):
+            plot_schedule_series(self.log, output, self.csv, country="Nowhere")
+
+
+if __name__ == "__main__":
+    unittest.main()
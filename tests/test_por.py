@@ -0,0 +1,116 @@
+"""Unit tests for partial-order reduction with sleep sets."""
+
+import unittest
+from models.world_model import Country, World
+from scheduler import plan_schedules
+from search.dfs import depth_first_search
+from search.options import SearchOptions
+from search.por import IndependenceOracle
+from search.ranking import TopKSchedules
+from transformations.transformations import TemplateLibrary, TransformTemplate, iter_actions
+
+
+class TestPartialOrderReduction(unittest.TestCase):
+    """Test suite for IndependenceOracle and its use in depth-first search."""
+
+    def setUp(self):
+        """Build a world where Lumber and Mine touch disjoint resources."""
+        self.world = World(
+            [Country("Atlantis", {"Population": 10, "AvailableLand": 4, "Ore": 4, "Water": 3})]
+        )
+        self.library = TemplateLibrary(
+            [
+                TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 5}),
+                TransformTemplate("Mine", {"Ore": 1}, {"MetallicElements": 2}),
+                TransformTemplate("Farm", {"Water": 2, "AvailableLand": 1}, {"Food": 3}),
+            ],
+            scales=(1,),
+        )
+        self.weights = {"Timber": 1, "MetallicElements": 2, "Food": 3, "AvailableLand": 1, "Ore": 0.5}
+        self.oracle = IndependenceOracle("Atlantis")
+        self.actions = {
+            a.action_str.split()[2]: a for a in iter_actions(self.world, "Atlantis", self.library, self.weights)
+        }
+
+    def test_disjoint_transforms_are_independent(self):
+        """Test that transforms with disjoint resources commute.
+
+        :return: None
+        """
+        self.assertTrue(self.oracle.independent(self.actions["Lumber"], self.actions["Mine"], self.world))
+
+    def test_shared_inputs_depend_on_slack(self):
+        """Test that sharing a consumed resource is independent only with enough slack.
+
+        :return: None
+        """
+        lumber, farm = self.actions["Lumber"], self.actions["Farm"]
+        self.assertTrue(self.oracle.independent(lumber, farm, self.world))
+        self.world.get_country("Atlantis").resources["AvailableLand"] = 1
+        self.assertFalse(self.oracle.independent(lumber, farm, self.world))
+
+    def test_sleep_sets_skip_permutations(self):
+        """Test that the child of a later sibling sleeps on independent earlier ones.
+
+        :return: None
+        """
+        ordered = [self.actions["Lumber"], self.actions["Mine"]]
+        expansion = self.oracle.expand(ordered, (), self.world)
+        self.assertEqual(expansion[0][1], ())
+        self.assertEqual(expansion[1][1], (self.actions["Lumber"],))
+
+    def test_dfs_same_best_with_fewer_expansions(self):
+        """Test that reduction keeps the best schedule and expands fewer nodes.
+
+        :return: None
+        """
+        results = {}
+        for reduce in (False, True):
+            top = TopKSchedules(1)
+            expanded = depth_first_search(
+                self.world, "Atlantis", self.library, self.weights, 3, top,
+                partial_order_reduction=reduce,
+            )
+            results[reduce] = (expanded, top.ranked()[0][1][-1])
+        self.assertAlmostEqual(results[True][1], results[False][1])
+        self.assertLess(results[True][0], results[False][0])
+
+    def test_trade_bundles_depend_on_transforms(self):
+        """Test that reduction keeps schedules whose TRANSFER a TRANSFORM resizes.
+
+        Farm covers Atlantis's Food deficit, so after it Carpania offers a
+        different Food bundle; the TRANSFER-then-Farm order must be expanded.
+
+        :return: None
+        """
+        world = World(
+            [
+                Country("Atlantis", {"Population": 10, "Water": 2, "Food": 0}),
+                Country("Carpania", {"Population": 10, "Food": 5, "PotentialEnergyUsable": 50}),
+            ]
+        )
+        library = TemplateLibrary(
+            [
+                TransformTemplate("Farm", {"Water": 1}, {"Food": 1}),
+                TransformTemplate("Feast", {"Food": 1}, {"Population": 1}),
+            ],
+            scales=(1,),
+        )
+        weights = {"Food": 1, "Water": 0.5, "Population": 2}
+        farm, transfer = iter_actions(world, "Atlantis", library, weights)
+        self.assertFalse(IndependenceOracle("Atlantis", library).independent(farm, transfer, world))
+        self.assertFalse(IndependenceOracle("Atlantis").independent(farm, transfer, world))
+        for mode in ("best_first", "dfs"):
+            classes = [
+                {tuple(sorted(actions)) for actions, _, _ in plan_schedules(
+                    world, weights, library, "Atlantis",
+                    SearchOptions(100, 2, 1000, mode, partial_order_reduction=reduce),
+                )}
+                for reduce in (False, True)
+            ]
+            self.assertIn((transfer.action_str, farm.action_str), classes[1])
+            self.assertEqual(classes[0], classes[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
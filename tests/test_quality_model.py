@@ -0,0 +1,119 @@
+"""Unit tests for compiled non-linear quality models."""
+
+import math
+import pickle
+import random
+import unittest
+from dataclasses import replace
+
+from evaluations.quality_model import QualityModel
+from evaluations.state_quality import compute_state_quality
+from scheduler import load_problem, plan_schedules
+from search.options import SearchOptions
+from search.ranking import optimistic_step_gain, score_schedule, step_score
+from transformations.transformations import apply_action, iter_actions
+
+
+class TestQualityModel(unittest.TestCase):
+    """Test suite for evaluations.quality_model."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample problem with and without the sample model."""
+        files = ("data/weights.csv", "data/resources.csv", "data/templates.txt")
+        cls.world, cls.weights, cls.library = load_problem(*files)
+        _, cls.model, _ = load_problem(*files, quality_model_filename="data/quality_model.csv")
+
+    def test_linear_model_matches_weights(self):
+        """Test that a model without terms scores like the linear quality.
+
+        :return: None
+        """
+        model = QualityModel(self.weights)
+        for country in self.world.all_countries():
+            expected = compute_state_quality(country.resources, self.weights)
+            self.assertAlmostEqual(model.quality(country.resources), expected)
+        self.assertEqual(compute_state_quality({"Population": 0}, model), -math.inf)
+
+    def test_batch_matches_single_states(self):
+        """Test that batched evaluation agrees with scoring one state at a time.
+
+        :return: None
+        """
+        states = [country.resources for country in self.world.all_countries()]
+        batch = self.model.qualities(states)
+        for state, quality in zip(states, batch):
+            self.assertAlmostEqual(quality, compute_state_quality(state, self.model))
+        self.assertEqual(len(self.model.qualities([])), 0)
+
+    def test_curves_floors_and_ratios(self):
+        """Test each kind of term on a hand-computed state.
+
+        :return: None
+        """
+        model = QualityModel(
+            {"Food": 2, "Housing": 1, "HousingWaste": 0},
+            [
+                {"resource": "Food", "curve": "log", "scale": 2, "floor": 1, "floor_penalty": 10},
+                {"resource": "Housing", "curve": "saturating", "scale": 1},
+                {"resource": "HousingWaste", "waste_of": "Housing", "ratio_penalty": 4},
+            ],
+        )
+        state = {"Population": 2, "Food": 1, "Housing": 4, "HousingWaste": 1}
+        expected = 2 * 2 * math.log1p(0.5 / 2) - 10 * 0.5 + (1 - math.exp(-2)) - 4 * 1 / 5
+        self.assertAlmostEqual(model.quality(state), expected)
+        self.assertAlmostEqual(pickle.loads(pickle.dumps(model)).quality(state), expected)
+
+    def test_invalid_terms_raise(self):
+        """Test that malformed terms are rejected.
+
+        :return: None
+        """
+        bad_specs = [
+            [{"resource": "Food", "curve": "cubic"}],
+            [{"resource": "Food", "curve": "log", "scale": 0}],
+            [{"resource": "Food", "floor": 1}],
+            [{"resource": "Food", "floor": 1, "floor_penalty": -1}],
+            [{"resource": "FoodWaste", "ratio_penalty": 1}],
+            [{"resource": "Food"}, {"resource": "Food", "curve": "log"}],
+        ]
+        for spec in bad_specs:
+            with self.assertRaises(ValueError):
+                QualityModel(self.weights, spec)
+
+    def test_step_bound_holds(self):
+        """Test that no step of random schedules beats the optimistic bound.
+
+        :return: None
+        """
+        resources = self.world.get_country("Atlantis").resources
+        depth = 4
+        bound = optimistic_step_gain(self.library, self.model, resources["Population"], depth, resources)
+        rng = random.Random(7)
+        for _ in range(100):
+            world = self.world.clone()
+            for _ in range(depth):
+                actions = list(iter_actions(world, "Atlantis", self.library, self.model))
+                action = rng.choice(actions)
+                _, _, delta_score = apply_action(world, "Atlantis", action, self.model)
+                self.assertLessEqual(step_score(action.action_str, delta_score), bound)
+
+    def test_searches_agree_under_a_model(self):
+        """Test that best-first and depth-first search rank the same scores.
+
+        :return: None
+        """
+        options = SearchOptions(5, 3, 100000)
+        best_first = plan_schedules(self.world, self.model, self.library, "Atlantis", options)
+        dfs = plan_schedules(self.world, self.model, self.library, "Atlantis", replace(options, search_mode="dfs"))
+        linear = plan_schedules(self.world, self.weights, self.library, "Atlantis", options)
+        scores = [
+            [round(score_schedule(actions, eus), 9) for actions, eus, _ in ranked]
+            for ranked in (best_first, dfs, linear)
+        ]
+        self.assertEqual(scores[0], scores[1])
+        self.assertNotEqual(scores[0], scores[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Unit tests for schedule ranking and optimistic search bounds."""
+
+import unittest
+from search.ranking import TopKSchedules, optimistic_step_gain, score_schedule
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+
+class TestTopKSchedules(unittest.TestCase):
+    """Test suite for the bounded top-k schedule heap."""
+
+    def test_keeps_best_k(self):
+        """Test that only the k best schedules are kept, best first.
+
+        :return: None
+        """
+        top = TopKSchedules(2)
+        for score in [1.0, 5.0, 3.0, 4.0]:
+            top.offer(score, (["a"], [0.0, score], [{}]))
+        self.assertEqual([eus[-1] for _, eus, _ in top.ranked()], [5.0, 4.0])
+        self.assertEqual(top.threshold(), 4.0)
+
+    def test_can_enter(self):
+        """Test the admission check used for early termination.
+
+        :return: None
+        """
+        top = TopKSchedules(1)
+        self.assertTrue(top.can_enter(-100.0))
+        top.offer(2.0, ([], [0.0, 2.0], []))
+        self.assertFalse(top.can_enter(2.0))
+        self.assertTrue(top.can_enter(2.5))
+        self.assertFalse(TopKSchedules(0).can_enter(10.0))
+
+    def test_unique_rejects_repeated_schedules(self):
+        """Test that a unique top-k keeps each action sequence once.
+
+        :return: None
+        """
+        top = TopKSchedules(2, unique=True)
+        self.assertTrue(top.offer(3.0, (["a"], [0.0, 3.0], [{}])))
+        self.assertFalse(top.offer(3.0, (["a"], [0.0, 3.0], [{}])))
+        top.offer(2.0, (["b"], [0.0, 2.0], [{}]))
+        top.offer(4.0, (["c"], [0.0, 4.0], [{}]))
+        self.assertTrue(top.offer(3.5, (["b"], [0.0, 3.5], [{}])))
+
+    def test_floor_rejects_lower_scores(self):
+        """Test that a known floor prunes before the top-k is full.
+
+        :return: None
+        """
+        top = TopKSchedules(3, floor=2.0)
+        self.assertFalse(top.can_enter(1.5))
+        self.assertFalse(top.offer(1.5, (["a"], [0.0, 1.5], [{}])))
+        self.assertTrue(top.offer(2.0, (["b"], [0.0, 2.0], [{}])))
+
+    def test_ties_keep_discovery_order(self):
+        """Test that equal scores are ranked in the order they were found.
+
+        :return: None
+        """
+        top = TopKSchedules(3)
+        top.offer(1.0, (["first"], [0.0, 1.0], [{}]))
+        top.offer(1.0, (["second"], [0.0, 1.0], [{}]))
+        self.assertEqual([actions[0] for actions, _, _ in top.ranked()], ["first", "second"])
+
+
+class TestOptimisticStepGain(unittest.TestCase):
+    """Test suite for the per-step score bound."""
+
+    def test_score_schedule(self):
+        """Test that the schedule score is its total gain.
+
+        :return: None
+        """
+        self.assertAlmostEqual(score_schedule(["a", "b"], [2.0, 5.0, 4.0]), 2.0)
+
+    def test_bound_covers_best_transform(self):
+        """Test that the bound is at least the best weighted TRANSFORM gain.
+
+        :return: None
+        """
+        library = TemplateLibrary(
+            [TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 10})], scales=(1, 2)
+        )
+        weights = {"AvailableLand": 3, "Timber": 1}
+        gain = optimistic_step_gain(library, weights, population=10, depth_bound=3)
+        self.assertGreaterEqual(gain, 2 * (10 - 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
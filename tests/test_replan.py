@@ -0,0 +1,139 @@
+"""Unit tests for warm-start replanning between turns."""
+
+import unittest
+from scheduler import SearchState, load_problem, plan_schedules, replan_schedules
+from search.options import SearchOptions
+from search.ranking import score_schedule
+from search.replan import TranspositionTable, changes_from_deltas, replay_schedule
+
+DELTAS = [
+    {"Atlantis": {"Electronics": 2, "Water": 2}},
+    {"Atlantis": {"Timber": -1, "Population": -2}, "Carpania": {"Food": 3}},
+]
+
+
+class TestTranspositionTable(unittest.TestCase):
+    """Test suite for the path-keyed node table."""
+
+    def test_pending_changes_follow_epochs(self):
+        """Test that a node is owed exactly the changes recorded after it.
+
+        :return: None
+        """
+        table = TranspositionTable()
+        table.put(("a",), "node a")
+        table.advance([("X", "Water", 1)])
+        table.put(("b",), "node b")
+        table.advance([("X", "Food", -2)])
+        node, epoch = table.get(("a",))
+        self.assertEqual(node, "node a")
+        self.assertEqual(table.since(epoch), (("X", "Water", 1), ("X", "Food", -2)))
+        self.assertEqual(table.since(table.get(("b",))[1]), (("X", "Food", -2),))
+        self.assertIsNone(table.get(("c",)))
+        self.assertEqual((table.hits, table.misses), (2, 1))
+
+    def test_max_entries(self):
+        """Test that a full table keeps updating known paths only.
+
+        :return: None
+        """
+        table = TranspositionTable(max_entries=1)
+        table.put(("a",), 1)
+        table.put(("b",), 2)
+        table.put(("a",), 3)
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.get(("a",))[0], 3)
+
+    def test_changes_from_deltas(self):
+        """Test that zero changes are dropped and the order is fixed.
+
+        :return: None
+        """
+        changes = changes_from_deltas({"B": {"Water": 1}, "A": {"Food": 0, "Alloys": -1}})
+        self.assertEqual(changes, [("A", "Alloys", -1), ("B", "Water", 1)])
+
+
+class TestReplanSchedules(unittest.TestCase):
+    """Test suite comparing warm replans with cold searches."""
+
+    def setUp(self):
+        """Load the sample problem."""
+        self.world, self.weights, self.library = load_problem(
+            "data/weights.csv", "data/resources.csv", "data/templates.txt"
+        )
+
+    def plan(self, world, search_mode="best_first", frontier_max_size=10**6):
+        """Plan cold from ``world``."""
+        return plan_schedules(
+            world, self.weights, self.library, "Atlantis", SearchOptions(4, 3, frontier_max_size, search_mode)
+        )
+
+    def replan(self, state, deltas, search_mode="best_first", frontier_max_size=10**6):
+        """Plan warm from ``state``."""
+        return replan_schedules(
+            state, deltas, self.weights, self.library, "Atlantis",
+            SearchOptions(4, 3, frontier_max_size, search_mode),
+        )
+
+    @staticmethod
+    def scores(ranked):
+        """Return the ranking scores of ``ranked``."""
+        return [round(score_schedule(actions, eus), 9) for actions, eus, _ in ranked]
+
+    def test_replan_matches_cold_search(self):
+        """Test that replanning scores the same as planning from scratch.
+
+        :return: None
+        """
+        for search_mode in ("best_first", "dfs"):
+            state = SearchState.start(self.world)
+            self.assertEqual(self.replan(state, None, search_mode), self.plan(self.world, search_mode))
+            world = self.world.clone()
+            for deltas in DELTAS:
+                world.apply_changes(changes_from_deltas(deltas))
+                warm = self.replan(state, deltas, search_mode)
+                self.assertEqual(self.scores(warm), self.scores(self.plan(world, search_mode)))
+                for actions, _, _ in warm:
+                    self.assertIsNotNone(replay_schedule(world, "Atlantis", actions, self.library, self.weights))
+            # Only best-first search records and reuses nodes.
+            self.assertEqual(state.transpositions.hits > 0, search_mode == "best_first")
+
+    def test_replan_leaves_original_world_unchanged(self):
+        """Test that the state plans on its own copy of the world.
+
+        :return: None
+        """
+        before = self.world.get_country("Atlantis").resources.copy()
+        state = SearchState.start(self.world)
+        self.replan(state, None)
+        self.replan(state, DELTAS[0])
+        self.assertEqual(self.world.get_country("Atlantis").resources, before)
+        self.assertEqual(state.world.get_country("Atlantis").resources["Water"], before["Water"] + 2)
+
+    def test_seeds_survive_frontier_eviction(self):
+        """Test that replayed schedules are kept even if eviction loses them.
+
+        :return: None
+        """
+        state = SearchState.start(self.world)
+        self.replan(state, None)
+        warm = self.replan(state, DELTAS[0], frontier_max_size=2)
+        self.assertEqual(len(warm), 4)
+        cold = self.plan(state.world, frontier_max_size=2)
+        self.assertGreaterEqual(self.scores(warm), self.scores(cold))
+
+    def test_infeasible_schedules_are_not_replayed(self):
+        """Test that a schedule the changed world cannot afford is dropped.
+
+        :return: None
+        """
+        world = self.world.clone()
+        actions = ["(TRANSFORM Atlantis Housing x1)"]
+        self.assertIsNotNone(replay_schedule(world, "Atlantis", actions, self.library, self.weights))
+        world.get_country("Atlantis").resources["Timber"] = 0
+        self.assertIsNone(replay_schedule(world, "Atlantis", actions, self.library, self.weights))
+        self.assertIsNone(replay_schedule(world, "Atlantis", ["(NOTHING)"], self.library, self.weights))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Unit tests for the on-disk scheduler result cache."""
+
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+from cache.result_cache import ResultCache, code_version, problem_key
+from models.world_model import Country, World
+from scheduler import country_scheduler
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+SCHEDULE = (["(TRANSFORM Atlantis Lumber x1)"], [1.0, 2.5], [{"Timber": 5, "AvailableLand": -1}])
+
+
+class TestResultCache(unittest.TestCase):
+    """Test suite for ResultCache and problem_key."""
+
+    def setUp(self):
+        """Create an empty cache directory."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "cache")
+
+    def tearDown(self):
+        """Remove the cache directory."""
+        self.tmpdir.cleanup()
+
+    def test_key_covers_every_input(self):
+        """Test that changing any input changes the key.
+
+        :return: None
+        """
+        world = World([Country("Atlantis", {"Population": 10, "Timber": 3})])
+        library = TemplateLibrary([TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 5})])
+        weights = {"Timber": 0.5}
+        params = {"country": "Atlantis", "depth_bound": 3}
+        key = problem_key(world, weights, library, params)
+        self.assertEqual(key, problem_key(world, dict(weights), library, dict(params)))
+        changed = World([Country("Atlantis", {"Population": 10, "Timber": 4})])
+        self.assertNotEqual(key, problem_key(changed, weights, library, params))
+        self.assertNotEqual(key, problem_key(world, {"Timber": 1}, library, params))
+        self.assertNotEqual(key, problem_key(world, weights, TemplateLibrary(library.templates, (1,)), params))
+        self.assertNotEqual(key, problem_key(world, weights, library, dict(params, depth_bound=4)))
+        self.assertEqual(len(code_version()), 64)
+
+    def test_round_trip_and_code_version(self):
+        """Test that entries round-trip and other code versions are stale.
+
+        :return: None
+        """
+        ResultCache(self.directory, version="v1").put("k", [SCHEDULE])
+        self.assertEqual(ResultCache(self.directory, version="v1").get("k"), [SCHEDULE])
+        self.assertEqual(ResultCache(self.directory, version="v2").validate(prune=False), (0, 1))
+        newer = ResultCache(self.directory, version="v2")
+        self.assertIsNone(newer.get("k"))
+        self.assertEqual((newer.hits, newer.misses, newer.stale), (0, 1, 1))
+        self.assertEqual(newer.validate(), (0, 0))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entries are evicted first.
+
+        :return: None
+        """
+        cache = ResultCache(self.directory, version="v1")
+        cache.put("a", [SCHEDULE])
+        cache.max_bytes = 2 * os.path.getsize(os.path.join(self.directory, "a.json.gz"))
+        cache.put("b", [SCHEDULE])
+        os.utime(os.path.join(self.directory, "a.json.gz"), ns=(1, 1))
+        os.utime(os.path.join(self.directory, "b.json.gz"), ns=(2, 2))
+        cache.get("a")
+        cache.put("c", [SCHEDULE])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [SCHEDULE])
+        self.assertEqual(cache.get("c"), [SCHEDULE])
+
+    def test_entry_removed_during_lookup_is_a_miss(self):
+        """Test that an entry evicted by another process between reads is a miss.
+
+        :return: None
+        """
+        cache = ResultCache(self.directory, version="v1")
+        cache.put("k", [SCHEDULE])
+        with mock.patch("cache.result_cache.os.utime", side_effect=FileNotFoundError):
+            self.assertIsNone(cache.get("k"))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+    def test_scheduler_hit_rewrites_outputs(self):
+        """Test that a cache hit returns the same schedules and output files.
+
+        :return: None
+        """
+        cache = ResultCache(self.directory)
+        outputs = []
+        for run in range(2):
+            path = os.path.join(self.tmpdir.name, f"run{run}.txt")
+            with redirect_stdout(io.StringIO()):
+                ranked = country_scheduler(
+                    "Atlantis", "data/weights.csv", "data/resources.csv", path, 3, 2, 50, cache=cache
+                )
+            with open(path) as report, open(path.replace(".txt", ".jsonl")) as log:
+                outputs.append((ranked, report.read(), log.read()))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,6 @@
 """Unit tests for reward evaluation functions in schedule_evaluation.py."""
 
 import unittest
-import math
 from evaluations import schedule_evaluation
 from transformations.transformations import TransformTemplate
 
@@ -74,21 +73,23 @@ class TestScheduleEvaluation(unittest.TestCase):
         self.assertLess(schedule_evaluation.logistic(-10), 0.01)
 
     def test_compute_expected_utility(self):
-        country = DummyCountry("Testia", {"Housing": 5, "HousingWaste": 1, "Population": 5})
+        # The Monte Carlo simulator scores states with the real state quality.
+        country = DummyCountry("Testia", {"Housing": 5, "Timber": 4, "Population": 5})
         world = DummyWorld([country])
-        transform = TransformTemplate("Housing", inputs={"Population": 5}, outputs={"Housing": 1})
+        transform = TransformTemplate("Housing", inputs={"Timber": 2}, outputs={"Housing": 1})
         schedule = [(transform, "Testia")]
 
         result = schedule_evaluation.compute_expected_utility(
             schedule=schedule,
             world=world,
             country_name="Testia",
-            weights={},
+            weights={"Housing": 5},
             gamma=0.95,
         )
 
-        expected_logistic = 1 / (1 + math.exp(-4.75))  # expected reward = 5
-        self.assertAlmostEqual(result, expected_logistic, places=2)
+        expected_reward = 0.95 * (6 * 5 / 5 - 5 * 5 / 5)  # yields average 1
+        self.assertAlmostEqual(result, expected_reward, places=2)
+        self.assertEqual(country.resources["Housing"], 5)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+"""Unit tests for the streaming schedule writer and the lazy log reader."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from parsers.schedule_log_parser import iter_schedule_log
+from writers.schedule_writer import ScheduleWriter
+
+ACTIONS = ["(TRANSFORM Atlantis Lumber x1)", "(TRANSFORM Atlantis Alloys x2)"]
+EUS = [10.0, 12.5, 14.0]
+DELTAS = [{"Timber": 10}, {"MetallicAlloys": 6}]
+
+
+class TestScheduleWriter(unittest.TestCase):
+    """Test suite for ScheduleWriter and iter_schedule_log."""
+
+    def setUp(self):
+        """Create a scratch output directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the scratch output directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_writes_text_and_jsonl(self):
+        """Test that each schedule becomes a text block and one JSONL line.
+
+        :return: None
+        """
+        with ScheduleWriter(self._path("out.txt"), self._path("log.jsonl")) as writer:
+            writer.write(ACTIONS, EUS, DELTAS)
+            writer.write(ACTIONS[:1], EUS[:2], DELTAS[:1])
+
+        with open(self._path("out.txt"), encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn("Schedule 1 (Final EU: 14.00):", text)
+        self.assertIn("Step 2: (TRANSFORM Atlantis Alloys x2) EU: 14.00", text)
+
+        with open(self._path("log.jsonl"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        first = json.loads(lines[0])
+        self.assertEqual(first["schedule_num"], 1)
+        self.assertEqual(first["actions"][1], {"action": ACTIONS[1], "eu": 14.0, "delta": DELTAS[1]})
+
+    def test_gzip_round_trip(self):
+        """Test that a ``.gz`` log is compressed and read back lazily.
+
+        :return: None
+        """
+        path = self._path("log.jsonl.gz")
+        with ScheduleWriter(None, path) as writer:
+            for _ in range(3):
+                writer.write(ACTIONS, EUS, DELTAS)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+        records = list(iter_schedule_log(path))
+        self.assertEqual([r["schedule_num"] for r in records], [1, 2, 3])
+
+    def test_reads_partial_and_legacy_logs(self):
+        """Test that a truncated last record is skipped and JSON arrays still load.
+
+        :return: None
+        """
+        partial = self._path("partial.jsonl")
+        with open(partial, "w", encoding="utf-8") as f:
+            f.write('{"schedule_num": 1, "final_eu": 1, "actions": []}\n{"schedule_num": 2, "fin')
+        self.assertEqual([r["schedule_num"] for r in iter_schedule_log(partial)], [1])
+
+        legacy = self._path("legacy.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([{"schedule_num": 1, "final_eu": 1, "actions": []}], f, indent=2)
+        self.assertEqual(len(list(iter_schedule_log(legacy))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
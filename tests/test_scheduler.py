@@ -0,0 +1,93 @@
+"""Integration tests for the best-first country_scheduler."""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from fixtures import sample_scheduler_kwargs
+from parsers.schedule_log_parser import iter_schedule_log
+from scheduler import country_scheduler
+from search.options import SearchOptions
+
+
+class TestCountryScheduler(unittest.TestCase):
+    """Test suite running country_scheduler on the sample data."""
+
+    def setUp(self):
+        """Create a scratch output directory."""
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the scratch output directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def run_scheduler(self, **overrides):
+        """Run the scheduler on the sample data with its output silenced."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return country_scheduler(**sample_scheduler_kwargs(self.tmpdir, **overrides))
+
+    def test_top_schedules_are_ranked(self):
+        """Test that schedules come back best first and match the log.
+
+        :return: None
+        """
+        top = self.run_scheduler()
+        finals = [eus[-1] for _, eus, _ in top]
+        self.assertEqual(len(top), 3)
+        self.assertEqual(finals, sorted(finals, reverse=True))
+
+        records = list(iter_schedule_log(os.path.join(self.tmpdir, "schedule.jsonl")))
+        self.assertEqual([r["final_eu"] for r in records], finals)
+
+    def test_best_matches_wider_search(self):
+        """Test that early termination does not change the best schedules.
+
+        :return: None
+        """
+        top = self.run_scheduler()
+        wider = self.run_scheduler(num_output_schedules=20)
+        self.assertEqual(
+            [eus[-1] for _, eus, _ in top], [eus[-1] for _, eus, _ in wider[:3]]
+        )
+
+    def test_dfs_mode_matches_best_first(self):
+        """Test that the in-place depth-first mode finds the same schedules.
+
+        :return: None
+        """
+        best_first = self.run_scheduler()
+        dfs = self.run_scheduler(options=SearchOptions(search_mode="dfs"))
+        self.assertEqual(
+            [eus[-1] for _, eus, _ in dfs], [eus[-1] for _, eus, _ in best_first]
+        )
+
+    def test_spilling_frontier_matches_in_memory(self):
+        """Test that spilling frontier nodes to disk does not change results.
+
+        :return: None
+        """
+        in_memory = self.run_scheduler(depth_bound=3)
+        spilled = self.run_scheduler(depth_bound=3, options=SearchOptions(frontier_memory=20000))
+        self.assertEqual([actions for actions, _, _ in spilled], [actions for actions, _, _ in in_memory])
+
+    def test_exhausted_time_budget_expands_nothing(self):
+        """Test that a spent time budget stops every search mode at the root.
+
+        :return: None
+        """
+        for search_mode in ("best_first", "dfs", "hda"):
+            self.assertEqual(self.run_scheduler(options=SearchOptions(search_mode=search_mode, time_budget=0)), [])
+
+    def test_unknown_search_mode(self):
+        """Test that an unknown search mode is rejected.
+
+        :return: None
+        """
+        with self.assertRaises(ValueError):
+            self.run_scheduler(options=SearchOptions(search_mode="sideways"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""Unit tests for the local scheduling service and its client."""
+
+import asyncio
+import unittest
+from service.client import ScheduleClient
+from service.server import ScheduleService
+
+
+class TestScheduleService(unittest.IsolatedAsyncioTestCase):
+    """Test suite for ScheduleService over a localhost socket."""
+
+    async def asyncSetUp(self):
+        """Start a thread-backed service on a free port and connect to it."""
+        self.service = ScheduleService(
+            "data/weights.csv", "data/resources.csv", "data/templates.txt", workers=0, batch_window=0.05
+        )
+        host, port = await self.service.start(port=0)
+        self.client = await ScheduleClient.connect(host, port)
+
+    async def asyncTearDown(self):
+        """Disconnect and stop the service."""
+        await self.client.close()
+        await self.service.close()
+
+    async def test_concurrent_requests_share_a_batch(self):
+        """Test that identical concurrent requests are batched and planned once.
+
+        :return: None
+        """
+        replies = await asyncio.gather(*(self.client.schedule("Atlantis", depth_bound=2) for _ in range(4)))
+        self.assertTrue(all(reply["ok"] for reply in replies))
+        self.assertEqual(replies[0]["schedules"], replies[3]["schedules"])
+        self.assertEqual(replies[0]["batched"], 4)
+        self.assertEqual(len(replies[0]["schedules"][0]["actions"]), 2)
+        metrics = await self.client.metrics()
+        self.assertEqual((metrics["requests"], metrics["batches"], metrics["searches"]), (4, 1, 1))
+        self.assertEqual(metrics["max_queue_depth"], 4)
+        self.assertEqual(metrics["response_time"]["count"], 4)
+
+    async def test_updates_create_new_snapshots(self):
+        """Test that updates change later plans without touching the loaded world.
+
+        :return: None
+        """
+        before = await self.client.schedule("Atlantis", depth_bound=1)
+        update = await self.client.request(op="update", country="Atlantis", resources={"Population": 200})
+        self.assertEqual(update["version"], 1)
+        after = await self.client.schedule("Atlantis", depth_bound=1)
+        self.assertEqual((before["version"], after["version"]), (0, 1))
+        self.assertNotEqual(before["schedules"], after["schedules"])
+
+    async def test_errors_are_reported(self):
+        """Test that bad requests get error replies and the service keeps running.
+
+        :return: None
+        """
+        self.assertFalse((await self.client.schedule("Lilliput"))["ok"])
+        self.assertFalse((await self.client.schedule("Atlantis", search_mode="bfs"))["ok"])
+        self.assertFalse((await self.client.request(op="launch"))["ok"])
+        self.assertTrue((await self.client.schedule("Atlantis", depth_bound=1))["ok"])
+        self.assertEqual((await self.client.metrics())["errors"], 3)
+
+    async def test_malformed_values_are_rejected_per_request(self):
+        """Test that bad parameter and resource values fail only their own request.
+
+        :return: None
+        """
+        bad = [
+            self.client.schedule("Atlantis", depth_bound="3"),
+            self.client.schedule("Atlantis", depth_bound=0),
+            self.client.schedule("Atlantis", num_output_schedules=True),
+            self.client.schedule("Atlantis", search_mode="hda"),
+            self.client.schedule("Atlantis", partial_order_reduction="yes"),
+        ]
+        replies = await asyncio.gather(self.client.schedule("Atlantis", depth_bound=1), *bad)
+        self.assertTrue(replies[0]["ok"])
+        self.assertFalse(any(reply["ok"] for reply in replies[1:]))
+        for resources in ({"Population": "200"}, {"Population": -1}, {"Population": float("inf")}):
+            update = await self.client.request(op="update", country="Atlantis", resources=resources)
+            self.assertFalse(update["ok"])
+        self.assertEqual(self.service.version, 0)
+
+
+class TestScheduleServiceWorkers(unittest.IsolatedAsyncioTestCase):
+    """Test suite for a ScheduleService planning in a process pool."""
+
+    async def test_workers_plan_on_the_shared_problem(self):
+        """Test that pool workers attached to shared memory plan like the service thread.
+
+        :return: None
+        """
+        local = ScheduleService("data/weights.csv", "data/resources.csv", "data/templates.txt", workers=0)
+        pooled = ScheduleService("data/weights.csv", "data/resources.csv", "data/templates.txt", workers=1)
+        replies = []
+        for service in (local, pooled):
+            host, port = await service.start(port=0)
+            client = await ScheduleClient.connect(host, port)
+            replies.append(await client.schedule("Atlantis", depth_bound=2))
+            await client.close()
+            await service.close()
+        self.assertTrue(replies[1]["ok"])
+        self.assertEqual(replies[0]["schedules"], replies[1]["schedules"])
+
+
+if __name__ == "__main__":
+    unittest.main()
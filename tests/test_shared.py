@@ -0,0 +1,120 @@
+"""Unit tests for the shared-memory problem layer."""
+
+import unittest
+from evaluations.quality_model import QualityModel
+from models.world_model import Country, World
+from search.mcts import MCTSPlanner, root_parallel_mcts
+from search.ranking import TopKSchedules, score_schedule
+from search.shared import SharedProblem, attach_problem, worker_problem
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+
+class TestSharedProblem(unittest.TestCase):
+    """Test suite for SharedProblem, attach_problem and worker_problem."""
+
+    def setUp(self):
+        """Build a two-country world with int and float amounts."""
+        self.world = World(
+            [
+                Country("Atlantis", {"Population": 10, "Timber": 20.5, "AvailableLand": 5}),
+                Country("Carpania", {"Timber": 3, "Population": 4}),
+            ]
+        )
+        self.library = TemplateLibrary(
+            [
+                TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 10}, {"Population": 2}),
+                TransformTemplate("Housing", {"Timber": 5, "Population": 1}, {"Housing": 1, "Population": 1}),
+            ],
+            scales=(1, 2),
+            digest="abc",
+        )
+        self.weights = {"Timber": 0.5, "AvailableLand": 3, "Housing": 11, "Population": 6}
+
+    def test_round_trip_keeps_order_and_types(self):
+        """Test that attached problems rebuild equal dictionaries, in key order and type.
+
+        :return: None
+        """
+        with SharedProblem(self.world, self.weights, self.library) as shared:
+            attached = attach_problem(shared.handle)
+            world, weights, library = attached.world(), attached.weights(), attached.library()
+            need, delta = attached.arrays["need"], attached.arrays["delta"]
+            self.assertEqual(need.shape, (4, len(shared.handle.resources)))
+            self.assertFalse(need.flags.writeable)
+            housing = shared.handle.resources.index("Housing")
+            self.assertEqual(delta[3, housing], 2)
+            del need, delta
+            attached.close()
+
+        for original, rebuilt in zip(self.world.all_countries(), world.all_countries()):
+            self.assertEqual(original.name, rebuilt.name)
+            self.assertEqual(list(original.resources.items()), list(rebuilt.resources.items()))
+            self.assertEqual(
+                [type(v) for v in original.resources.values()], [type(v) for v in rebuilt.resources.values()]
+            )
+        self.assertEqual(list(weights.items()), list(self.weights.items()))
+        self.assertEqual((library.scales, library.digest), (self.library.scales, self.library.digest))
+        for original, rebuilt in zip(self.library.variants, library.variants):
+            for section in ("inputs", "outputs", "required"):
+                self.assertEqual(
+                    list(getattr(original.transform, section).items()),
+                    list(getattr(rebuilt.transform, section).items()),
+                )
+
+    def test_quality_model_round_trip(self):
+        """Test that a quality model passed as the weights is rebuilt in workers.
+
+        :return: None
+        """
+        model = QualityModel(self.weights, [{"resource": "Housing", "curve": "log", "scale": 2}])
+        with SharedProblem(self.world, model, self.library) as shared:
+            attached = attach_problem(shared.handle)
+            rebuilt = attached.weights()
+            attached.close()
+        self.assertIsInstance(rebuilt, QualityModel)
+        self.assertEqual((dict(rebuilt), rebuilt.spec), (dict(model), model.spec))
+
+    def test_close_unlinks_the_block(self):
+        """Test that workers cannot attach once the owner has closed the problem.
+
+        :return: None
+        """
+        shared = SharedProblem(self.world, self.weights, self.library)
+        handle = shared.handle
+        shared.close()
+        shared.close()
+        with self.assertRaises(FileNotFoundError):
+            attach_problem(handle)
+
+    def test_worker_problem_attaches_once(self):
+        """Test that repeated lookups in one process reuse the rebuilt objects.
+
+        :return: None
+        """
+        with SharedProblem(self.world, self.weights, self.library) as shared:
+            first = worker_problem(shared.handle)
+            second = worker_problem(shared.handle)
+        self.assertIs(first[0], second[0])
+        self.assertIs(first[2], second[2])
+
+    def test_parallel_mcts_matches_in_process_trees(self):
+        """Test that workers planning on the shared problem find what local trees find.
+
+        :return: None
+        """
+        ranked, _, iterations = root_parallel_mcts(
+            self.world, "Atlantis", self.library, self.weights, 3, 4, iterations=120, workers=2, seed=3
+        )
+        merged, seen = TopKSchedules(4), set()
+        for seed in (3, 4):
+            planner = MCTSPlanner(self.world, "Atlantis", self.library, self.weights, 3, 4, seed=seed)
+            for schedule in planner.run(iterations=60):
+                if tuple(schedule[0]) not in seen:
+                    seen.add(tuple(schedule[0]))
+                    merged.offer(score_schedule(schedule[0], schedule[1]), schedule)
+        self.assertEqual(iterations, 120)
+        self.assertEqual(ranked, merged.ranked())
+
+
+if __name__ == "__main__":
+    unittest.main()
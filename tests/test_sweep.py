@@ -0,0 +1,60 @@
+"""Tests for re-scoring a recorded search tree under many weight sets."""
+
+import unittest
+
+from scheduler import load_problem, plan_schedules
+from search.options import SearchOptions
+from search.ranking import score_schedule
+from search.sweep import record_sweep_tree
+
+
+class TestWeightSweep(unittest.TestCase):
+    """Test suite comparing sweeps against full searches on the sample data."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the sample problem and record its depth-2 tree once."""
+        cls.world, cls.weights, cls.library = load_problem(
+            "data/weights.csv", "data/resources.csv", "data/templates.txt"
+        )
+        cls.tree = record_sweep_tree(cls.world, "Atlantis", cls.library, cls.weights, 2)
+
+    def search_scores(self, weights):
+        ranked = plan_schedules(self.world, weights, self.library, "Atlantis", SearchOptions(5, 2, 10**6, "dfs"))
+        return [score_schedule(actions, eus) for actions, eus, _ in ranked]
+
+    def test_matches_full_searches(self):
+        """Test that every weight set ranks like a search run with it.
+
+        Raising TRANSFER costs (Timber, energy) and changing other weights
+        must both be handled, since the tree was recorded at base weights.
+
+        :return: None
+        """
+        weight_sets = [
+            self.weights,
+            dict(self.weights, Housing=22),
+            dict(self.weights, Timber=1.5),
+            dict(self.weights, PotentialEnergyUsable=12, Food=10),
+        ]
+        for weights, top in zip(weight_sets, self.tree.top_schedules(weight_sets, 5)):
+            expected = self.search_scores(weights)
+            self.assertEqual(len(top), len(expected))
+            for (_, score), search_score in zip(top, expected):
+                self.assertAlmostEqual(score, search_score)
+
+    def test_unaffordable_transfers_are_dropped(self):
+        """Test that schedules whose TRANSFER costs exceed the energy are dropped.
+
+        :return: None
+        """
+        expensive = dict(self.weights, Timber=1000, Food=1000, Water=1000)
+        scores = self.tree.scores([self.weights, expensive])
+        for actions, (base, costly) in zip(self.tree.actions, scores):
+            self.assertNotEqual(base, float("-inf"))
+            if any("TRANSFER Atlantis" in action and "Timber" in action for action in actions):
+                self.assertEqual(costly, float("-inf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Unit tests for TRANSFORM template parsing in template_parser.py."""
+
+import os
+import tempfile
+import unittest
+from parsers.template_parser import (
+    clear_template_cache,
+    load_template_library,
+    parse_transform_templates,
+    parse_transform_templates_text,
+)
+
+TEMPLATE_TEXT = """
+; comment line
+(TRANSFORM Housing
+    (INPUTS (Timber 4) (Water 3))
+    (OUTPUTS (Housing 3) (HousingWaste 2))
+    (REQUIRED (Population 5)))
+
+(TRANSFORM HydroPower
+    (OUTPUTS (PotentialEnergyUsable 1) (AvailableLand -0.2))
+    (REQUIRED (Dam 1)))
+"""
+
+
+class TestTemplateParser(unittest.TestCase):
+    """Test suite for parsing and compiling TRANSFORM templates."""
+
+    def setUp(self):
+        """Write the sample templates to a temporary file."""
+        clear_template_cache()
+        handle, self.path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            f.write(TEMPLATE_TEXT)
+
+    def tearDown(self):
+        """Remove the temporary template file."""
+        os.remove(self.path)
+        clear_template_cache()
+
+    def test_parse_templates(self):
+        """Test that sections and amounts are parsed in file order.
+
+        :return: None
+        """
+        templates = parse_transform_templates(self.path)
+        self.assertEqual([t.name for t in templates], ["Housing", "HydroPower"])
+        self.assertEqual(templates[0].inputs, {"Timber": 4, "Water": 3})
+        self.assertEqual(templates[0].required, {"Population": 5})
+        self.assertEqual(templates[1].inputs, {})
+        self.assertEqual(templates[1].outputs, {"PotentialEnergyUsable": 1, "AvailableLand": -0.2})
+
+    def test_validation_errors(self):
+        """Test that malformed or invalid templates are rejected.
+
+        :return: None
+        """
+        invalid = [
+            "(TRANSFORM Housing (OUTPUTS (Housing 1))",
+            "(TRANSFORM Housing (INPUTS (Timber 1)))",
+            "(TRANSFORM Housing (OUTPUTS (Housing x)))",
+            "(TRANSFORM Housing (INPUTS (Timber -1)) (OUTPUTS (Housing 1)))",
+            "(TRANSFORM Housing (OUTPUTS (Housing 1) (Housing 2)))",
+            "(TRANSFORM Housing (EXTRAS (Housing 1)) (OUTPUTS (Housing 1)))",
+            "(TRANSFORM A (OUTPUTS (Housing 1))) (TRANSFORM A (OUTPUTS (Food 1)))",
+            "(TRANSFER A B)",
+        ]
+        for text in invalid:
+            with self.assertRaises(ValueError, msg=text):
+                parse_transform_templates_text(text)
+
+    def test_library_compiles_scaled_variants(self):
+        """Test that the compiled library precomputes scaled index vectors.
+
+        :return: None
+        """
+        library = load_template_library(self.path, scales=(1, 3))
+        self.assertEqual(len(library.variants), 4)
+        housing_x3 = library.scaled("Housing", 3)
+        self.assertEqual(housing_x3.inputs, {"Timber": 12, "Water": 9})
+        variant = library.variants[1]
+        self.assertEqual(variant.factor, 3)
+        self.assertEqual(
+            [library.resources[i] for i in variant.input_index], ["Timber", "Water"]
+        )
+        self.assertEqual(variant.input_amounts, (12, 9))
+
+    def test_incremental_feasibility_mask(self):
+        """Test that only templates reading a changed resource are rechecked.
+
+        :return: None
+        """
+        library = load_template_library(self.path, scales=(1, 3))
+        self.assertEqual(library.dependents["Population"], 0b0011)
+        self.assertEqual(library.dependents["Dam"], 0b1100)
+        resources = {"Timber": 4, "Water": 3, "Population": 5}
+        mask = library.feasible_mask(resources)
+        self.assertEqual(mask, 0b0001)
+        resources["Dam"] = 1
+        mask = library.update_feasible_mask(mask, resources, ["Dam"])
+        self.assertEqual(mask, 0b0101)
+        resources["Timber"] = 0
+        self.assertEqual(library.update_feasible_mask(mask, resources, ["Timber"]), 0b0100)
+        # Unreported changes are not rechecked.
+        self.assertEqual(library.update_feasible_mask(mask, resources, []), mask)
+
+    def test_shifted_feasibility_mask(self):
+        """Test that a known shift rechecks only variants it can flip.
+
+        :return: None
+        """
+        library = load_template_library(self.path, scales=(1, 3))
+        resources = {"Timber": 4, "Water": 3, "Population": 5, "Dam": 1}
+        mask = library.feasible_mask(resources)
+        self.assertEqual(mask, 0b0101)
+        resources["Timber"] = 12
+        resources["Water"] = 9
+        resources["Population"] = 15
+        resources["Dam"] = 0
+        shift = {"Timber": 8, "Water": 6, "Population": 10, "Dam": -1}
+        shifted = library.shift_feasible_mask(mask, resources, shift)
+        self.assertEqual(shifted, 0b0011)
+        self.assertEqual(shifted, library.feasible_mask(resources))
+        self.assertEqual(library.shift_feasible_mask(mask, resources, {}), mask)
+
+    def test_library_cached_by_file_hash(self):
+        """Test that unchanged files share one library and edits invalidate it.
+
+        :return: None
+        """
+        first = load_template_library(self.path)
+        self.assertIs(load_template_library(self.path), first)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("(TRANSFORM Farm (OUTPUTS (Food 6)))\n")
+        second = load_template_library(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second), 3)
+
+    def test_shipped_templates(self):
+        """Test that the repository's template file parses cleanly.
+
+        :return: None
+        """
+        templates = parse_transform_templates("data/templates.txt")
+        self.assertEqual(len(templates), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Unit tests for the binary search trace recorder and analyzer."""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from fixtures import sample_scheduler_kwargs
+from scheduler import country_scheduler
+from search.hooks import SearchCounters
+from search.options import SearchOptions
+from search.ranking import score_schedule
+from search.trace import RECORD, _split_macro, analyze_trace, format_trace_report, read_trace
+
+
+class TestSearchTrace(unittest.TestCase):
+    """Test suite tracing searches on the sample data."""
+
+    def setUp(self):
+        """Create a scratch output directory."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.trace = os.path.join(self.tmpdir, "search.trace")
+
+    def tearDown(self):
+        """Remove the scratch output directory."""
+        shutil.rmtree(self.tmpdir)
+
+    def run_scheduler(self, **overrides):
+        """Run the traced scheduler on the sample data."""
+        counters = SearchCounters()
+        kwargs = sample_scheduler_kwargs(
+            self.tmpdir, depth_bound=3, frontier_max_size=50, hooks=[counters], trace_filename=self.trace
+        )
+        kwargs.update(overrides)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return country_scheduler(**kwargs), counters
+
+    def test_summary_matches_search(self):
+        """Test that traced events and lineage agree with the search itself.
+
+        :return: None
+        """
+        for search_mode in ("best_first", "dfs"):
+            ranked, counters = self.run_scheduler(options=SearchOptions(search_mode=search_mode))
+            summary = analyze_trace(self.trace)
+            for event in ("expand", "successor", "push", "prune", "complete", "evict"):
+                self.assertEqual(summary["counts"].get(event, 0), counters.counts[event])
+            self.assertEqual(
+                sum(level["nodes"] for level in summary["branching"].values()), counters.counts["expand"]
+            )
+            self.assertEqual(set(summary["phases"]), {"load", "search", "finish", "generate_children"})
+            self.assertEqual(len(summary["lineage"]), len(ranked))
+            for (actions, eus, _), lineage in zip(ranked, summary["lineage"]):
+                self.assertEqual([step["action"] for step in lineage["steps"]], actions)
+                self.assertAlmostEqual(lineage["score"], score_schedule(actions, eus))
+                self.assertAlmostEqual(lineage["steps"][-1]["score"], score_schedule(actions, eus))
+                self.assertEqual(lineage["steps"][0]["parent_expansion"], 0)
+            self.assertIn("schedule 1", format_trace_report(summary))
+
+    def test_records_are_fixed_width(self):
+        """Test that the file holds whole records between header and trailer.
+
+        :return: None
+        """
+        self.run_scheduler()
+        strings, records = read_trace(self.trace)
+        records = list(records)
+        self.assertTrue(all(len(record) == 8 for record in records))
+        self.assertIn("search", strings)
+        self.assertLess(len(records) * RECORD.size, os.path.getsize(self.trace))
+
+    def test_incomplete_trace_is_rejected(self):
+        """Test that a truncated trace raises ValueError.
+
+        :return: None
+        """
+        self.run_scheduler()
+        with open(self.trace, "rb") as f:
+            data = f.read()
+        with open(self.trace, "wb") as f:
+            f.write(data[:-5])
+        with self.assertRaises(ValueError):
+            read_trace(self.trace)
+
+    def test_split_macro(self):
+        """Test that macro children are keyed by their primitive steps.
+
+        :return: None
+        """
+        macro = "(MACRO (TRANSFORM A Lumber x1) (TRANSFER B A ((Timber 1) (Food 2))))"
+        self.assertEqual(
+            _split_macro(macro), ("(TRANSFORM A Lumber x1)", "(TRANSFER B A ((Timber 1) (Food 2)))")
+        )
+        self.assertEqual(_split_macro("(TRANSFORM A Lumber x1)"), ("(TRANSFORM A Lumber x1)",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Unit tests for the surplus/deficit index and TRANSFER bundles."""
+
+import unittest
+from models.world_model import Country, World
+from transformations.transformations import (
+    TemplateLibrary,
+    TransformTemplate,
+    action_from_string,
+    iter_actions,
+    trade_bundles,
+    trade_index,
+    transfer_items,
+)
+
+WEIGHTS = {"Timber": 0.5, "Water": 2, "Food": 2, "PotentialEnergyUsable": 10, "Housing": 11}
+
+
+class TestTradeBundles(unittest.TestCase):
+    """Test suite for bundled TRANSFER generation."""
+
+    def setUp(self):
+        """Build a library reading Timber, Water, Population and MetallicElements."""
+        self.library = TemplateLibrary(
+            [
+                TransformTemplate("Housing", {"Timber": 4, "Water": 3}, {"Housing": 1}, {"Population": 5}),
+                TransformTemplate("Electronics", {"MetallicElements": 2}, {"Electronics": 1}),
+            ],
+            scales=(1,),
+        )
+        self.sender = {"Timber": 10, "Water": 4, "Food": 5, "MetallicElements": 2, "PotentialEnergyUsable": 100}
+        self.receiver = {"Timber": 1, "Population": 10}
+
+    def bundles(self):
+        """Return the bundle strings from the sender to the receiver."""
+        surplus, _ = trade_index(self.sender, self.library)
+        _, deficit = trade_index(self.receiver, self.library)
+        actions = trade_bundles("Carpania", self.sender, surplus, "Atlantis", deficit, WEIGHTS)
+        return [action.action_str for action in actions]
+
+    def test_index_follows_template_demand(self):
+        """Test that surplus is held beyond demand and deficit is the shortfall.
+
+        :return: None
+        """
+        self.assertEqual(self.library.demand, {"Timber": 4, "Water": 3, "Population": 5, "MetallicElements": 2})
+        surplus, _ = trade_index(self.sender, self.library)
+        self.assertEqual(surplus, {"Timber": 6, "Water": 1, "Food": 5, "PotentialEnergyUsable": 100})
+        _, deficit = trade_index(self.receiver, self.library)
+        self.assertEqual(deficit, {"Timber": 3, "Water": 3, "MetallicElements": 2})
+
+    def test_bundles_rank_deficits_and_fit_energy(self):
+        """Test that lacking resources come first and energy sizes the bundles.
+
+        :return: None
+        """
+        self.assertEqual(
+            self.bundles(),
+            [
+                "(TRANSFER Carpania Atlantis ((Water 1)))",
+                "(TRANSFER Carpania Atlantis ((Timber 3) (Water 1)))",
+                "(TRANSFER Carpania Atlantis ((Food 3) (Timber 3) (Water 1)))",
+            ],
+        )
+        self.sender["PotentialEnergyUsable"] = 20
+        self.assertEqual(self.bundles(), ["(TRANSFER Carpania Atlantis ((Water 1)))"])
+
+    def test_bundle_round_trip(self):
+        """Test that a bundle parses back to the same changes and preconditions.
+
+        :return: None
+        """
+        world = World([Country("Atlantis", self.receiver), Country("Carpania", self.sender)])
+        transfers = [action for action in iter_actions(world, "Atlantis", self.library, WEIGHTS) if action.is_transfer]
+        self.assertEqual([action.action_str for action in transfers], self.bundles())
+        largest = transfers[-1]
+        self.assertEqual(action_from_string(largest.action_str, self.library, WEIGHTS), largest)
+        self.assertEqual(transfer_items(largest), [("Food", 3), ("Timber", 3), ("Water", 1)])
+        self.assertIn(("Carpania", "PotentialEnergyUsable", 95.0), largest.preconditions)
+
+
+if __name__ == "__main__":
+    unittest.main()
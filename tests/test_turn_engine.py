@@ -0,0 +1,130 @@
+"""Unit tests for the multi-agent turn engine."""
+
+import unittest
+import numpy as np
+from fixtures import chain_problem
+from models.world_model import Country, World
+from simulation.turn_engine import TurnEngine
+from transformations.transformations import TemplateLibrary, TransformTemplate
+
+
+class TestTurnEngine(unittest.TestCase):
+    """Test suite for TurnEngine and TurnHistory."""
+
+    def setUp(self):
+        """Build a three-country world with two simple transforms."""
+        self.world = World(
+            [
+                Country("Atlantis", {"Population": 10, "AvailableLand": 3, "Timber": 0, "PotentialEnergyUsable": 100}),
+                Country("Brobdingnag", {"Population": 10, "AvailableLand": 0, "Timber": 30, "PotentialEnergyUsable": 100}),
+                Country("Carpania", {"Population": 5, "AvailableLand": 1, "Timber": 0, "PotentialEnergyUsable": 0}),
+            ]
+        )
+        self.library, self.weights = chain_problem()
+
+    def test_greedy_turn_matches_world_semantics(self):
+        """Test one greedy turn: batched TRANSFORMs and granted TRANSFERs.
+
+        :return: None
+        """
+        engine = TurnEngine(self.world, self.library, self.weights)
+        history = engine.run(1)
+        self.assertEqual(
+            history.actions_at(1),
+            [
+                "(TRANSFORM Atlantis Lumber x1)",
+                "(TRANSFORM Brobdingnag Housing x1)",
+                "(TRANSFORM Carpania Lumber x1)",
+                "(TRANSFER Brobdingnag Atlantis ((Timber 3)))",
+                "(TRANSFER Brobdingnag Carpania ((Timber 3)))",
+            ],
+        )
+        world = engine.to_world()
+        self.assertEqual(world.get_country("Atlantis").resources["Timber"], 8)
+        self.assertEqual(world.get_country("Brobdingnag").resources["Timber"], 19)
+        self.assertEqual(world.get_country("Brobdingnag").resources["PotentialEnergyUsable"], 70)
+        self.assertEqual(world.get_country("Brobdingnag").resources["Housing"], 1)
+        self.assertEqual(self.world.get_country("Atlantis").resources["Timber"], 0)
+
+    def test_conflicting_transfers_resolve_in_fixed_order(self):
+        """Test that a sender short of energy grants requests in receiver order.
+
+        :return: None
+        """
+        self.world.get_country("Brobdingnag").resources["PotentialEnergyUsable"] = 20
+        engine = TurnEngine(self.world, self.library, self.weights)
+        transfers = [action for action in engine.run(1).actions_at(1) if action.startswith("(TRANSFER")]
+        # Energy for one TRANSFER only: Atlantis comes before Carpania.
+        self.assertEqual(transfers, ["(TRANSFER Brobdingnag Atlantis ((Timber 3)))"])
+        self.assertEqual(engine.to_world().get_country("Carpania").resources["Timber"], 5)
+
+    def test_history_rebuilds_every_turn(self):
+        """Test that delta-encoded snapshots rebuild states and series exactly.
+
+        :return: None
+        """
+        engine = TurnEngine(self.world, self.library, self.weights, policy="random", seed=3)
+        states = [engine.state.copy()]
+        for _ in range(20):
+            engine.step()
+            states.append(engine.state.copy())
+        history = engine.history
+        for turn, state in enumerate(states):
+            np.testing.assert_array_equal(history.state_at(turn), state)
+        timber = engine.resources.index("Timber")
+        np.testing.assert_array_equal(history.series("Carpania", "Timber"), [s[2, timber] for s in states])
+        self.assertEqual(len(history.quality), 21)
+        with self.assertRaises(ValueError):
+            history.state_at(21)
+
+    def test_seeded_runs_are_reproducible(self):
+        """Test that the random policy is deterministic for a given seed.
+
+        :return: None
+        """
+        first = TurnEngine(self.world, self.library, self.weights, policy="random", seed=5).run(30)
+        second = TurnEngine(self.world, self.library, self.weights, policy="random", seed=5).run(30)
+        for name in ("turn", "country", "resource", "value"):
+            np.testing.assert_array_equal(first.columns()[name], second.columns()[name])
+        with self.assertRaises(ValueError):
+            TurnEngine(self.world, self.library, self.weights, policy="lazy")
+
+    def test_fixed_point_matches_float(self):
+        """Test that int64 fixed-point runs reproduce float runs exactly.
+
+        :return: None
+        """
+        library = TemplateLibrary(
+            [
+                TransformTemplate("Lumber", {"AvailableLand": 1}, {"Timber": 5, "TimberWaste": 0.5}),
+                TransformTemplate("Housing", {"Timber": 5}, {"Housing": 1}),
+            ],
+            scales=(1,),
+        )
+        exact = TurnEngine(self.world, library, self.weights, policy="random", seed=2, fixed_point=1000)
+        approx = TurnEngine(self.world, library, self.weights, policy="random", seed=2)
+        self.assertEqual(exact.state.dtype, np.int64)
+        exact.run(25)
+        approx.run(25)
+        for turn in range(1, 26):
+            self.assertEqual(exact.history.actions_at(turn), approx.history.actions_at(turn))
+        for exact_country, approx_country in zip(exact.to_world().all_countries(), approx.to_world().all_countries()):
+            self.assertEqual(exact_country.resources, approx_country.resources)
+        self.assertEqual(exact.history.scale, 1000)
+
+    def test_fixed_point_state_keys_and_precision(self):
+        """Test exact state keys and the rejection of unrepresentable amounts.
+
+        :return: None
+        """
+        first = TurnEngine(self.world, self.library, self.weights, fixed_point=1000)
+        second = TurnEngine(self.world, self.library, self.weights, fixed_point=1000)
+        self.assertEqual(first.state_key(), second.state_key())
+        first.step()
+        self.assertNotEqual(first.state_key(), second.state_key())
+        with self.assertRaises(ValueError):
+            TurnEngine(self.world, self.library, dict(self.weights, Timber=0.55), fixed_point=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -119,6 +119,20 @@ class TestWorld(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.world.transfer_resources("X", "B", [("Gold", 10)])
 
+    def test_apply_and_undo_changes(self):
+        """Test that in-place changes are reverted exactly, including new
+        resources.
+
+        :return: None
+        """
+        undo = self.world.apply_changes([("A", "Gold", -10), ("B", "Gold", 10), ("B", "Oil", 3)])
+        self.assertEqual(self.country_a.get_resource("Gold"), 40)
+        self.assertEqual(self.country_b.get_resource("Oil"), 3)
+        self.assertEqual(self.world.undo_delta(undo, "B"), {"Gold": 10, "Oil": 3})
+        self.world.undo_changes(undo)
+        self.assertEqual(self.country_a.resources, {"Gold": 50, "Food": 20})
+        self.assertEqual(self.country_b.resources, {"Gold": 10, "Food": 5})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,10 +1,44 @@
 """Defines the TransformTemplate class used for modeling scalable resource
 transformations."""
 
-from typing import List, Tuple
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
 from models.world_model import World
 from typing import Optional
-from evaluations.state_quality import compute_state_quality
+from evaluations.state_quality import compute_state_quality, is_quality_model
+
+DEFAULT_SCALES = (1, 2, 3)
+
+# Energy cost of a transfer is weight x amount x this factor, paid by the sender.
+TRANSFER_PENALTY_FACTOR = 10
+
+# Largest amount of any one resource offered in one TRANSFER successor.
+MAX_TRANSFER_AMOUNT = 3
+
+# Most resources bundled into one TRANSFER; bundles of 1 to this many
+# resources are offered to each partner.
+MAX_BUNDLE_RESOURCES = 3
+
+# Define only valid resources for transfer
+VALID_TRANSFERABLES = frozenset({
+    # Core natural and industrial resources
+    "Water",
+    "Food",
+    "Timber",
+    "MetallicElements",
+    "MetallicAlloys",
+    "Electronics",
+    "PotentialEnergyUsable",
+
+    # Strategic and economic resources
+    "AvailableLand",
+    "ConstructionMaterials",
+    "Education",
+
+    # Optional but plausible
+    "SkilledLabor",
+})
 
 
 class TransformTemplate:
@@ -59,120 +93,549 @@ class TransformTemplate:
         """Return a string representation of the TransformTemplate."""
         return f"<TransformTemplate name={self.name}, required={self.required}>"
 
-def generate_successors(world: World, self_country: str, transform_templates: List[TransformTemplate], resource_weights: dict) -> List[Tuple[str, World, dict, float]]:
-    successors = []
-    self_country_obj = world.get_country(self_country)
-    TRANSFER_PENALTY_FACTOR = 10
-    def compute_resource_delta(old: dict, new: dict) -> dict:
-        return {
-            key: new.get(key, 0) - old.get(key, 0)
-            for key in set(old) | set(new)
-            if new.get(key, 0) != old.get(key, 0)
-        }
-    # Generate TRANSFORM successors
-    for template in transform_templates:
-        for scale_factor in range(1, 4):
-            scaled = template.scale(scale_factor)
-            if template.name == "Birth":
-                print(f"🟡 Considering Birth x{scale_factor}")
-                has_inputs = self_country_obj.has_resources(scaled.inputs)
-                has_required = self_country_obj.has_resources(scaled.required)
-                print(f"    Inputs available: {has_inputs}")
-                print(f"    Required available: {has_required}")
-                if not has_inputs or not has_required:
-                    print(f"❌ Birth x{scale_factor} is NOT feasible.")
-                else:
-                    print(f"✅ Birth x{scale_factor} is feasible!")
-
-            if (
-                self_country_obj.has_resources(scaled.inputs)
-                and self_country_obj.has_resources(scaled.required)
-            ):
-                new_world = world.clone()
-                new_self = new_world.get_country(self_country)
-                before = dict(new_self.resources)
-                new_self.apply_transform(scaled.inputs, scaled.outputs)
-                after = new_self.resources
-                delta = compute_resource_delta(before, after)
-                delta_score = sum(resource_weights.get(res, 0) * delta.get(res, 0) for res in delta)
-
-                action_str = f"(TRANSFORM {self_country} {template.name} x{scale_factor})"
-                successors.append((action_str, new_world, delta, delta_score))
-
-                if template.name == "Birth":
-                    print(f"🔥 Birth delta: {delta}, utility gain: {delta_score}")
-
-
-    # Define only valid resources for transfer
-    valid_transferables = {
-        # Core natural and industrial resources
-        "Water",
-        "Food",
-        "Timber",
-        "MetallicElements",
-        "MetallicAlloys",
-        "Electronics",
-        "PotentialEnergyUsable",
-
-        # Strategic and economic resources
-        "AvailableLand",
-        "ConstructionMaterials",
-        "Education",
-
-        # Optional but plausible
-        "SkilledLabor",
-    }
 
+@dataclass(frozen=True)
+class TemplateVariant:
+    """A TransformTemplate pre-scaled by one factor, with its resources
+    resolved to indices of the owning TemplateLibrary.
+
+    :ivar name: Name of the base template.
+    :ivar factor: Scale factor applied to the base template.
+    :ivar transform: The scaled TransformTemplate.
+    :ivar input_index: Resource indices of the scaled inputs.
+    :ivar input_amounts: Amounts matching ``input_index``.
+    :ivar output_index: Resource indices of the scaled outputs.
+    :ivar output_amounts: Amounts matching ``output_index``.
+    :ivar required_index: Resource indices of the scaled requirements.
+    :ivar required_amounts: Amounts matching ``required_index``.
+    """
 
-   # Generate TRANSFER successors in both directions
-    for other_country_obj in world.all_countries():
-        other_country = other_country_obj.name
-        if other_country == self_country:
-            continue
+    name: str
+    factor: int
+    transform: TransformTemplate
+    input_index: Tuple[int, ...]
+    input_amounts: Tuple[float, ...]
+    output_index: Tuple[int, ...]
+    output_amounts: Tuple[float, ...]
+    required_index: Tuple[int, ...]
+    required_amounts: Tuple[float, ...]
+
+
+class TemplateLibrary:
+    """A compiled set of TransformTemplates shared by every planner.
+
+    Scaled variants are built once, in template order and then scale order,
+    so successor generation never calls :meth:`TransformTemplate.scale` on
+    the hot path.
+
+    :ivar templates: The base templates, in file order.
+    :ivar scales: The scale factors each template is compiled for.
+    :ivar digest: Hash of the source file, or None for in-memory libraries.
+    :ivar resources: Sorted names of every resource any template touches.
+    :ivar resource_index: Mapping from resource name to its index.
+    :ivar variants: One TemplateVariant per (template, scale) pair.
+    :ivar dependents: Mapping from resource name to a bitmask of the
+        variants (bit ``i`` for ``variants[i]``) whose inputs or required
+        resources read it.
+    :ivar demand: Mapping from resource name to the most any variant reads
+        of it (as input or required); holdings beyond it are surplus.
+    """
+
+    def __init__(
+        self,
+        templates: Iterable[TransformTemplate],
+        scales: Iterable[int] = DEFAULT_SCALES,
+        digest: Optional[str] = None,
+    ):
+        """Compile the given templates.
+
+        :param templates: Base TransformTemplate objects.
+        :param scales: Scale factors to precompute for every template.
+        :param digest: Optional hash identifying the template source.
+        """
+        self.templates = list(templates)
+        self.scales = tuple(scales)
+        self.digest = digest
+        self.resources = tuple(
+            sorted(
+                {
+                    res
+                    for template in self.templates
+                    for section in (template.inputs, template.outputs, template.required)
+                    for res in section
+                }
+            )
+        )
+        self.resource_index: Dict[str, int] = {res: i for i, res in enumerate(self.resources)}
+        self.variants = [
+            self._compile(template, factor) for template in self.templates for factor in self.scales
+        ]
+        self._by_key = {(v.name, v.factor): v for v in self.variants}
+        self._needs = [
+            tuple(v.transform.inputs.items()) + tuple(v.transform.required.items()) for v in self.variants
+        ]
+        self.dependents: Dict[str, int] = {}
+        self.demand: Dict[str, float] = {}
+        for i, needs in enumerate(self._needs):
+            for res, amt in needs:
+                self.dependents[res] = self.dependents.get(res, 0) | (1 << i)
+                self.demand[res] = max(self.demand.get(res, 0), amt)
+
+    def _check(self, resources: dict, candidates: int, mask: int) -> int:
+        """Set in ``mask`` the bit of every candidate variant feasible in ``resources``."""
+        while candidates:
+            low = candidates & -candidates
+            candidates ^= low
+            if all(resources.get(res, 0) >= amt for res, amt in self._needs[low.bit_length() - 1]):
+                mask |= low
+        return mask
+
+    def feasible_mask(self, resources: dict) -> int:
+        """Check every variant against ``resources``.
+
+        :param resources: A country's resources.
+        :return: Bitmask with bit ``i`` set if ``variants[i]`` is feasible.
+        """
+        return self._check(resources, (1 << len(self.variants)) - 1, 0)
+
+    def update_feasible_mask(self, mask: int, resources: dict, changed: Iterable[str]) -> int:
+        """Update a parent's feasibility bitmask after some resources changed.
+
+        Only the variants that read a changed resource are rechecked, so the
+        cost follows the size of the change, not the size of the library.
+
+        :param mask: The bitmask from :meth:`feasible_mask` for the parent state.
+        :param resources: The country's resources in the new state.
+        :param changed: Names of the resources whose amounts changed.
+        :return: The bitmask for the new state.
+        """
+        stale = 0
+        for res in changed:
+            stale |= self.dependents.get(res, 0)
+        return self._check(resources, stale, mask & ~stale)
+
+    def shift_feasible_mask(self, mask: int, resources: dict, shift: dict) -> int:
+        """Update a bitmask after resources moved by known amounts.
+
+        A rise can only make a variant feasible and a fall only infeasible,
+        so just the infeasible readers of risen resources and the feasible
+        readers of fallen ones are rechecked.
+
+        :param mask: The bitmask for the state before the shift.
+        :param resources: The country's resources after the shift.
+        :param shift: Net change per resource.
+        :return: The bitmask for the shifted state.
+        """
+        risen = fallen = 0
+        for res, amount in shift.items():
+            if amount > 0:
+                risen |= self.dependents.get(res, 0)
+            elif amount < 0:
+                fallen |= self.dependents.get(res, 0)
+        stale = (risen & ~mask) | (fallen & mask)
+        return self._check(resources, stale, mask & ~stale)
+
+    def _compile(self, template: TransformTemplate, factor: int) -> TemplateVariant:
+        """Scale one template and resolve its resources to indices."""
+        scaled = template.scale(factor)
+        index = self.resource_index
+        return TemplateVariant(
+            name=template.name,
+            factor=factor,
+            transform=scaled,
+            input_index=tuple(index[r] for r in scaled.inputs),
+            input_amounts=tuple(scaled.inputs.values()),
+            output_index=tuple(index[r] for r in scaled.outputs),
+            output_amounts=tuple(scaled.outputs.values()),
+            required_index=tuple(index[r] for r in scaled.required),
+            required_amounts=tuple(scaled.required.values()),
+        )
+
+    def scaled(self, name: str, factor: int) -> TransformTemplate:
+        """Return the template ``name`` scaled by ``factor``.
+
+        :param name: Name of a base template in this library.
+        :param factor: Scale factor.
+        :return: The precompiled scaled template, or a freshly scaled one
+            when ``factor`` is not one of the compiled scales.
+        :raises KeyError: If no template with that name exists.
+        """
+        variant = self._by_key.get((name, factor))
+        if variant is not None:
+            return variant.transform
+        for template in self.templates:
+            if template.name == name:
+                return template.scale(factor)
+        raise KeyError(name)
+
+    def __iter__(self):
+        """Iterate over the base templates."""
+        return iter(self.templates)
+
+    def __len__(self):
+        """Return the number of base templates."""
+        return len(self.templates)
 
-        for sender_name, receiver_name in [(self_country, other_country), (other_country, self_country)]:
-            sender_obj = world.get_country(sender_name)
-            receiver_obj = world.get_country(receiver_name)
 
-            for resource, amount in sender_obj.resources.items():
-                if resource not in valid_transferables or amount <= 0:
-                    continue
+def as_library(transform_templates, scales: Optional[Iterable[int]] = None) -> TemplateLibrary:
+    """Return ``transform_templates`` as a TemplateLibrary.
 
-                max_transfer = min(amount, 3)
-                for send_amount in range(1, int(max_transfer) + 1):
-                    new_world = world.clone()
+    Libraries are passed through untouched when they already cover ``scales``;
+    plain lists of templates are compiled on the spot.
 
-                    try:
-                        sender = new_world.get_country(sender_name)
-                        receiver = new_world.get_country(receiver_name)
+    :param transform_templates: A TemplateLibrary or a list of TransformTemplate.
+    :param scales: Scale factors needed by the caller, or None for the default.
+    :return: A compiled TemplateLibrary.
+    """
+    if isinstance(transform_templates, TemplateLibrary):
+        if scales is None or tuple(scales) == transform_templates.scales:
+            return transform_templates
+        return TemplateLibrary(transform_templates.templates, scales, transform_templates.digest)
+    return TemplateLibrary(transform_templates, DEFAULT_SCALES if scales is None else scales)
+
+@dataclass(frozen=True)
+class Action:
+    """A feasible action, described by the sparse resource changes it makes.
+
+    :ivar action_str: The action in schedule notation.
+    :ivar is_transfer: True for TRANSFER actions, False for TRANSFORMs.
+    :ivar changes: ``(country, resource, amount)`` triples, applied in order.
+    :ivar preconditions: ``(country, resource, minimum)`` triples that must all
+        hold for the action to be feasible.
+    :ivar steps: For a compound (macro) action, the primitive actions it
+        stands for, in order; empty for primitive actions.
+    """
 
-                        cost_per_unit = resource_weights.get(resource, 1)
-                        total_cost = cost_per_unit * send_amount * TRANSFER_PENALTY_FACTOR
+    action_str: str
+    is_transfer: bool
+    changes: Tuple[Tuple[str, str, float], ...]
+    preconditions: Tuple[Tuple[str, str, float], ...] = ()
+    steps: Tuple["Action", ...] = ()
 
-                        if sender.resources.get("PotentialEnergyUsable", 0) < total_cost:
-                            continue
 
-                        sender.resources["PotentialEnergyUsable"] -= total_cost
-                        new_world.transfer_resources(
-                            sender_name=sender_name,
-                            receiver_name=receiver_name,
-                            resource_list=[(resource, send_amount)]
-                        )
+_TRANSFORM_RE = re.compile(r"^\(TRANSFORM (\S+) (\S+) x(\d+)\)$")
+_TRANSFER_RE = re.compile(r"^\(TRANSFER (\S+) (\S+) \((\(\S+ \d+\)(?: \(\S+ \d+\))*)\)\)$")
+_ITEM_RE = re.compile(r"\((\S+) (\d+)\)")
 
-                        original_country = world.get_country(self_country)
-                        new_country = new_world.get_country(self_country)
 
-                        original_eu = compute_state_quality(original_country.resources, resource_weights)
-                        new_eu = compute_state_quality(new_country.resources, resource_weights)
-                        delta_score = new_eu - original_eu
+def transform_action(self_country: str, name: str, factor: int, scaled: TransformTemplate) -> Action:
+    """Build the TRANSFORM action applying template ``name`` x ``factor``
+    (already scaled as ``scaled``) in ``self_country``."""
+    changes = tuple((self_country, r, -amt) for r, amt in scaled.inputs.items())
+    changes += tuple((self_country, r, amt) for r, amt in scaled.outputs.items())
+    preconditions = tuple((self_country, r, amt) for r, amt in scaled.inputs.items())
+    preconditions += tuple((self_country, r, amt) for r, amt in scaled.required.items())
+    action_str = f"(TRANSFORM {self_country} {name} x{factor})"
+    return Action(action_str, False, changes, preconditions)
 
 
-                        action_str = f"(TRANSFER {sender_name} {receiver_name} (({resource} {send_amount})))"
-                        delta = compute_resource_delta(sender_obj.resources, new_world.get_country(self_country).resources)
-                        successors.append((action_str, new_world, delta, delta_score))
+def transfer_action(
+    sender_name: str, receiver_name: str, resource: str, send_amount: int, resource_weights: dict
+) -> Action:
+    """Build the TRANSFER of ``send_amount`` units of ``resource``.
+
+    The sender also pays an energy cost of weight x amount x
+    :data:`TRANSFER_PENALTY_FACTOR`, before the goods leave.
+    """
+    return bundle_action(sender_name, receiver_name, ((resource, send_amount),), resource_weights)
 
-                    except ValueError:
-                        continue
+
+def bundle_action(
+    sender_name: str, receiver_name: str, items: Tuple[Tuple[str, int], ...], resource_weights: dict
+) -> Action:
+    """Build one TRANSFER of several resources, e.g. ``((Food 2) (Water 1))``.
+
+    The sender pays the energy cost of every item, as for
+    :func:`transfer_action`, before the goods leave.
+
+    :param sender_name: The sending country.
+    :param receiver_name: The receiving country.
+    :param items: ``(resource, amount)`` pairs, each resource once.
+    :param resource_weights: Dictionary of resource weights (sets the cost).
+    :return: The Action; its changes are the energy cost, then a
+        ``(sender, -amount)``, ``(receiver, +amount)`` pair per item.
+    """
+    total_cost = sum(resource_weights.get(res, 1) * amount for res, amount in items) * TRANSFER_PENALTY_FACTOR
+    listed = " ".join(f"({res} {amount})" for res, amount in items)
+    action_str = f"(TRANSFER {sender_name} {receiver_name} ({listed}))"
+    changes = ((sender_name, "PotentialEnergyUsable", -total_cost),)
+    preconditions = ((sender_name, "PotentialEnergyUsable", total_cost),)
+    for res, amount in items:
+        changes += ((sender_name, res, -amount), (receiver_name, res, amount))
+        needed = amount + total_cost if res == "PotentialEnergyUsable" else amount
+        preconditions += ((sender_name, res, needed),)
+    return Action(action_str, True, changes, preconditions)
+
+
+def transfer_items(action: Action) -> List[Tuple[str, float]]:
+    """Return the ``(resource, amount)`` pairs a TRANSFER action moves."""
+    return [(res, amount) for _, res, amount in action.changes[2::2]]
+
+
+def trade_index(resources: dict, library: TemplateLibrary) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """Index what a country can spare and what it lacks for its templates.
+
+    :param resources: The country's resources.
+    :param library: The compiled templates, whose ``demand`` is the most of
+        each resource any variant reads.
+    :return: ``(surplus, deficit)``: transferable resources held beyond
+        their demand (all holdings of resources no template reads), and the
+        shortfall below demand of every resource some template reads.
+    """
+    demand = library.demand
+    surplus = {}
+    for res, held in resources.items():
+        spare = held - demand.get(res, 0)
+        if res in VALID_TRANSFERABLES and spare >= 1:
+            surplus[res] = spare
+    deficit = {res: need - resources.get(res, 0) for res, need in demand.items() if resources.get(res, 0) < need}
+    return surplus, deficit
+
+
+def trade_bundles(
+    sender_name: str,
+    sender_resources: dict,
+    surplus: Dict[str, float],
+    receiver_name: str,
+    deficit: Dict[str, float],
+    resource_weights: dict,
+) -> List[Action]:
+    """Offer a few high-value TRANSFER bundles from one country to another.
+
+    The sender's surplus is ranked by what it is worth to the receiver:
+    resources the receiver lacks for a template first, then by weight;
+    surplus the receiver neither lacks nor values is not offered. Bundle
+    ``n`` takes the best ``n`` resources (up to
+    :data:`MAX_BUNDLE_RESOURCES`), each sized to the receiver's shortfall
+    (or :data:`MAX_TRANSFER_AMOUNT`, whichever is smaller) and then to what
+    the sender's remaining ``PotentialEnergyUsable`` can pay for.
+
+    :param sender_name: The sending country.
+    :param sender_resources: The sender's resources.
+    :param surplus: The sender's surplus, from :func:`trade_index`.
+    :param receiver_name: The receiving country.
+    :param deficit: The receiver's deficit, from :func:`trade_index`.
+    :param resource_weights: Dictionary of resource weights.
+    :return: Distinct bundle actions, smallest first.
+    """
+    ranked = sorted(
+        (res for res in surplus if res in deficit or resource_weights.get(res, 0) > 0),
+        key=lambda res: (res not in deficit, -resource_weights.get(res, 0), res),
+    )
+    energy = sender_resources.get("PotentialEnergyUsable", 0)
+    bundles, seen, items = [], set(), []
+    for res in ranked:
+        if len(bundles) == MAX_BUNDLE_RESOURCES:
+            break
+        unit_cost = resource_weights.get(res, 1) * TRANSFER_PENALTY_FACTOR
+        if res == "PotentialEnergyUsable":
+            unit_cost += 1
+        wanted = min(surplus[res], deficit.get(res, MAX_TRANSFER_AMOUNT), MAX_TRANSFER_AMOUNT)
+        if unit_cost > 0:
+            wanted = min(wanted, energy // unit_cost)
+        amount = int(wanted)
+        if amount < 1:
+            continue
+        energy -= amount * unit_cost
+        items.append((res, amount))
+        key = tuple(sorted(items))
+        if key not in seen:
+            seen.add(key)
+            bundles.append(bundle_action(sender_name, receiver_name, key, resource_weights))
+    return bundles
+
+
+def action_from_string(action_str: str, transform_templates, resource_weights: dict) -> Action:
+    """Rebuild a primitive action from its schedule notation.
+
+    :param action_str: e.g. ``(TRANSFORM Atlantis Lumber x1)``,
+        ``(TRANSFER Carpania Atlantis ((Timber 1)))`` or
+        ``(TRANSFER Carpania Atlantis ((Food 1) (Timber 2)))``.
+    :param transform_templates: A TemplateLibrary or a list of TransformTemplate.
+    :param resource_weights: Dictionary of resource weights (sets transfer costs).
+    :return: The matching Action.
+    :raises ValueError: If the string is not a known TRANSFORM or TRANSFER.
+    """
+    match = _TRANSFORM_RE.match(action_str)
+    if match:
+        country, name, factor = match.group(1), match.group(2), int(match.group(3))
+        try:
+            scaled = as_library(transform_templates).scaled(name, factor)
+        except KeyError as exc:
+            raise ValueError(f"Unknown transform template in {action_str!r}") from exc
+        return transform_action(country, name, factor, scaled)
+    match = _TRANSFER_RE.match(action_str)
+    if match:
+        sender, receiver, listed = match.groups()
+        items = tuple((res, int(amount)) for res, amount in _ITEM_RE.findall(listed))
+        return bundle_action(sender, receiver, items, resource_weights)
+    raise ValueError(f"Unrecognised action {action_str!r}")
+
+
+def compute_resource_delta(old: dict, new: dict) -> dict:
+    """Return the non-zero per-resource change from ``old`` to ``new``."""
+    return {
+        key: new.get(key, 0) - old.get(key, 0)
+        for key in set(old) | set(new)
+        if new.get(key, 0) != old.get(key, 0)
+    }
+
+
+def action_delta_score(action: Action, before: dict, after: dict, delta: dict, resource_weights: dict) -> float:
+    """Score the planning country's change caused by one action.
+
+    TRANSFORMs score the weighted resource delta; TRANSFERs score the change
+    in per-capita state quality. Under a quality model (see
+    :func:`~evaluations.state_quality.is_quality_model`) every action scores
+    the change in the model's quality.
+
+    :param action: The applied action.
+    :param before: The planning country's resources before the action.
+    :param after: The planning country's resources after the action.
+    :param delta: ``compute_resource_delta(before, after)``.
+    :param resource_weights: Dictionary of resource weights, or a QualityModel.
+    :return: The action's delta score.
+    """
+    if action.is_transfer or is_quality_model(resource_weights):
+        return compute_state_quality(after, resource_weights) - compute_state_quality(before, resource_weights)
+    return sum(resource_weights.get(res, 0) * delta.get(res, 0) for res in delta)
+
+
+def apply_action(
+    world: World, self_country: str, action: Action, resource_weights: dict, quality_before: Optional[float] = None
+) -> Tuple[list, dict, float]:
+    """Apply ``action`` to ``world`` in place and score it.
+
+    :param world: The world to mutate.
+    :param self_country: Name of the planning country.
+    :param action: A feasible action for the current state.
+    :param resource_weights: Dictionary of resource weights, or a QualityModel.
+    :param quality_before: The planning country's state quality before the
+        action, if already known (only TRANSFERs, or every action under a
+        quality model, need it).
+    :return: ``(undo, delta, delta_score)``, where ``undo`` reverts the action
+        through :meth:`World.undo_changes`.
+    """
+    resources = world.get_country(self_country).resources
+    by_quality = action.is_transfer or is_quality_model(resource_weights)
+    if by_quality and quality_before is None:
+        quality_before = compute_state_quality(resources, resource_weights)
+    undo = world.apply_changes(action.changes)
+    delta = world.undo_delta(undo, self_country)
+    if by_quality:
+        delta_score = compute_state_quality(resources, resource_weights) - quality_before
+    else:
+        delta_score = sum(resource_weights.get(res, 0) * amt for res, amt in delta.items())
+    return undo, delta, delta_score
+
+
+def apply_action_steps(
+    world: World, self_country: str, action: Action, resource_weights: dict
+) -> Tuple[list, List[Tuple[str, dict, float]]]:
+    """Apply ``action`` in place one primitive step at a time.
+
+    A primitive action is its own single step; a macro applies each of its
+    ``steps`` in order, so every step is scored exactly as if it had been
+    searched on its own.
+
+    :param world: The world to mutate.
+    :param self_country: Name of the planning country.
+    :param action: A feasible primitive or macro action.
+    :param resource_weights: Dictionary of resource weights.
+    :return: ``(undo, steps)``, where ``undo`` reverts every step through
+        :meth:`World.undo_changes` and ``steps`` holds one
+        ``(action_str, delta, delta_score)`` per primitive step.
+    """
+    undo, steps = [], []
+    for step in action.steps or (action,):
+        step_undo, delta, delta_score = apply_action(world, self_country, step, resource_weights)
+        undo.extend(step_undo)
+        steps.append((step.action_str, delta, delta_score))
+    return undo, steps
+
+
+def iter_actions(
+    world: World, self_country: str, transform_templates, resource_weights: dict, feasible: Optional[int] = None
+) -> Iterator[Action]:
+    """Yield every feasible TRANSFORM and TRANSFER action for ``self_country``.
+
+    The world is only read, so callers may apply each action in place or to
+    a clone. Consume the iterator fully before mutating the world.
+
+    :param world: The current world state.
+    :param self_country: Name of the planning country.
+    :param transform_templates: A TemplateLibrary or a list of TransformTemplate.
+    :param resource_weights: Dictionary of resource weights (sets transfer costs).
+    :param feasible: The library's feasibility bitmask for ``self_country``
+        in this state (see :meth:`TemplateLibrary.update_feasible_mask`),
+        or None to check every template.
+    :return: An iterator of Action objects, TRANSFORMs first.
+    """
+    library = as_library(transform_templates)
+    self_country_obj = world.get_country(self_country)
+
+    # TRANSFORM actions, in variant order
+    if feasible is None:
+        feasible = library.feasible_mask(self_country_obj.resources)
+    while feasible:
+        low = feasible & -feasible
+        feasible ^= low
+        variant = library.variants[low.bit_length() - 1]
+        yield transform_action(self_country, variant.name, variant.factor, variant.transform)
+
+    # TRANSFER bundles in both directions, matched from each country's
+    # surplus/deficit index
+    indexes = {country.name: trade_index(country.resources, library) for country in world.all_countries()}
+    for other_country_obj in world.all_countries():
+        other_country = other_country_obj.name
+        if other_country == self_country:
+            continue
+
+        for sender_name, receiver_name in [(self_country, other_country), (other_country, self_country)]:
+            sender_obj = world.get_country(sender_name)
+            bundles = trade_bundles(
+                sender_name, sender_obj.resources, indexes[sender_name][0],
+                receiver_name, indexes[receiver_name][1], resource_weights,
+            )
+            for action in bundles:
+                # The energy cost is paid before the goods leave the sender.
+                if all(sender_obj.resources.get(r, 0) >= m for _, r, m in action.preconditions):
+                    yield action
+
+
+def generate_successors(world: World, self_country: str, transform_templates, resource_weights: dict, actions=None) -> List[Tuple[str, World, dict, float]]:
+    successors = []
+    library = as_library(transform_templates)
+    self_country_obj = world.get_country(self_country)
+
+    if actions is None:
+        actions = iter_actions(world, self_country, library, resource_weights)
+    if is_quality_model(resource_weights):
+        return _model_successors(world, self_country, actions, resource_weights)
+    for action in actions:
+        new_world = world.clone()
+        new_world.apply_changes(action.changes)
+        new_self = new_world.get_country(self_country)
+        delta = compute_resource_delta(self_country_obj.resources, new_self.resources)
+        delta_score = action_delta_score(
+            action, self_country_obj.resources, new_self.resources, delta, resource_weights
+        )
+        successors.append((action.action_str, new_world, delta, delta_score))
 
     return successors
 
+
+def _model_successors(world: World, self_country: str, actions, model) -> List[Tuple[str, World, dict, float]]:
+    """:func:`generate_successors` under a quality model: the parent and
+    every child are scored in one batched evaluation."""
+    before = world.get_country(self_country).resources
+    children = []
+    for action in actions:
+        new_world = world.clone()
+        new_world.apply_changes(action.changes)
+        children.append((action.action_str, new_world, new_world.get_country(self_country).resources))
+    qualities = model.qualities([before] + [resources for _, _, resources in children])
+    return [
+        (action_str, new_world, compute_resource_delta(before, resources), float(quality - qualities[0]))
+        for (action_str, new_world, resources), quality in zip(children, qualities[1:])
+    ]
@@ -0,0 +1,21 @@
+# visualizations/backend.py
+"""Headless matplotlib loading shared by the plotting modules.
+
+Plots are only ever saved to files, so the non-interactive Agg backend is
+selected before pyplot is first imported. That skips GUI toolkit discovery
+and works without a display. An explicit ``MPLBACKEND`` is respected.
+"""
+
+import os
+import sys
+
+
+def load_pyplot():
+    """Import matplotlib on first use and return ``matplotlib.pyplot``."""
+    if "matplotlib.pyplot" not in sys.modules and not os.environ.get("MPLBACKEND"):
+        import matplotlib
+
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
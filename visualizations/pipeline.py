@@ -0,0 +1,246 @@
+# visualizations/pipeline.py
+"""Single-pass batch plotting of schedule logs.
+
+:func:`load_schedule_series` streams a schedule log once (see
+:func:`parsers.schedule_log_parser.iter_schedule_log`), keeping only the
+selected schedules and stopping as soon as the last of them is read. Every
+step's resource delta is scattered into one ``(rows, resources)`` array, in
+which each schedule is a block starting with the country's initial
+resources, and a single cumulative sum turns the blocks into resource
+series.
+
+:func:`render_schedule_series` draws them with the headless Agg backend
+(see :mod:`visualizations.backend`), one subplot per schedule and all of a
+schedule's resources in one ``plot`` call, into a single image, or into one
+image per schedule when the output path contains ``{schedule_num}``; those
+can be rendered by a process pool. Series longer than ``max_points`` steps
+are downsampled, always keeping the first and last step.
+
+:func:`plot_in_background` runs the whole pipeline in a separate process, so
+a scheduler can return its plan without waiting for matplotlib.
+"""
+
+import math
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from parsers.csv_parser import parse_country_resources
+from parsers.schedule_log_parser import iter_schedule_log
+from visualizations.backend import load_pyplot
+
+# Steps drawn per series at most; longer series are downsampled.
+DEFAULT_MAX_POINTS = 500
+
+# Subplot columns of a combined figure.
+GRID_COLUMNS = 3
+
+
+@dataclass
+class ScheduleSeries:
+    """Cumulative resource series of several schedules.
+
+    Schedule ``i`` owns rows ``starts[i]:starts[i + 1]`` of ``values`` and
+    ``eus``; its first row is the initial state (EU NaN, as logs do not
+    record it) and every further row the state after one more step.
+
+    :ivar schedule_nums: Schedule numbers, in log order.
+    :ivar resources: Resource names, in column order.
+    :ivar starts: Row offsets of the schedules, plus the total row count.
+    :ivar values: ``(rows, resources)`` resource amounts.
+    :ivar eus: EU after each row's step.
+    """
+
+    schedule_nums: Tuple[int, ...]
+    resources: Tuple[str, ...]
+    starts: np.ndarray
+    values: np.ndarray
+    eus: np.ndarray
+
+    def __len__(self):
+        return len(self.schedule_nums)
+
+    def schedule(self, i: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(values, eus)`` rows of the ``i``-th schedule."""
+        rows = slice(self.starts[i], self.starts[i + 1])
+        return self.values[rows], self.eus[rows]
+
+
+def load_schedule_series(
+    json_path: str, initial_resources: dict, schedules: Optional[Iterable[int]] = None
+) -> ScheduleSeries:
+    """Read a schedule log once and build cumulative resource series.
+
+    :param json_path: Path to the schedule log (JSONL, optionally gzipped).
+    :param initial_resources: The planning country's initial resources.
+    :param schedules: Schedule numbers to keep, or None for every schedule.
+    :return: The :class:`ScheduleSeries`, in log order.
+    :raises ValueError: If a requested schedule is not in the log.
+    """
+    wanted = None if schedules is None else set(schedules)
+    columns = {res: i for i, res in enumerate(initial_resources)}
+    nums, starts, eus = [], [], []
+    rows, cols, amounts = [], [], []
+    row = 0
+    for record in iter_schedule_log(json_path):
+        if wanted is not None and record["schedule_num"] not in wanted:
+            continue
+        nums.append(record["schedule_num"])
+        starts.append(row)
+        eus.append(math.nan)
+        row += 1
+        for step in record["actions"]:
+            for res, amount in step["delta"].items():
+                rows.append(row)
+                cols.append(columns.setdefault(res, len(columns)))
+                amounts.append(amount)
+            eus.append(step["eu"])
+            row += 1
+        if wanted is not None and len(nums) == len(wanted):
+            break
+    if wanted is not None and len(nums) < len(wanted):
+        missing = sorted(wanted - set(nums))
+        raise ValueError(f"Schedules {missing} are not in {json_path}.")
+
+    deltas = np.zeros((row, len(columns)))
+    np.add.at(deltas, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), amounts)
+    starts = np.array(starts + [row], dtype=np.intp)
+    deltas[starts[:-1], : len(initial_resources)] += [float(v) for v in initial_resources.values()]
+    totals = np.cumsum(deltas, axis=0)
+    # Each block restarts from its initial row: remove what earlier blocks summed to.
+    carried = np.zeros((len(nums), len(columns)))
+    carried[1:] = totals[starts[1:-1] - 1]
+    values = totals - np.repeat(carried, np.diff(starts), axis=0)
+    return ScheduleSeries(tuple(nums), tuple(columns), starts, values, np.array(eus))
+
+
+def downsample(steps: int, max_points: int) -> np.ndarray:
+    """Indices of at most ``max_points`` evenly spaced steps out of ``steps``,
+    including the first and the last."""
+    if steps <= max_points:
+        return np.arange(steps)
+    return np.unique(np.linspace(0, steps - 1, max(max_points, 2)).round().astype(np.intp))
+
+
+def _draw(ax, values: np.ndarray, max_points: int, title: str):
+    """Draw one schedule's resource series on ``ax`` in a single call."""
+    from matplotlib.ticker import MaxNLocator
+
+    index = downsample(len(values), max_points)
+    # Twenty distinct colours before any repeats; the default cycle has ten.
+    palette = load_pyplot().get_cmap("tab20")
+    ax.set_prop_cycle(color=[palette(i % 20) for i in range(values.shape[1])])
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    lines = ax.plot(index, values[index], marker="o" if len(index) <= 50 else None)
+    ax.set_title(title)
+    ax.set_xlabel("Action Step")
+    ax.set_ylabel("Amount")
+    ax.grid(True)
+    return lines
+
+
+def _save(fig, output_path: str):
+    folder = os.path.dirname(output_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    fig.savefig(output_path)
+
+
+def _render_one(job) -> str:
+    """Render one schedule to its own image (a process-pool task)."""
+    output_path, title, resources, values, max_points = job
+    plt = load_pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    lines = _draw(ax, values, max_points, title)
+    ax.legend(lines, resources, fontsize="small", ncol=2)
+    fig.tight_layout()
+    _save(fig, output_path)
+    plt.close(fig)
+    return output_path
+
+
+def render_schedule_series(
+    series: ScheduleSeries, output_path: str, max_points: int = DEFAULT_MAX_POINTS, workers: int = 1
+) -> List[str]:
+    """Render resource series to PNG files.
+
+    :param series: The series to draw, from :func:`load_schedule_series`.
+    :param output_path: Image path. If it contains ``{schedule_num}``, one
+        image per schedule is written; otherwise one figure with a subplot
+        per schedule.
+    :param max_points: Steps drawn per series at most.
+    :param workers: Processes rendering per-schedule images in parallel.
+    :return: The paths written.
+    """
+    if "{schedule_num}" in output_path:
+        jobs = [
+            (output_path.format(schedule_num=num), f"Schedule {num} Resources", series.resources,
+             series.schedule(i)[0], max_points)
+            for i, num in enumerate(series.schedule_nums)
+        ]
+        if workers > 1 and len(jobs) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+                return list(pool.map(_render_one, jobs))
+        return [_render_one(job) for job in jobs]
+
+    plt = load_pyplot()
+    count = max(len(series), 1)
+    columns = min(GRID_COLUMNS, count)
+    rows = -(-count // columns)
+    fig, axes = plt.subplots(rows, columns, figsize=(5 * columns, 4 * rows), squeeze=False)
+    lines = []
+    for i, num in enumerate(series.schedule_nums):
+        lines = _draw(axes.flat[i], series.schedule(i)[0], max_points, f"Schedule {num}")
+    for ax in axes.flat[len(series):]:
+        ax.set_visible(False)
+    if lines:
+        fig.legend(lines, series.resources, loc="lower center", ncol=min(len(series.resources), 6),
+                   fontsize="small")
+    fig.tight_layout(rect=(0, 0.12, 1, 1))
+    _save(fig, output_path)
+    plt.close(fig)
+    return [output_path]
+
+
+def plot_schedule_series(
+    json_path: str,
+    output_path: str,
+    initial_resources_path: str,
+    country: str = "Atlantis",
+    schedules: Optional[Iterable[int]] = None,
+    max_points: int = DEFAULT_MAX_POINTS,
+    workers: int = 1,
+) -> List[str]:
+    """Plot the cumulative resources of logged schedules.
+
+    :param json_path: Path to the schedule log (JSONL, optionally gzipped).
+    :param output_path: Image path; see :func:`render_schedule_series`.
+    :param initial_resources_path: CSV of every country's initial resources.
+    :param country: The planning country whose schedules were logged.
+    :param schedules: Schedule numbers to plot, or None for all of them.
+    :param max_points: Steps drawn per series at most.
+    :param workers: Processes rendering per-schedule images in parallel.
+    :return: The paths written.
+    :raises ValueError: If ``country`` or a requested schedule is unknown.
+    """
+    initial = parse_country_resources(initial_resources_path)
+    if country not in initial:
+        raise ValueError(f"Country '{country}' is not in {initial_resources_path}.")
+    series = load_schedule_series(json_path, initial[country], schedules)
+    return render_schedule_series(series, output_path, max_points, workers)
+
+
+def plot_in_background(*args, **kwargs) -> multiprocessing.Process:
+    """Run :func:`plot_schedule_series` in a new process and return it.
+
+    The process is not a daemon, so an interpreter that exits waits for the
+    plot to be written; join it to wait earlier.
+    """
+    process = multiprocessing.Process(target=plot_schedule_series, args=args, kwargs=kwargs)
+    process.start()
+    return process
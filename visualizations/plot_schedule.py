@@ -1,16 +1,14 @@
 # visualizations/plot_schedule.py
 
-import json
-import matplotlib.pyplot as plt
 import os
+from parsers.schedule_log_parser import iter_schedule_log
+from visualizations.backend import load_pyplot
 
 def plot_schedule_log(json_path: str, output_path: str):
-    with open(json_path) as f:
-        data = json.load(f)
-
+    plt = load_pyplot()
     plt.figure(figsize=(10, 6))
 
-    for entry in data:
+    for entry in iter_schedule_log(json_path):
         steps = list(range(1, len(entry["actions"]) + 1))
         eus = [a["eu"] for a in entry["actions"]]
         label = f"Schedule {entry['schedule_num']}"
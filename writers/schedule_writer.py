@@ -0,0 +1,142 @@
+"""Streaming writers for scheduler output.
+
+Each completed schedule is written the moment it is found: a human-readable
+block in the ``.txt`` report and one compact JSON record per line in the
+schedule log (JSONL, optionally gzip-compressed). Writes are buffered and
+flushed on a timer, so large runs never hold the whole log in memory and the
+files can be inspected while the search is still running.
+"""
+
+import gzip
+import io
+import json
+import os
+import time
+from typing import List, Optional
+
+
+def _open_text(path: str, compress: bool, buffer_size: int):
+    """Open ``path`` for buffered text writing, gzip-compressed if requested."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if compress:
+        raw = gzip.open(path, "wb", compresslevel=6)
+        return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size), encoding="utf-8")
+    return open(path, "w", buffering=buffer_size, encoding="utf-8")
+
+
+def schedule_record(schedule_num: int, actions: List[str], eus: List[float], deltas: List[dict]) -> dict:
+    """Build the log record for one schedule.
+
+    :param schedule_num: 1-based position of the schedule in the output.
+    :param actions: Action strings, one per step.
+    :param eus: EU values, starting with the initial state's EU.
+    :param deltas: Resource deltas, one per step.
+    :return: A JSON-serializable dictionary.
+    """
+    return {
+        "schedule_num": schedule_num,
+        "final_eu": eus[-1],
+        "actions": [
+            {"action": action, "eu": eu, "delta": delta}
+            for action, eu, delta in zip(actions, eus[1:], deltas)
+        ],
+    }
+
+
+def format_schedule_text(schedule_num: int, actions: List[str], eus: List[float]) -> str:
+    """Render one schedule as a block of the ``.txt`` report.
+
+    :param schedule_num: 1-based position of the schedule in the output.
+    :param actions: Action strings, one per step.
+    :param eus: EU values, starting with the initial state's EU.
+    :return: The formatted block, including its trailing blank line.
+    """
+    lines = [f"Schedule {schedule_num} (Final EU: {eus[-1]:.2f}):\n["]
+    if len(actions) != len(eus) - 1:
+        lines.append("\n  ⚠️ WARNING: actions and EU lengths mismatched!\n")
+    for j, (action, eu) in enumerate(zip(actions, eus[1:]), 1):
+        lines.append(f"\n  Step {j}: {action} EU: {eu:.2f}")
+    lines.append("\n]\n\n")
+    return "".join(lines)
+
+
+class ScheduleWriter:
+    """Streams completed schedules to a text report and a JSONL log.
+
+    Usable as a context manager; the files are flushed and closed on exit.
+
+    :ivar text_path: Path of the ``.txt`` report, or None to skip it.
+    :ivar log_path: Path of the JSONL log, or None to skip it.
+    :ivar count: Number of schedules written so far.
+    """
+
+    def __init__(
+        self,
+        text_path: Optional[str],
+        log_path: Optional[str],
+        compress: Optional[bool] = None,
+        buffer_size: int = 1 << 16,
+        flush_interval: float = 1.0,
+    ):
+        """Open the output files.
+
+        :param text_path: Path of the ``.txt`` report, or None.
+        :param log_path: Path of the JSONL log, or None.
+        :param compress: Gzip the log. Defaults to True when ``log_path``
+            ends in ``.gz``.
+        :param buffer_size: Size in bytes of each file's write buffer.
+        :param flush_interval: Seconds between flushes; 0 flushes after
+            every schedule.
+        """
+        if compress is None:
+            compress = bool(log_path) and log_path.endswith(".gz")
+        self.text_path = text_path
+        self.log_path = log_path
+        self.count = 0
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._text = _open_text(text_path, False, buffer_size) if text_path else None
+        self._log = _open_text(log_path, compress, buffer_size) if log_path else None
+
+    def write(self, actions: List[str], eus: List[float], deltas: List[dict]) -> int:
+        """Append one completed schedule to both outputs.
+
+        :param actions: Action strings, one per step.
+        :param eus: EU values, starting with the initial state's EU.
+        :param deltas: Resource deltas, one per step.
+        :return: The schedule number assigned to this schedule.
+        """
+        self.count += 1
+        if self._text is not None:
+            self._text.write(format_schedule_text(self.count, actions, eus))
+        if self._log is not None:
+            record = schedule_record(self.count, actions, eus, deltas)
+            self._log.write(json.dumps(record, separators=(",", ":")))
+            self._log.write("\n")
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+        return self.count
+
+    def flush(self):
+        """Push buffered output to disk."""
+        for handle in (self._text, self._log):
+            if handle is not None:
+                handle.flush()
+
+    def close(self):
+        """Flush and close both outputs."""
+        for handle in (self._text, self._log):
+            if handle is not None:
+                handle.close()
+        self._text = None
+        self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()